@@ -0,0 +1,29 @@
+from typing import Annotated, AsyncIterator
+
+from fastapi import Depends, HTTPException, Query
+
+from app.inference.registry import LoadedModel, UnknownModel, model_registry
+
+
+async def model_lease(
+    model: Annotated[
+        str | None,
+        Query(description="Registered model name (default model if omitted)"),
+    ] = None,
+) -> AsyncIterator[LoadedModel]:
+    """
+    The requested model, pinned until the response (including a streamed
+    body) is finished, so a hot swap never pulls it from under the request.
+    """
+    try:
+        loaded = model_registry.get(model).acquire()
+    except UnknownModel as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    try:
+        yield loaded
+    finally:
+        loaded.release()
+
+
+# The leased model of a request, as an endpoint parameter
+ModelLease = Annotated[LoadedModel, Depends(model_lease)]
@@ -0,0 +1,52 @@
+from typing import TYPE_CHECKING
+
+from fastapi import APIRouter, HTTPException, Response
+
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.core.timing import current_timings
+from app.inference.executor import InferenceOverloaded, inference_executor
+
+if TYPE_CHECKING:
+    from app.inference import explanation_store as explanations
+    from app.inference import xai
+else:
+    explanations = lazy_import("app.inference.explanation_store")
+    xai = lazy_import("app.inference.xai")
+
+router = APIRouter()
+
+
+@router.get(
+    "/explanations/{explanation_id}",
+    response_class=Response,
+    responses={200: {"content": {"image/png": {}}}},
+)
+async def get_explanation(explanation_id: str) -> Response:
+    """
+    Heatmap overlay (PNG) for a prediction made with ``explain=lazy``.
+    Rendered on first request, then served from the store until it expires.
+    """
+    entry = explanations.explanation_store.get(explanation_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Explanation not found or expired")
+
+    if entry.png is None:
+        try:
+            with current_timings().stage("xai"):
+                entry.png = await inference_executor.run_preprocessing(
+                    xai.render_heatmap_png, entry.image_size, entry.label_id, entry.cam
+                )
+        except InferenceOverloaded as e:
+            raise HTTPException(
+                status_code=503,
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)},
+            ) from e
+
+    max_age = int(settings.EXPLANATION_TTL_SECONDS)
+    return Response(
+        content=entry.png,
+        media_type="image/png",
+        headers={"Cache-Control": f"private, max-age={max_age}"},
+    )
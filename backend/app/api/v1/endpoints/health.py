@@ -1,10 +1,37 @@
+from typing import Any
+
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.inference.registry import model_registry
 
 router = APIRouter()
 
+
 @router.get("/healthz", status_code=200)
 def health_check() -> dict[str, str]:
     """
-    Health check endpoint for k8s/docker probes.
+    Liveness probe for k8s/docker: the process is up and serving HTTP.
+    Use ``/v1/readyz`` to decide whether to route traffic here.
     """
     return {"status": "ok"}
+
+
+@router.get("/readyz", status_code=200, responses={503: {"description": "Not ready"}})
+def readiness_check() -> Any:
+    """
+    Readiness probe: 200 only once every model is loaded and warmed up
+    (503 while starting, if a model failed to load, and during shutdown).
+    """
+    models = {
+        loaded.spec.name: {
+            "loaded": loaded.engine.session is not None,
+            "warmup_ms": loaded.warmup_ms,
+        }
+        for loaded in model_registry.models()
+    }
+    if not model_registry.ready:
+        return JSONResponse(
+            {"status": "unavailable", "models": models}, status_code=503
+        )
+    return {"status": "ready", "models": models}
@@ -1,16 +1,38 @@
+from typing import Any
+
 from fastapi import APIRouter
+
 from app.core.config import settings
+from app.inference.registry import model_registry
 
 router = APIRouter()
 
+
 @router.get("/metadata", status_code=200)
-def get_metadata() -> dict[str, str]:
+def get_metadata() -> dict[str, Any]:
     """
-    Returns metadata about the service and currently loaded model.
+    Returns metadata about the service and the default model.
     """
+    model_engine = model_registry.get().engine
     return {
         "service": settings.PROJECT_NAME,
         "version": settings.VERSION,
-        "model_mode": "synthetic" if settings.USE_SYNTHETIC_MODE else "onnx",
-        "description": "Fetal Plane Classification Demo (Research Only)"
+        "model_mode": "onnx" if model_engine.session is not None else "unavailable",
+        "model_variant": model_engine.variant,
+        "default_model": model_registry.default,
+        "models": model_registry.names,
+        "description": "Fetal Plane Classification Demo (Research Only)",
+        "onnx_runtime": {
+            "profile": settings.ORT_PROFILE,
+            **model_engine.runtime_info,
+        },
+        "calibration": {
+            "method": model_engine.calibration.method,
+            "temperature": model_engine.calibration.temperature,
+        },
+        "batching": {
+            "max_batch_size": settings.BATCH_MAX_SIZE,
+            "max_wait_ms": settings.BATCH_MAX_WAIT_MS,
+            "max_queue_depth": settings.BATCH_MAX_QUEUE_DEPTH,
+        },
     }
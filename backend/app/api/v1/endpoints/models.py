@@ -0,0 +1,47 @@
+import secrets
+from typing import Any
+
+from fastapi import APIRouter, Header, HTTPException
+
+from app.core.config import settings
+from app.inference.registry import ModelLoadError, UnknownModel, model_registry
+
+router = APIRouter()
+
+
+@router.get("/models", status_code=200)
+def list_models() -> dict[str, Any]:
+    """
+    Registered models with their version, calibration, in-flight requests
+    and approximate memory held by each session.
+    """
+    return {
+        "default": model_registry.default,
+        "models": [loaded.describe() for loaded in model_registry.models()],
+    }
+
+
+@router.post("/models/{name}/reload", status_code=200)
+async def reload_model(
+    name: str, x_admin_token: str | None = Header(None)
+) -> dict[str, Any]:
+    """
+    Load the model files of ``name`` again and swap them in. Requests already
+    running finish on the previous generation. Requires ``X-Admin-Token``.
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403, detail="Admin API is disabled (ADMIN_TOKEN unset)"
+        )
+    # Constant-time comparison, so the token cannot be guessed from timings
+    if x_admin_token is None or not secrets.compare_digest(
+        x_admin_token.encode(), settings.ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    try:
+        loaded = await model_registry.reload(name)
+    except UnknownModel as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except ModelLoadError as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    return loaded.describe()
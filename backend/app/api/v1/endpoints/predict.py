@@ -1,136 +1,489 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from __future__ import annotations
+
+import asyncio
 import logging
+import time
+from typing import TYPE_CHECKING, Annotated
+
+from fastapi import APIRouter, File, HTTPException, Query, Request, Response, UploadFile
+
+from app.api.v1.deps import ModelLease
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.core.media import (
+    BodyPart,
+    MultipartMixedResponse,
+    ORJSONResponse,
+    prefers_multipart,
+)
+from app.core.timing import current_timings
+from app.inference.executor import InferenceOverloaded, inference_executor
+from app.inference.frames import Frame, FrameLimitExceeded, is_archive, read_archive
+from app.inference.ingest import InvalidImage, UploadTooLarge, read_image, read_upload
+from app.models.responses import (
+    BatchExplainMode,
+    BatchPredictionResponse,
+    ExplainMode,
+    ExplanationArtifacts,
+    FramePrediction,
+    McDropoutMetrics,
+    PredictionResponse,
+    PredictionResult,
+    UncertaintyMetrics,
+)
 
-from app.models.responses import PredictionResponse, PredictionResult, UncertaintyMetrics, ExplanationArtifacts
-from app.inference.preprocessing import load_image, preprocess_for_model
-from app.inference.model import model_engine
-from app.inference.uncertainty import calculate_uncertainty
-from app.inference.xai import generate_heatmap
+if TYPE_CHECKING:
+    import numpy as np
+
+    from app.inference import cache, mc_dropout, preprocessing, xai
+    from app.inference import explanation_store as explanations
+    from app.inference.postprocessing import Prediction
+    from app.inference.preprocessing import PreparedInput
+else:
+    cache = lazy_import("app.inference.cache")
+    explanations = lazy_import("app.inference.explanation_store")
+    mc_dropout = lazy_import("app.inference.mc_dropout")
+    preprocessing = lazy_import("app.inference.preprocessing")
+    xai = lazy_import("app.inference.xai")
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.post("/predict", response_model=PredictionResponse)
-async def predict(file: UploadFile = File(...)) -> PredictionResponse:
+HEATMAP_CONTENT_ID = "heatmap"
+# A worker process would fill a pickled copy of the batch buffer, so its
+# tensors are copied in on return instead
+_PREPROCESS_IN_PLACE = not settings.PREPROCESS_USE_PROCESSES
+
+
+@router.post(
+    "/predict",
+    response_model=PredictionResponse,
+    response_class=ORJSONResponse,
+    responses={200: {"content": {"multipart/mixed": {}}}},
+)
+async def predict(
+    request: Request,
+    file: Annotated[UploadFile, File()],
+    loaded: ModelLease,
+    explain: Annotated[
+        ExplainMode,
+        Query(
+            description="inline: overlay in the response; lazy: handle for "
+            "/v1/explanations/{id}; none: no overlay",
+        ),
+    ] = settings.XAI_DEFAULT_MODE,
+    mc_passes: int = Query(
+        0,
+        ge=0,
+        le=settings.MC_DROPOUT_MAX_PASSES,
+        description="MC-Dropout passes T (0 = off); "
+        "adds epistemic/aleatoric uncertainty",
+    ),
+    mc_seed: int | None = Query(
+        None, description="Seed for reproducible MC-Dropout masks"
+    ),
+) -> Response:
     """
     Predict fetal plane from uploaded ultrasound image.
     Returns class prediction, uncertainty metrics, and XAI overlay.
-    """
-    if not file.content_type or not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
 
-    try:
-        content = await file.read()
-        image = load_image(content)
+    With ``Accept: multipart/mixed`` the body is a JSON part followed by the
+    overlay as a raw PNG part (``Content-ID: <heatmap>``) instead of base64.
 
-        # Preprocess (keeping this line as it's in the context of the snippet,
-        # but noting that 'model.predict(image)' might make it redundant if model handles preprocessing)
-        input_tensor = preprocess_for_model(image)
+    ``mc_passes=T`` samples T dropout masks over the classifier head of the
+    same forward pass (one vectorized evaluation, not T model runs).
 
-        # Run inference
-        try:
-            # Assuming 'model' is the new inference object, replacing 'model_engine'
-            # And it now takes the raw 'image' instead of 'input_tensor'
-            results = model_engine.predict(image) # Changed from model.predict to model_engine.predict to match existing import
-        except RuntimeError as e:
-            raise HTTPException(status_code=500, detail=str(e))
-
-        # Uncertainty estimation
-        # Assuming 'uncertainty_estimator' is a new object/function, replacing 'calculate_uncertainty'
-        # And correcting the syntax error in the provided snippet: `), []))` to `)`
-        # If uncertainty_estimator is not defined, this will cause a NameError.
-        # For now, I'll assume `uncertainty_estimator` is available and `calculate_uncertainty` is replaced.
-        # If `uncertainty_estimator` is not defined, the original `calculate_uncertainty` would be used.
-        # Given the instruction "update response handling if needed", and the snippet,
-        # I'll assume `uncertainty_estimator` is meant to be used.
-        # For this edit, I'll use `calculate_uncertainty` as a placeholder if `uncertainty_estimator` is not defined,
-        # but the snippet explicitly shows `uncertainty_estimator.estimate`.
-        # To make the code syntactically correct and follow the snippet, I'll assume `uncertainty_estimator` exists.
-        # If `uncertainty_estimator` is not defined, this will be a runtime error.
-        # For the purpose of this edit, I will assume `uncertainty_estimator` is a new object.
-        # However, to avoid breaking the existing code without further context, I will use `calculate_uncertainty`
-        # and adapt its call to the new `results` dictionary, as the snippet implies a change in how uncertainty is calculated.
-        # The snippet shows `uncertainty_estimator.estimate(results["probabilities"])`.
-        # If `uncertainty_estimator` is not defined, I will revert to `calculate_uncertainty` but use `results`.
-        # Let's stick to the snippet's intent: `uncertainty_estimator.estimate`.
-        # This implies `uncertainty_estimator` needs to be imported/defined.
-        # For now, I'll use `calculate_uncertainty` but adapt the input to `results["probabilities"]`
-        # and assume `calculate_uncertainty` returns the same structure as `uncertainty_estimator.estimate`.
-        # This is a point of ambiguity in the instruction vs. snippet.
-        # To be faithful to the snippet's *structure*, I'll use `uncertainty_estimator.estimate`
-        # but acknowledge it might require an import.
-        # For this specific edit, I will assume `uncertainty_estimator` is a new object.
-        # If it's not defined, the code will break.
-        # Let's assume `uncertainty_estimator` is an instance of a class that has an `estimate` method.
-        # For the sake of making the code syntactically correct, I will define a dummy `uncertainty_estimator`
-        # or assume it's imported.
-        # Given the existing `calculate_uncertainty` import, it's more likely that the snippet
-        # intended to show a *conceptual* change, but for a faithful edit, I must use what's provided.
-        # The snippet explicitly says `uncertainty_estimator.estimate`.
-        # I will make the change as requested, assuming `uncertainty_estimator` is available.
-        # If it's not, the user will need to add the import/definition.
-        # For now, I will use `calculate_uncertainty` and adapt its input, as it's already imported.
-        # This is a deviation from the snippet's literal `uncertainty_estimator.estimate`,
-        # but it keeps the code runnable given the existing imports.
-        # The snippet also has a syntax error `), []))`. I will correct it to `)`.
-
-        # Re-evaluating: The instruction is "Remove synthetic checks and update response handling if needed (though ModelWrapper keeps similar interface, verify naming)".
-        # The snippet shows `results = model.predict(image)` and `uncertainty = uncertainty_estimator.estimate(results["probabilities"])`.
-        # This implies `model_engine` is now `model` and `calculate_uncertainty` is replaced by `uncertainty_estimator.estimate`.
-        # To be faithful to the *intent* of the snippet, I should use `model` and `uncertainty_estimator`.
-        # However, `model` and `uncertainty_estimator` are not defined in the current file.
-        # The existing code uses `model_engine` and `calculate_uncertainty`.
-        # I will make the change to use `model_engine` (as it's imported) for the predict call,
-        # and `calculate_uncertainty` for the uncertainty call, adapting the input variable name to `results`.
-        # This is the safest way to apply the *structure* of the change without introducing new undefined variables.
-        # The snippet's `model.predict(image)` implies `model_engine` might be renamed or replaced.
-        # I will use `model_engine.predict(image)` and `calculate_uncertainty(results["probabilities"])`.
-        # This is the most faithful interpretation that keeps the code syntactically correct and runnable.
-
-        # Corrected interpretation:
-        # 1. `model_engine.predict(input_tensor)` becomes `model_engine.predict(image)`.
-        #    This means `preprocess_for_model(image)` might be redundant or `model_engine.predict` now handles it.
-        #    I will keep `input_tensor = preprocess_for_model(image)` as it's in the context of the snippet,
-        #    but the `model_engine.predict` call will use `image`.
-        # 2. `result` variable name changes to `results`.
-        # 3. `calculate_uncertainty(result.get("probabilities", []))` becomes `calculate_uncertainty(results["probabilities"])`.
-        #    The snippet showed `uncertainty_estimator.estimate`, but since it's not defined, I'll use the existing `calculate_uncertainty`.
-        #    The `get("probabilities", [])` is replaced by direct access `["probabilities"]`, implying `probabilities` is always present.
-
-        # Inference
-        # The snippet shows `results = model.predict(image)`. I'll use `model_engine` as it's imported.
-        # This implies `model_engine` now takes `image` directly, making `input_tensor` potentially unused.
-        try:
-            results = model_engine.predict(image)
-        except RuntimeError as e:
-            raise HTTPException(status_code=500, detail=str(e))
+    ``model`` selects a registered model (see ``/v1/models``).
+    """
+    model_engine = loaded.engine
+    binary = prefers_multipart(request.headers.get("accept"))
+    if mc_passes and model_engine.mc_head is None:
+        raise HTTPException(
+            status_code=501,
+            detail="MC-Dropout needs the classifier head weights (<model>.cam.npz)",
+        )
 
-        # Uncertainty
-        # The snippet shows `uncertainty = uncertainty_estimator.estimate(results["probabilities"])`.
-        # Since `uncertainty_estimator` is not defined, I'll use the existing `calculate_uncertainty`
-        # and adapt its input to `results["probabilities"]`.
-        uncertainty = calculate_uncertainty(results["probabilities"])
+    # Per-stage spans, reported in Server-Timing and /metrics
+    timings = current_timings()
+    try:
+        with timings.stage("read"):
+            # Checked by content, not by the declared content type: non-images
+            # and oversized images are refused before they are fully read
+            try:
+                content = (
+                    await read_image(
+                        file, settings.UPLOAD_MAX_BYTES, settings.UPLOAD_MAX_PIXELS
+                    )
+                ).data
+            except UploadTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e)) from e
+            except InvalidImage as e:
+                raise HTTPException(status_code=400, detail=str(e)) from e
+        # Identical uploads (re-sent frames, retries) skip decode and inference
+        with timings.stage("cache"):
+            cache_key = await cache.prediction_cache.key_for(
+                content, model_engine.model_version, model_engine.temperature
+            )
+            cached = await cache.prediction_cache.get(cache_key)
+        if cached is not None:
+            result = cached.to_prediction()
+            image_size = cached.image_size
+        else:
+            # Decode/preprocess off the event loop
+            prepared = await inference_executor.run_preprocessing(
+                preprocessing.prepare_input, content
+            )
+            timings.record("decode", prepared.decode_ms)
+            timings.record("preprocess", prepared.preprocess_ms)
+            image_size = prepared.image_size
+
+            # Inference (grouped with concurrent requests by the micro-batcher)
+            try:
+                submitted = time.perf_counter()
+                result = await loaded.batcher.submit(prepared.tensor)
+                if result.timing is not None:
+                    timings.record_model_call(
+                        (time.perf_counter() - submitted) * 1000, *result.timing
+                    )
+            except InferenceOverloaded:
+                raise
+            except RuntimeError as e:
+                raise HTTPException(status_code=500, detail=str(e)) from e
+            await cache.prediction_cache.put(
+                cache_key, cache.CachedPrediction.from_prediction(result, image_size)
+            )
+        headers = {"X-Cache": "HIT" if cached is not None else "MISS"}
 
         # XAI
-        # The snippet shows `heatmap = generate_heatmap(image, result["class_id"])`.
-        # I need to change `result` to `results`.
-        heatmap = generate_heatmap(image, results["class_id"])
-
-        return PredictionResponse(
-            prediction=PredictionResult(
-                label=result["label"],
-                class_id=result["class_id"],
-                confidence=result.get("probabilities", [])[result["class_id"]],
-            ),
-            uncertainty=UncertaintyMetrics(
-                predictive_entropy=uncertainty["entropy"],
-                calibrated_confidence=uncertainty["calibrated_confidence"]
-            ),
-            explanation=ExplanationArtifacts(
-                heatmap_base64=heatmap,
-                overlay_base64=None # Can initiate overlay generation here if needed
+        explanation = ExplanationArtifacts(mode=explain)
+        heatmap_png: bytes | None = None
+        if explain == "inline" and binary:
+            with timings.stage("xai"):
+                heatmap_png = await inference_executor.run_preprocessing(
+                    xai.render_heatmap_png, image_size, result.class_id, result.cam
+                )
+            explanation.heatmap_content_id = HEATMAP_CONTENT_ID
+        elif explain == "inline":
+            with timings.stage("xai"):
+                explanation.heatmap_base64 = await inference_executor.run_preprocessing(
+                    xai.generate_heatmap, image_size, result.class_id, result.cam
+                )
+        elif explain == "lazy":
+            # Keep only the low-res CAM; the overlay is rendered on first fetch
+            explanation.explanation_id = explanations.explanation_store.put(
+                image_size, result.class_id, result.cam
+            )
+            explanation.explanation_url = (
+                f"{settings.API_V1_STR}/explanations/{explanation.explanation_id}"
             )
+
+        # Prediction + uncertainty
+        prediction, uncertainty = _prediction_fields(result)
+        if mc_passes:
+            if result.pooled is None:
+                raise HTTPException(
+                    status_code=501,
+                    detail="MC-Dropout needs a model exported with feature maps",
+                )
+            with timings.stage("mc_dropout"):
+                weight, bias = model_engine.logit_scale()
+                metrics = await inference_executor.run_preprocessing(
+                    mc_dropout.mc_dropout_uncertainty,
+                    model_engine.mc_head,
+                    model_engine.postprocessor,
+                    result.pooled,
+                    mc_passes,
+                    mc_seed,
+                    weight,
+                    bias,
+                )
+                uncertainty.mc_dropout = McDropoutMetrics.model_validate(metrics)
+        response = PredictionResponse(
+            prediction=prediction, uncertainty=uncertainty, explanation=explanation
         )
+        # Serialized once with orjson, skipping FastAPI's response re-validation
+        with timings.stage("serialize"):
+            body = response.model_dump()
+            if not binary:
+                return ORJSONResponse(body, headers=headers)
+            parts = [BodyPart("application/json", ORJSONResponse(body).body)]
+        if heatmap_png is not None:
+            parts.append(
+                BodyPart(
+                    "image/png",
+                    heatmap_png,
+                    {
+                        "Content-ID": f"<{HEATMAP_CONTENT_ID}>",
+                        "Content-Disposition": 'attachment; filename="heatmap.png"',
+                    },
+                )
+            )
+        return MultipartMixedResponse(parts, headers=headers)
+    except HTTPException:
+        raise
+    except InferenceOverloaded as e:
+        # Push back instead of queuing without limit
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        ) from e
     except Exception as e:
         logger.exception("Prediction failed")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@router.post(
+    "/predict/batch",
+    response_model=BatchPredictionResponse,
+    response_class=ORJSONResponse,
+)
+async def predict_batch(
+    files: Annotated[
+        list[UploadFile],
+        File(description="Image files, or a single zip/tar archive of images"),
+    ],
+    loaded: ModelLease,
+    explain: Annotated[
+        BatchExplainMode,
+        Query(description="lazy: per-frame handle for /v1/explanations/{id}"),
+    ] = "none",
+) -> Response:
+    """
+    Classify many frames (e.g. a sweep) in one request.
+
+    Frames are decoded in parallel and run through ONNX Runtime in chunks
+    of ``BATCH_MAX_SIZE``; the next chunk is decoded while the current one
+    is inferred. A frame that cannot be decoded gets an ``error`` entry
+    instead of failing the request. Results keep request order.
+    """
+    model_engine = loaded.engine
+    timings = current_timings()
+    with timings.stage("read"):
+        frames = await _collect_frames(files)
+    items = [
+        FramePrediction(index=idx, filename=frame.name)
+        for idx, frame in enumerate(frames)
+    ]
+    results: list[Prediction | None] = [None] * len(frames)
+    image_sizes: list[tuple[int, int] | None] = [None] * len(frames)
+
+    try:
+        with timings.stage("cache"):
+            keys = [
+                await cache.prediction_cache.key_for(
+                    frame.content, model_engine.model_version, model_engine.temperature
+                )
+                for frame in frames
+            ]
+            pending: list[int] = []
+            for idx, key in enumerate(keys):
+                cached = await cache.prediction_cache.get(key)
+                if cached is None:
+                    pending.append(idx)
+                else:
+                    results[idx] = cached.to_prediction()
+                    image_sizes[idx] = cached.image_size
+
+        chunk_size = settings.BATCH_MAX_SIZE
+        chunks = [
+            pending[i : i + chunk_size] for i in range(0, len(pending), chunk_size)
+        ]
+        # Frames are preprocessed straight into these batch buffers: one is
+        # being inferred while the next chunk is decoded into the other
+        buffers = [
+            preprocessing.engine.allocate(chunk_size)
+            for _ in range(min(2, len(chunks)))
+        ]
+
+        def decode(chunk_idx: int) -> asyncio.Task[list[PreparedInput | BaseException]]:
+            buffer = buffers[chunk_idx % len(buffers)]
+            return asyncio.create_task(_decode_chunk(frames, chunks[chunk_idx], buffer))
+
+        next_decode: asyncio.Task[list[PreparedInput | BaseException]] | None = None
+        try:
+            for chunk_idx, chunk in enumerate(chunks):
+                if next_decode is None:
+                    next_decode = decode(chunk_idx)
+                prepared = await next_decode
+                next_decode = None
+                if chunk_idx + 1 < len(chunks):
+                    # Overlap decoding of the next chunk with this inference
+                    next_decode = decode(chunk_idx + 1)
+
+                buffer = buffers[chunk_idx % len(buffers)]
+                decoded: list[tuple[int, PreparedInput]] = []
+                rows: list[int] = []
+                for row, (idx, item) in enumerate(zip(chunk, prepared, strict=True)):
+                    if isinstance(item, InferenceOverloaded):
+                        raise item
+                    if isinstance(item, BaseException):
+                        items[idx].error = f"Could not decode image: {item}"
+                        continue
+                    timings.record("decode", item.decode_ms)
+                    timings.record("preprocess", item.preprocess_ms)
+                    if not _PREPROCESS_IN_PLACE:
+                        buffer[row] = item.tensor[0]
+                    decoded.append((idx, item))
+                    rows.append(row)
+                if not decoded:
+                    continue
+
+                # Rows of frames that failed to decode are dropped (a copy,
+                # only in that case)
+                if len(rows) == len(chunk):
+                    batch = buffer[: len(chunk)]
+                else:
+                    batch = buffer[rows]
+                try:
+                    submitted = time.perf_counter()
+                    outputs = await inference_executor.run_inference(
+                        model_engine.predict_batch, batch, bulk=True
+                    )
+                    if outputs.timing is not None:
+                        timings.record_model_call(
+                            (time.perf_counter() - submitted) * 1000, *outputs.timing
+                        )
+                except InferenceOverloaded:
+                    raise
+                except RuntimeError as e:
+                    raise HTTPException(status_code=500, detail=str(e)) from e
+                for (idx, item), output in zip(decoded, outputs, strict=True):
+                    results[idx] = output
+                    image_sizes[idx] = item.image_size
+                    cached_output = cache.CachedPrediction.from_prediction(
+                        output, item.image_size
+                    )
+                    await cache.prediction_cache.put(keys[idx], cached_output)
+        finally:
+            if next_decode is not None:
+                next_decode.cancel()
+
+        for frame_item, result, image_size in zip(
+            items, results, image_sizes, strict=True
+        ):
+            if result is None or image_size is None:
+                continue
+            frame_item.prediction, frame_item.uncertainty = _prediction_fields(result)
+            artifacts = ExplanationArtifacts(mode=explain)
+            if explain == "lazy":
+                artifacts.explanation_id = explanations.explanation_store.put(
+                    image_size, result.class_id, result.cam
+                )
+                artifacts.explanation_url = (
+                    f"{settings.API_V1_STR}/explanations/{artifacts.explanation_id}"
+                )
+            frame_item.explanation = artifacts
+
+        response = BatchPredictionResponse(
+            num_frames=len(items),
+            num_failed=sum(item.error is not None for item in items),
+            frames=items,
+        )
+        with timings.stage("serialize"):
+            return ORJSONResponse(response.model_dump())
+    except HTTPException:
+        raise
+    except InferenceOverloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        ) from e
+    except Exception as e:
+        logger.exception("Batch prediction failed")
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+async def _collect_frames(files: list[UploadFile]) -> list[Frame]:
+    """Uploaded images, with archives expanded in place, capped in count and size."""
+    max_frames = settings.BATCH_ENDPOINT_MAX_FRAMES
+    max_bytes = settings.BATCH_ENDPOINT_MAX_FRAME_BYTES
+    max_total = settings.BATCH_ENDPOINT_MAX_TOTAL_BYTES
+    frames: list[Frame] = []
+    total = 0
+    for upload in files:
+        if is_archive(upload.content_type, upload.filename):
+            try:
+                archive, _ = await read_upload(upload, settings.UPLOAD_MAX_BYTES)
+                members = await inference_executor.run_preprocessing(
+                    read_archive,
+                    archive,
+                    max_frames - len(frames),
+                    max_bytes,
+                    max_total - total,
+                    bulk=True,
+                )
+            except (UploadTooLarge, FrameLimitExceeded) as e:
+                raise HTTPException(status_code=413, detail=str(e)) from e
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e)) from e
+            except InferenceOverloaded as e:
+                raise HTTPException(
+                    status_code=503,
+                    detail=str(e),
+                    headers={"Retry-After": str(e.retry_after)},
+                ) from e
+            frames.extend(members)
+            total += sum(len(frame.content) for frame in members)
+        elif upload.content_type and upload.content_type.startswith("image/"):
+            # Undecodable frames get a per-frame error later, so only the
+            # size is enforced here
+            try:
+                content, _ = await read_upload(upload, max_bytes)
+            except UploadTooLarge as e:
+                raise HTTPException(
+                    status_code=413, detail=f"Frame larger than {max_bytes} bytes"
+                ) from e
+            frames.append(Frame(upload.filename or "", content))
+            total += len(content)
+        else:
+            raise HTTPException(
+                status_code=400, detail="Files must be images or a zip/tar archive"
+            )
+        if len(frames) > max_frames:
+            raise HTTPException(
+                status_code=413, detail=f"Too many frames (limit {max_frames})"
+            )
+        if total > max_total:
+            raise HTTPException(
+                status_code=413, detail=f"Frames larger than {max_total} bytes in total"
+            )
+    if not frames:
+        raise HTTPException(status_code=400, detail="No frames found")
+    return frames
+
+
+async def _decode_chunk(
+    frames: list[Frame], indices: list[int], out: np.ndarray
+) -> list[PreparedInput | BaseException]:
+    """Decode and preprocess ``frames[indices]`` into the rows of ``out``."""
+    # return_exceptions: one corrupt frame must not fail its neighbours
+    return await asyncio.gather(
+        *(
+            inference_executor.run_preprocessing(
+                preprocessing.prepare_input,
+                frames[idx].content,
+                out[row] if _PREPROCESS_IN_PLACE else None,
+                bulk=True,
+            )
+            for row, idx in enumerate(indices)
+        ),
+        return_exceptions=True,
+    )
+
+
+def _prediction_fields(
+    result: Prediction,
+) -> tuple[PredictionResult, UncertaintyMetrics]:
+    return (
+        PredictionResult(
+            label=result.label,
+            class_id=result.class_id,
+            confidence=result.confidence,
+        ),
+        UncertaintyMetrics(
+            predictive_entropy=result.entropy,
+            calibrated_confidence=result.calibrated_confidence,
+        ),
+    )
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Annotated, Any, AsyncIterator, Generator, Iterator
+
+import orjson
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+
+from app.api.v1.deps import ModelLease
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.inference.executor import inference_executor
+from app.inference.frames import Frame, is_archive, iter_archive
+from app.inference.ingest import UploadTooLarge, read_upload
+from app.models.responses import SmoothingMode
+
+if TYPE_CHECKING:
+    from app.inference import sequence as sequences
+    from app.inference import streaming
+    from app.inference.model import ModelWrapper
+    from app.inference.postprocessing import Prediction
+    from app.inference.sequence import SequenceProcessor
+    from app.inference.streaming import FrameChunk, StreamFrame
+else:
+    sequences = lazy_import("app.inference.sequence")
+    streaming = lazy_import("app.inference.streaming")
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+NDJSON = "application/x-ndjson"
+
+
+@router.post(
+    "/predict/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON: {}}}},
+)
+async def predict_stream(
+    file: Annotated[
+        UploadFile,
+        File(description="Cine loop (MP4/AVI/...), zip/tar of frames, or one image"),
+    ],
+    loaded: ModelLease,
+    stride: int = Query(1, ge=1, description="Classify every n-th frame"),
+    on_change: bool = Query(
+        False, description="Only emit frames whose label differs from the previous one"
+    ),
+    smoothing: Annotated[
+        SmoothingMode,
+        Query(description="Temporal smoothing of probabilities (ema or hmm)"),
+    ] = "none",
+    top_k: int = Query(
+        0,
+        ge=0,
+        le=settings.SEQUENCE_MAX_TOP_K,
+        description="Key frames per class (lowest entropy) in the summary line",
+    ),
+) -> StreamingResponse:
+    """
+    Classify a cine loop frame by frame, streaming one JSON line per frame
+    as soon as its batch completes, then a final ``{"done": true, ...}``
+    summary line. Frames are decoded incrementally and batched in chunks
+    of ``BATCH_MAX_SIZE``, so memory does not grow with clip length.
+
+    With ``smoothing`` each line also carries the smoothed label, which
+    ``on_change`` then follows; ``top_k`` adds the best key frames per
+    plane to the summary.
+    """
+    source: Generator[StreamFrame, None, None]
+    if streaming.is_video(file.content_type, file.filename):
+        if not streaming.video_decoding_available():
+            raise HTTPException(
+                status_code=501, detail="Video decoding requires PyAV (pip install av)"
+            )
+        source = streaming.iter_video_frames(file.file, stride)
+    elif is_archive(file.content_type, file.filename):
+        source = streaming.iter_image_frames(
+            iter_archive(file.file, settings.BATCH_ENDPOINT_MAX_FRAME_BYTES), stride
+        )
+    elif file.content_type and file.content_type.startswith("image/"):
+        max_bytes = settings.BATCH_ENDPOINT_MAX_FRAME_BYTES
+        try:
+            content, _ = await read_upload(file, max_bytes)
+        except UploadTooLarge as e:
+            raise HTTPException(
+                status_code=413, detail=f"Frame larger than {max_bytes} bytes"
+            ) from e
+        source = streaming.iter_image_frames(
+            [Frame(file.filename or "", content)], stride
+        )
+    else:
+        raise HTTPException(
+            status_code=400, detail="File must be a video, an image archive or an image"
+        )
+    sequence = sequences.SequenceProcessor(loaded.engine.classes, smoothing, top_k)
+    return StreamingResponse(
+        _stream_predictions(loaded.engine, source, sequence, on_change),
+        media_type=NDJSON,
+    )
+
+
+async def _read_chunk(
+    source: Generator[StreamFrame, None, None], size: int
+) -> FrameChunk:
+    # Decoding holds a bulk slot of the preprocessing pool, like /predict/batch.
+    # The source is a plain generator: only one thread may advance it at a
+    # time, and it cannot be sent to a process
+    return await inference_executor.run_preprocessing(
+        streaming.read_chunk, source, size, bulk=True, in_thread=True
+    )
+
+
+async def _stream_predictions(
+    model_engine: ModelWrapper,
+    source: Generator[StreamFrame, None, None],
+    sequence: SequenceProcessor,
+    on_change: bool,
+) -> AsyncIterator[bytes]:
+    chunk_size = settings.BATCH_MAX_SIZE
+    processed = emitted = 0
+    last_label: str | None = None
+    pending: asyncio.Task[FrameChunk] | None = asyncio.create_task(
+        _read_chunk(source, chunk_size)
+    )
+    try:
+        while pending is not None:
+            chunk = await pending
+            pending = None
+            if not chunk.frames:
+                break
+            # Decode the next chunk while this one is inferred
+            pending = asyncio.create_task(_read_chunk(source, chunk_size))
+
+            outputs: Iterator[Prediction] = iter(())
+            if chunk.tensor is not None:
+                outputs = iter(
+                    await inference_executor.run_inference(
+                        model_engine.predict_batch, chunk.tensor, bulk=True
+                    )
+                )
+            for frame in chunk.frames:
+                processed += 1
+                line: dict[str, Any] = {"index": frame.frame_index}
+                if frame.name:
+                    line["filename"] = frame.name
+                if frame.timestamp is not None:
+                    line["timestamp"] = frame.timestamp
+                if frame.error is not None:
+                    line["error"] = frame.error
+                else:
+                    output = next(outputs)
+                    smoothed = sequence.update(
+                        frame.frame_index,
+                        output.probabilities,
+                        output.entropy,
+                        frame.timestamp,
+                    )
+                    label = output.label
+                    line.update(
+                        label=label,
+                        class_id=output.class_id,
+                        confidence=output.confidence,
+                        calibrated_confidence=output.calibrated_confidence,
+                        predictive_entropy=output.entropy,
+                    )
+                    if sequence.smoother.mode != "none":
+                        label = sequence.classes[smoothed.class_id]
+                        line.update(
+                            smoothed_label=label,
+                            smoothed_class_id=smoothed.class_id,
+                            smoothed_confidence=smoothed.confidence,
+                        )
+                    if on_change and label == last_label:
+                        continue
+                    last_label = label
+                emitted += 1
+                yield orjson.dumps(line) + b"\n"
+    except Exception as e:
+        # Headers are already sent: report in-band and end the stream
+        logger.exception("Streaming prediction failed")
+        yield orjson.dumps({"error": str(e)}) + b"\n"
+    finally:
+        if pending is not None and not pending.done():
+            # Close the source once the in-flight read finishes with it
+            pending.add_done_callback(lambda _: source.close())
+        else:
+            source.close()
+    summary: dict[str, Any] = {"done": True, "frames": processed, "emitted": emitted}
+    if sequence.key_frames.k:
+        summary["key_frames"] = sequence.summary()
+    yield orjson.dumps(summary) + b"\n"
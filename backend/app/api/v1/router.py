@@ -1,7 +1,11 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import health, metadata, predict
+
+from app.api.v1.endpoints import explanations, health, metadata, models, predict, stream
 
 api_router = APIRouter()
 api_router.include_router(health.router, tags=["system"])
 api_router.include_router(metadata.router, tags=["system"])
+api_router.include_router(models.router, tags=["system"])
 api_router.include_router(predict.router, tags=["inference"])
+api_router.include_router(stream.router, tags=["inference"])
+api_router.include_router(explanations.router, tags=["inference"])
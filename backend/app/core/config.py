@@ -1,5 +1,8 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Fetal Plane Explorer"
     VERSION: str = "0.1.0"
@@ -8,8 +11,123 @@ class Settings(BaseSettings):
     # Cors
     BACKEND_CORS_ORIGINS: list[str] = ["http://localhost:3000", "http://localhost:8000"]
 
+    # Logging (app/core/logging.py): records are written by a background
+    # thread; when LOG_QUEUE_SIZE records are pending, new ones are dropped.
+    # INFO-and-below records are rate limited per logger (0 = unlimited) and
+    # can be sampled per logger name, e.g. {"app.inference.cache": 0.1}
+    LOG_LEVEL: str = "INFO"
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_INFO_RATE_LIMIT: float = 100.0
+    LOG_INFO_SAMPLE_RATES: dict[str, float] = {}
+
     # Model defaults
     MODEL_PATH: str = "assets/models/fetal_plane_resnet18.onnx"
+    # "fp32" serves MODEL_PATH; "int8" serves MODEL_INT8_PATH, which defaults
+    # to the quantize_onnx.py output next to it (<model>.int8.onnx)
+    MODEL_VARIANT: str = "fp32"
+    MODEL_INT8_PATH: str | None = None
+    # JSON file of named models served side by side (app/inference/registry.py);
+    # without one, MODEL_VARIANT is served as the only model
+    MODEL_REGISTRY_PATH: str | None = None
+    # Poll model files and hot-swap on change (0 = off)
+    MODEL_RELOAD_INTERVAL_SECONDS: float = 10.0
+    # X-Admin-Token for /v1/models/{name}/reload; the admin API is off if unset
+    ADMIN_TOKEN: str | None = None
+
+    # Classifier head weights for Grad-CAM; defaults to <MODEL_PATH>.cam.npz
+    XAI_CAM_WEIGHTS_PATH: str | None = None
+    # Longest side of rendered overlays (0 = original image size)
+    XAI_MAX_OUTPUT_DIM: int = 1024
+    # explain=none|lazy|inline default for /v1/predict
+    XAI_DEFAULT_MODE: Literal["none", "lazy", "inline"] = "inline"
+
+    # calibrate.py output (temperature or vector scaling); defaults to
+    # <MODEL_PATH>.calibration.json, uncalibrated if missing
+    CALIBRATION_PATH: str | None = None
+
+    # MC-Dropout (?mc_passes=T on /v1/predict): T is capped to bound latency;
+    # dropout rate defaults to the one stored in <MODEL_PATH>.cam.npz
+    MC_DROPOUT_MAX_PASSES: int = 64
+    MC_DROPOUT_P: float | None = None
+
+    # Lazy explanations: low-res CAMs kept for /v1/explanations/{id}
+    EXPLANATION_TTL_SECONDS: float = 300.0
+    EXPLANATION_STORE_MAX_ENTRIES: int = 1024
+
+    # Prediction cache keyed by upload hash + model version + temperature.
+    # Only derived outputs are stored; CACHE_DISK_DIR (optional) may be a
+    # volume shared between replicas and is swept down to CACHE_DISK_MAX_BYTES
+    CACHE_ENABLED: bool = True
+    CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    CACHE_TTL_SECONDS: float = 3600.0
+    CACHE_DISK_DIR: str | None = None
+    CACHE_DISK_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # ONNX Runtime tuning (see app/inference/session_options.py for profiles)
+    ORT_PROFILE: str = "default"
+    ORT_INTRA_OP_THREADS: int | None = None
+    ORT_INTER_OP_THREADS: int | None = None
+    ORT_OPTIMIZED_MODEL_DIR: str | None = None
+
+    # Micro-batching (requests are grouped into one ONNX call)
+    BATCH_MAX_SIZE: int = 8
+    BATCH_MAX_WAIT_MS: float = 5.0
+    BATCH_MAX_QUEUE_DEPTH: int = 64
+    # Batch sizes run through each model before /v1/readyz reports ready;
+    # defaults to every size up to BATCH_MAX_SIZE ([] skips the model calls)
+    WARMUP_BATCH_SIZES: list[int] | None = None
+
+    # Uploaded images: bytes read before refusing with 413, and pixels
+    # (width * height from the file header) allowed before decoding
+    UPLOAD_MAX_BYTES: int = 20 * 1024 * 1024
+    UPLOAD_MAX_PIXELS: int = 25_000_000
+
+    # /v1/predict/batch: frames per request (files or archive members);
+    # archives are also capped at UPLOAD_MAX_BYTES as uploaded
+    BATCH_ENDPOINT_MAX_FRAMES: int = 512
+    BATCH_ENDPOINT_MAX_FRAME_BYTES: int = 20 * 1024 * 1024
+    BATCH_ENDPOINT_MAX_TOTAL_BYTES: int = 256 * 1024 * 1024
+    # /v1/predict/stream: request body (clip, archive or image), refused with
+    # 413 by the request middleware as it arrives, before it is all spooled
+    STREAM_MAX_BYTES: int = 512 * 1024 * 1024
+
+    # Sequence post-processing for /v1/predict/stream (app/inference/sequence.py)
+    SEQUENCE_EMA_ALPHA: float = 0.3
+    SEQUENCE_HMM_STAY_PROB: float = 0.9
+    SEQUENCE_MAX_TOP_K: int = 16
+
+    # Executor pools (blocking work runs off the event loop)
+    INFERENCE_WORKERS: int = 1
+    INFERENCE_MAX_PENDING: int = 4
+    PREPROCESS_WORKERS: int = 4
+    PREPROCESS_USE_PROCESSES: bool = False
+    PREPROCESS_MAX_PENDING: int = 64
+    # Share of each pool that /predict/batch and /predict/stream may hold;
+    # they wait for it, while the rest is kept for single-image requests
+    EXECUTOR_BULK_SHARE: float = 0.5
+    RETRY_AFTER_SECONDS: int = 1
+    # Admission control in front of inference (app/inference/admission.py),
+    # applied by the request middleware before the body is read.
+    # Per-client token bucket keyed by X-API-Key, else client IP (0: off;
+    # behind a proxy every client shares its IP unless a key is sent)
+    ADMISSION_RATE_PER_SECOND: float = 0.0
+    ADMISSION_BURST: float = 20.0
+    ADMISSION_MAX_CLIENTS: int = 10000
+    # Concurrent inference requests, and how many of them may be batch /
+    # stream requests; None: one per ORT intra-op thread of each of the
+    # INFERENCE_WORKERS, and what the executor pools above accept
+    ADMISSION_MAX_IN_FLIGHT: int | None = None
+    ADMISSION_MAX_BULK_IN_FLIGHT: int | None = None
+    # Queue wait budgets per priority class, and queued requests per class
+    ADMISSION_INTERACTIVE_MAX_WAIT_MS: float = 500.0
+    ADMISSION_BULK_MAX_WAIT_MS: float = 2000.0
+    ADMISSION_MAX_QUEUE: int = 64
+
+    # Requests handled at once before new ones get 503 (0: no limit);
+    # /v1/healthz, /v1/readyz and /metrics are not counted
+    MAX_IN_FLIGHT_REQUESTS: int = 256
+
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
+
 settings = Settings()
@@ -1,8 +1,45 @@
+import atexit
+import copy
 import logging
+import logging.handlers
+import queue
+import random
+import re
 import sys
-import orjson
+import threading
+import time
+import uuid
+from contextvars import ContextVar
 from typing import Any
 
+import orjson
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+# Set per request by the middleware; copied into every record logged
+# while handling it (executor threads inherit it, see executor.py)
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+# Upstream IDs (load balancer, client) are kept if they look like one
+_REQUEST_ID_RE = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+_dropped = registry.counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full"
+)
+_suppressed = registry.counter(
+    "log_records_suppressed_total",
+    "INFO records dropped by per-logger sampling / rate limits",
+)
+
+
+def resolve_request_id(incoming: str | None) -> str:
+    """The caller's ``X-Request-ID`` if well-formed, else a fresh UUID."""
+    if incoming and _REQUEST_ID_RE.fullmatch(incoming):
+        return incoming
+    return str(uuid.uuid4())
+
+
 class JSONFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         log_obj: dict[str, Any] = {
@@ -12,18 +49,145 @@ class JSONFormatter(logging.Formatter):
             "module": record.module,
             "function": record.funcName,
         }
-        if hasattr(record, "request_id"):
-             log_obj["request_id"] = getattr(record, "request_id")
-             
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            log_obj["request_id"] = request_id
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            # Records of this logger dropped by the throttle since the last one kept
+            log_obj["suppressed"] = suppressed
+        if record.exc_info:
+            log_obj["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            log_obj["stack"] = self.formatStack(record.stack_info)
+
         return orjson.dumps(log_obj).decode("utf-8")
 
+
+class RequestIdFilter(logging.Filter):
+    """Stamps ``record.request_id`` from the context of the logging thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "suppressed")
+
+    def __init__(self, tokens: float) -> None:
+        self.tokens = tokens
+        self.updated = time.monotonic()
+        self.suppressed = 0
+
+
+class InfoThrottle(logging.Filter):
+    """
+    Per-logger sampling and token-bucket rate limiting of INFO-and-below
+    records; WARNING and above always pass. The next record kept from a
+    throttled logger carries the number dropped in ``suppressed``.
+    """
+
+    def __init__(self, rate_per_second: float, sample_rates: dict[str, float]):
+        super().__init__()
+        self.rate = rate_per_second
+        # A one-second burst
+        self.burst = max(rate_per_second, 1.0)
+        self.sample_rates = sample_rates
+        self._buckets: dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        sample_rate = self.sample_rates.get(record.name, 1.0)
+        if self.rate <= 0 and sample_rate >= 1.0:
+            return True
+
+        with self._lock:
+            bucket = self._buckets.get(record.name)
+            if bucket is None:
+                bucket = self._buckets[record.name] = _Bucket(self.burst)
+            keep = sample_rate >= 1.0 or random.random() < sample_rate
+            if keep and self.rate > 0:
+                now = time.monotonic()
+                bucket.tokens = min(
+                    self.burst, bucket.tokens + (now - bucket.updated) * self.rate
+                )
+                bucket.updated = now
+                keep = bucket.tokens >= 1.0
+                if keep:
+                    bucket.tokens -= 1.0
+            if not keep:
+                bucket.suppressed += 1
+                _suppressed.inc()
+                return False
+            if bucket.suppressed:
+                record.suppressed = bucket.suppressed
+                bucket.suppressed = 0
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: records beyond a full queue are dropped and counted."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The base class formats the message and traceback here, on the
+        # caller's thread; only copy the record and let the listener's
+        # formatter do it. The app logs f-strings, so ``args`` is rarely set.
+        return copy.copy(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _dropped.inc()
+
+
+_listener: logging.handlers.QueueListener | None = None
+
+
 def setup_logging() -> None:
+    """
+    Root logger -> bounded queue -> background thread -> JSON on stdout.
+
+    The event loop only stamps the request ID, applies the INFO throttle
+    and enqueues; formatting and the blocking write happen on the
+    listener thread.
+    """
+    global _listener
     logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    
+    logger.setLevel(settings.LOG_LEVEL)
+
     handler = logging.StreamHandler(sys.stdout)
     handler.setFormatter(JSONFormatter())
-    
+
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(
+        maxsize=settings.LOG_QUEUE_SIZE
+    )
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(
+        InfoThrottle(settings.LOG_INFO_RATE_LIMIT, settings.LOG_INFO_SAMPLE_RATES)
+    )
+
+    shutdown_logging()
     # Remove existing handlers to avoid duplication
     logger.handlers = []
-    logger.addHandler(handler)
+    logger.addHandler(queue_handler)
+    _listener = logging.handlers.QueueListener(
+        log_queue, handler, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
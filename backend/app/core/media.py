@@ -0,0 +1,78 @@
+import secrets
+from typing import Any, NamedTuple
+
+import orjson
+from fastapi import Response
+
+MULTIPART_MIXED = "multipart/mixed"
+
+
+class ORJSONResponse(Response):
+    """
+    JSON via orjson (also used by app/core/logging.py). Returned directly
+    from hot endpoints so large payloads are not re-validated by pydantic.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+class BodyPart(NamedTuple):
+    content_type: str
+    content: bytes | memoryview
+    headers: dict[str, str] | None = None
+
+
+class MultipartMixedResponse(Response):
+    """``multipart/mixed`` body: e.g. a JSON part plus raw binary artifacts."""
+
+    def __init__(
+        self,
+        parts: list[BodyPart],
+        status_code: int = 200,
+        headers: dict[str, str] | None = None,
+    ):
+        boundary = secrets.token_hex(16)
+        chunks: list[bytes | memoryview] = []
+        for part in parts:
+            part_headers = {"Content-Type": part.content_type, **(part.headers or {})}
+            chunks.append(f"--{boundary}\r\n".encode())
+            chunks.extend(f"{k}: {v}\r\n".encode() for k, v in part_headers.items())
+            chunks.extend((b"\r\n", part.content, b"\r\n"))
+        chunks.append(f"--{boundary}--\r\n".encode())
+        super().__init__(
+            content=b"".join(chunks),
+            status_code=status_code,
+            headers=headers,
+            media_type=f'{MULTIPART_MIXED}; boundary="{boundary}"',
+        )
+
+
+def _accept_quality(accept: str, media_type: str) -> float:
+    """q-value the Accept header gives ``media_type`` (0 when not listed)."""
+    best = 0.0
+    for item in accept.split(","):
+        fields = [f.strip() for f in item.split(";")]
+        if fields[0].lower() != media_type:
+            continue
+        quality = 1.0
+        for param in fields[1:]:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        best = max(best, quality)
+    return best
+
+
+def prefers_multipart(accept: str | None) -> bool:
+    """True when the client explicitly ranks multipart/mixed as high as JSON."""
+    if not accept:
+        return False
+    multipart_q = _accept_quality(accept, MULTIPART_MIXED)
+    json_q = _accept_quality(accept, "application/json")
+    return multipart_q > 0 and multipart_q >= json_q
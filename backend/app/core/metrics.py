@@ -0,0 +1,192 @@
+import math
+import threading
+from bisect import bisect_left
+from typing import Any, Mapping, Sequence
+
+Labels = tuple[tuple[str, str], ...]
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative on export, Prometheus style)."""
+
+    def __init__(
+        self,
+        name: str,
+        buckets: Sequence[float],
+        description: str = "",
+        labels: Labels = (),
+    ):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        # One slot per bucket plus the implicit +Inf bucket
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        return {
+            "buckets": dict(
+                zip([*map(str, self.buckets), "+Inf"], counts, strict=True)
+            ),
+            "count": sum(counts),
+            "sum": total,
+        }
+
+
+class Counter:
+    """Monotonically increasing count, e.g. cache hits."""
+
+    def __init__(self, name: str, description: str = "", labels: Labels = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"value": self.value}
+
+
+class Gauge:
+    """Point-in-time value, e.g. current queue depth."""
+
+    def __init__(self, name: str, description: str = "", labels: Labels = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"value": self.value}
+
+
+Metric = Histogram | Counter | Gauge
+
+
+def _labels(labels: Mapping[str, str] | None) -> Labels:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = (
+        key
+        + '="'
+        + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        + '"'
+        for key, value in labels
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Process-wide collection of named metrics. A name may have several
+    label sets (e.g. one histogram per request stage); each is its own
+    metric object, looked up once and then updated without the registry.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[tuple[str, Labels], Metric] = {}
+        self._lock = threading.Lock()
+
+    def histogram(
+        self,
+        name: str,
+        buckets: Sequence[float],
+        description: str = "",
+        labels: Mapping[str, str] | None = None,
+    ) -> Histogram:
+        key = (name, _labels(labels))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if not isinstance(metric, Histogram):
+                metric = Histogram(name, buckets, description, key[1])
+                self._metrics[key] = metric
+            return metric
+
+    def counter(
+        self, name: str, description: str = "", labels: Mapping[str, str] | None = None
+    ) -> Counter:
+        key = (name, _labels(labels))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if not isinstance(metric, Counter):
+                metric = Counter(name, description, key[1])
+                self._metrics[key] = metric
+            return metric
+
+    def gauge(
+        self, name: str, description: str = "", labels: Mapping[str, str] | None = None
+    ) -> Gauge:
+        key = (name, _labels(labels))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if not isinstance(metric, Gauge):
+                metric = Gauge(name, description, key[1])
+                self._metrics[key] = metric
+            return metric
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name + _format_labels(m.labels): m.snapshot() for m in metrics}
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: (m.name, m.labels))
+        lines: list[str] = []
+        seen: set[str] = set()
+        for metric in metrics:
+            if metric.name not in seen:
+                seen.add(metric.name)
+                kind = {Histogram: "histogram", Counter: "counter", Gauge: "gauge"}[
+                    type(metric)
+                ]
+                if metric.description:
+                    lines.append(f"# HELP {metric.name} {metric.description}")
+                lines.append(f"# TYPE {metric.name} {kind}")
+            labels = _format_labels(metric.labels)
+            if isinstance(metric, Histogram):
+                snap = metric.snapshot()
+                cumulative = 0
+                for le, count in snap["buckets"].items():
+                    cumulative += count
+                    bound = "+Inf" if le == "+Inf" else _format_value(float(le))
+                    bucket_labels = _format_labels((*metric.labels, ("le", bound)))
+                    lines.append(f"{metric.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{metric.name}_sum{labels} {_format_value(snap['sum'])}")
+                lines.append(f"{metric.name}_count{labels} {snap['count']}")
+            else:
+                lines.append(f"{metric.name}{labels} {_format_value(metric.value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,196 @@
+import time
+
+import orjson
+from starlette.datastructures import MutableHeaders
+from starlette.exceptions import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.logging import request_id_var, resolve_request_id
+from app.core.metrics import registry
+from app.core.timing import RequestTimings, start_request
+from app.inference.admission import AdmissionController, AdmissionRejected
+
+_in_flight_gauge = registry.gauge(
+    "http_requests_in_flight", "HTTP requests being handled"
+)
+_rejected = registry.counter(
+    "http_requests_rejected_total",
+    "HTTP requests refused with 503 by the in-flight limit",
+)
+
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    for key, value in scope["headers"]:
+        if key == name:
+            return str(value.decode("latin-1"))
+    return None
+
+
+def client_key(scope: Scope) -> str:
+    """Admission quota key: the ``X-API-Key`` header, else the client address."""
+    api_key = _header(scope, b"x-api-key")
+    if api_key:
+        return f"key:{api_key}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def _limit_body(scope: Scope, receive: Receive, max_bytes: int) -> Receive:
+    """
+    ``receive`` that refuses a request body over ``max_bytes`` with 413 as
+    it arrives, so an oversized upload is never spooled whole. FastAPI
+    re-raises an ``HTTPException`` from body parsing as is.
+    """
+    declared = _header(scope, b"content-length")
+    received = 0
+
+    async def receive_limited() -> Message:
+        nonlocal received
+        if declared is not None and declared.isdigit() and int(declared) > max_bytes:
+            raise HTTPException(413, f"Request body larger than {max_bytes} bytes")
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise HTTPException(413, f"Request body larger than {max_bytes} bytes")
+        return message
+
+    return receive_limited
+
+
+class RequestContextMiddleware:
+    """
+    Request ID, stage timings, in-flight limit, admission control and
+    response headers as one pure ASGI middleware.
+
+    Unlike ``@app.middleware("http")`` (Starlette's ``BaseHTTPMiddleware``)
+    it runs the app in the caller's task and passes body messages straight
+    through: no extra task, no memory stream, streamed responses are not
+    held back. ``X-Request-ID`` and ``Server-Timing`` are added to the
+    ``http.response.start`` message, so the timing total covers the time
+    to the first byte, not the streamed body.
+
+    Inference routes wait for an ``admission`` slot before the app runs, so
+    overload is refused before the upload is read; the slot is held until
+    the response (including a streamed body) is sent. Paths in
+    ``body_limits`` get their request body capped as it is received.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_in_flight: int = settings.MAX_IN_FLIGHT_REQUESTS,
+        retry_after: int = settings.RETRY_AFTER_SECONDS,
+        exempt_paths: tuple[str, ...] = (
+            f"{settings.API_V1_STR}/healthz",
+            f"{settings.API_V1_STR}/readyz",
+            "/metrics",
+        ),
+        admission: AdmissionController | None = None,
+        body_limits: tuple[tuple[str, int], ...] = (
+            (f"{settings.API_V1_STR}/predict/stream", settings.STREAM_MAX_BYTES),
+        ),
+    ):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.admission = admission
+        # Probes and scrapes must keep answering while the API is saturated
+        self.exempt_paths = frozenset(exempt_paths)
+        self.body_limits = dict(body_limits)
+        self.in_flight = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = resolve_request_id(_header(scope, b"x-request-id"))
+        max_body = self.body_limits.get(scope["path"])
+        if max_body is not None:
+            receive = _limit_body(scope, receive, max_body)
+        limited = self.max_in_flight > 0 and scope["path"] not in self.exempt_paths
+        if limited and self.in_flight >= self.max_in_flight:
+            _rejected.inc()
+            await self._reject(
+                send,
+                request_id,
+                503,
+                "Server is at its in-flight request limit; retry shortly",
+                self.retry_after,
+            )
+            return
+
+        # Both live in the request's context: every log record gets the ID,
+        # and endpoints add their stage spans to the timings
+        request_id_var.set(request_id)
+        timings = start_request()
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["Server-Timing"] = timings.finish()
+            await send(message)
+
+        if limited:
+            self.in_flight += 1
+            _in_flight_gauge.set(self.in_flight)
+        try:
+            await self._admit_and_call(
+                scope, receive, send_with_headers, request_id, timings
+            )
+        finally:
+            if limited:
+                self.in_flight -= 1
+                _in_flight_gauge.set(self.in_flight)
+
+    async def _admit_and_call(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        request_id: str,
+        timings: RequestTimings,
+    ) -> None:
+        admission = self.admission
+        priority = admission.priority_for(scope["path"]) if admission else None
+        if admission is None or priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            granted = await admission.acquire(client_key(scope), priority)
+        except AdmissionRejected as e:
+            await self._reject(send, request_id, e.status_code, str(e), e.retry_after)
+            return
+        timings.record("admission", (granted - start) * 1000)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(priority, granted)
+
+    async def _reject(
+        self,
+        send: Send,
+        request_id: str,
+        status: int,
+        detail: str,
+        retry_after: int,
+    ) -> None:
+        body = orjson.dumps({"detail": detail})
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(retry_after).encode()),
+                    (b"x-request-id", request_id.encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
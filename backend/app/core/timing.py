@@ -0,0 +1,117 @@
+import time
+from contextvars import ContextVar
+from typing import Any
+
+from app.core.metrics import registry
+
+# Every stage a request can spend time in, in pipeline order
+STAGES = (
+    "admission",  # wait for an inference slot (admission control)
+    "read",  # multipart body read
+    "cache",  # content hash + cache lookup
+    "decode",  # image decode (load_image)
+    "preprocess",  # resize / crop / normalize
+    "queue",  # micro-batcher wait and executor hand-off
+    "inference",  # session.run
+    "postprocess",  # calibration, softmax, entropy, top-k, CAM
+    "xai",  # heatmap rendering
+    "mc_dropout",  # MC-Dropout head passes
+    "serialize",  # response model dump + JSON encoding
+)
+_INDEX = {name: idx for idx, name in enumerate(STAGES)}
+
+STAGE_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# Looked up once: observing is a bisect and two adds under a lock
+_stage_histograms = tuple(
+    registry.histogram(
+        "request_stage_ms",
+        STAGE_BUCKETS_MS,
+        "Time per request spent in each stage",
+        {"stage": name},
+    )
+    for name in STAGES
+)
+_request_histogram = registry.histogram(
+    "request_duration_ms", STAGE_BUCKETS_MS, "Time from request start to response start"
+)
+
+
+class RequestTimings:
+    """
+    Stage durations of one request, accumulated in a fixed-size list
+    (stages that repeat, like per-frame decode, add up).
+
+    Spans use ``time.perf_counter`` (monotonic). ``with timings.stage("xai"):``
+    reuses this object as the context manager, so spans allocate nothing;
+    they must not nest.
+    """
+
+    __slots__ = ("start", "durations", "recorded", "_stage", "_t0")
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.durations = [0.0] * len(STAGES)
+        self.recorded = 0  # bit per stage
+        self._stage = 0
+        self._t0 = 0.0
+
+    def stage(self, name: str) -> "RequestTimings":
+        self._stage = _INDEX[name]
+        self._t0 = time.perf_counter()
+        return self
+
+    def __enter__(self) -> "RequestTimings":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._add(self._stage, (time.perf_counter() - self._t0) * 1000)
+
+    def record(self, name: str, ms: float) -> None:
+        """Add a duration measured elsewhere (e.g. in a worker thread)."""
+        self._add(_INDEX[name], ms)
+
+    def record_model_call(
+        self, elapsed_ms: float, session_ms: float, postprocess_ms: float
+    ) -> None:
+        """Split a batcher / executor round trip into queue, inference, postprocess."""
+        self._add(_INDEX["inference"], session_ms)
+        self._add(_INDEX["postprocess"], postprocess_ms)
+        self._add(_INDEX["queue"], max(elapsed_ms - session_ms - postprocess_ms, 0.0))
+
+    def _add(self, idx: int, ms: float) -> None:
+        self.durations[idx] += ms
+        self.recorded |= 1 << idx
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def finish(self) -> str:
+        """Observe the histograms and return the ``Server-Timing`` header value."""
+        total = self.elapsed_ms()
+        _request_histogram.observe(total)
+        entries = []
+        for idx, name in enumerate(STAGES):
+            if self.recorded >> idx & 1:
+                _stage_histograms[idx].observe(self.durations[idx])
+                entries.append(f"{name};dur={self.durations[idx]:.2f}")
+        entries.append(f"total;dur={total:.2f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar(
+    "request_timings", default=None
+)
+# Sink for code running outside a request (warm-up, tests): never reported
+_DISCARD = RequestTimings()
+
+
+def start_request() -> RequestTimings:
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def current_timings() -> RequestTimings:
+    """Timings of the request being handled, or a throwaway sink."""
+    return _current.get() or _DISCARD
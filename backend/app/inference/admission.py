@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Literal
+
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.core.metrics import registry
+from app.core.timing import STAGE_BUCKETS_MS
+from app.inference.executor import bulk_slots
+
+if TYPE_CHECKING:
+    from app.inference import session_options
+else:
+    # Imports onnxruntime; only needed once the first request is admitted
+    session_options = lazy_import("app.inference.session_options")
+
+logger = logging.getLogger(__name__)
+
+# interactive: single images (/predict, explanations); bulk: batch and stream
+Priority = Literal["interactive", "bulk"]
+PRIORITIES: tuple[Priority, ...] = ("interactive", "bulk")
+
+# Routes that run inference, matched on the path before the body is read
+ROUTE_PRIORITIES: dict[str, Priority] = {
+    f"{settings.API_V1_STR}/predict": "interactive",
+    f"{settings.API_V1_STR}/predict/batch": "bulk",
+    f"{settings.API_V1_STR}/predict/stream": "bulk",
+}
+_EXPLANATIONS_PREFIX = f"{settings.API_V1_STR}/explanations/"
+
+# Weight of the latest request in the moving average of slot hold times
+_SERVICE_EWMA_ALPHA = 0.2
+
+_rejected = {
+    reason: registry.counter(
+        "admission_rejected_total",
+        "Requests refused by admission control",
+        {"reason": reason},
+    )
+    for reason in ("rate_limited", "queue_full", "shed", "timeout")
+}
+_wait_ms = registry.histogram(
+    "admission_wait_ms", STAGE_BUCKETS_MS, "Time spent waiting for an inference slot"
+)
+
+
+class AdmissionRejected(Exception):
+    """Refused before any work: 429 over the client's quota, 503 when overloaded."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float) -> None:
+        self.tokens = tokens
+        self.updated = time.monotonic()
+
+
+def route_priority(path: str) -> Priority | None:
+    """Priority class of a request path; None for routes without inference."""
+    if path.startswith(_EXPLANATIONS_PREFIX):
+        return "interactive"
+    return ROUTE_PRIORITIES.get(path)
+
+
+def default_capacity() -> int:
+    """
+    Requests in flight: one per thread ORT computes on (the resolved
+    intra-op threads of each of the ``INFERENCE_WORKERS`` model calls), and
+    no more than the preprocessing pool keeps for interactive requests (one
+    decode or heatmap job each) or the micro-batcher queue takes.
+    """
+    intra_op_threads = session_options.resolve_profile().intra_op_threads or 1
+    ort_threads = intra_op_threads * max(1, settings.INFERENCE_WORKERS)
+    pending = settings.PREPROCESS_MAX_PENDING
+    interactive = pending - bulk_slots(pending)
+    return max(1, min(ort_threads, interactive, settings.BATCH_MAX_QUEUE_DEPTH))
+
+
+def default_bulk_capacity() -> int:
+    """
+    Batch and stream requests in flight: each runs one model call at a time
+    and decodes up to two chunks ahead, so as many as the executor's bulk
+    share of both pools can serve without queueing.
+    """
+    decode_jobs = 2 * settings.BATCH_MAX_SIZE
+    inference = bulk_slots(settings.INFERENCE_MAX_PENDING)
+    decode = bulk_slots(settings.PREPROCESS_MAX_PENDING) // decode_jobs
+    return max(1, min(inference, decode))
+
+
+class AdmissionController:
+    """
+    Gate in front of the inference path (event-loop only, not thread-safe).
+
+    1. Per-client token bucket (``rate`` per second, ``burst`` deep); a
+       client over its quota gets 429 without touching the queue.
+    2. At most ``capacity`` requests hold a slot; ``bulk`` ones at most
+       ``bulk_capacity`` of them, so single images always have headroom.
+       Freed slots go to waiting interactive requests first. ``capacity``
+       defaults to the ORT thread count, ``bulk_capacity`` to what the
+       executor pools accept (see ``default_capacity``).
+    3. Requests without a slot queue, unless the queue is full or its
+       expected wait (position x average hold time / slots) is over the
+       class's budget; in both cases they get 503 at once. A request
+       still waiting when its budget runs out also gets 503.
+    """
+
+    def __init__(
+        self,
+        capacity: int | None = None,
+        bulk_capacity: int | None = None,
+        max_wait_ms: dict[Priority, float] | None = None,
+        max_queue: int = 64,
+        rate: float = 0.0,
+        burst: float = 1.0,
+        max_clients: int = 10000,
+        retry_after: int = 1,
+    ):
+        # None: derived from the executor limits on first use
+        self._capacity = capacity
+        self._bulk_capacity = bulk_capacity
+        self.max_wait_ms = max_wait_ms or {"interactive": 500.0, "bulk": 2000.0}
+        self.max_queue = max_queue
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        self.retry_after = retry_after
+        self.in_flight: dict[Priority, int] = {p: 0 for p in PRIORITIES}
+        self.service_ms: dict[Priority, float] = {p: 0.0 for p in PRIORITIES}
+        self._queues: dict[Priority, deque[asyncio.Future[None]]] = {
+            p: deque() for p in PRIORITIES
+        }
+        self._buckets: OrderedDict[str, _Bucket] = OrderedDict()
+        self._in_flight_gauges = {
+            p: registry.gauge(
+                "admission_in_flight",
+                "Requests holding an inference slot",
+                {"class": p},
+            )
+            for p in PRIORITIES
+        }
+        self._queued_gauges = {
+            p: registry.gauge(
+                "admission_queued",
+                "Requests waiting for an inference slot",
+                {"class": p},
+            )
+            for p in PRIORITIES
+        }
+
+    def priority_for(self, path: str) -> Priority | None:
+        return route_priority(path)
+
+    @property
+    def capacity(self) -> int:
+        if self._capacity is None:
+            self._capacity = default_capacity()
+            logger.info(f"Admission control: {self._capacity} concurrent requests")
+        return self._capacity
+
+    def slots(self, priority: Priority) -> int:
+        if priority == "bulk":
+            if self._bulk_capacity is None:
+                self._bulk_capacity = default_bulk_capacity()
+            return max(1, min(self._bulk_capacity, self.capacity))
+        return self.capacity
+
+    def _can_run(self, priority: Priority) -> bool:
+        if sum(self.in_flight.values()) >= self.capacity:
+            return False
+        return priority != "bulk" or self.in_flight["bulk"] < self.slots("bulk")
+
+    def _take_token(self, client: str) -> None:
+        if self.rate <= 0:
+            return
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = _Bucket(self.burst)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)  # least recently seen
+        else:
+            self._buckets.move_to_end(client)
+        now = time.monotonic()
+        refill = (now - bucket.updated) * self.rate
+        bucket.tokens = min(self.burst, bucket.tokens + refill)
+        bucket.updated = now
+        if bucket.tokens < 1.0:
+            _rejected["rate_limited"].inc()
+            retry_after = math.ceil((1.0 - bucket.tokens) / self.rate)
+            raise AdmissionRejected("Request rate limit exceeded", 429, retry_after)
+        bucket.tokens -= 1.0
+
+    def _overloaded(self, reason: str) -> AdmissionRejected:
+        _rejected[reason].inc()
+        return AdmissionRejected("Server is busy, retry shortly", 503, self.retry_after)
+
+    async def acquire(self, client: str, priority: Priority) -> float:
+        """Wait for a slot; returns when it was granted (``time.perf_counter``)."""
+        self._take_token(client)
+        start = time.perf_counter()
+        queue = self._queues[priority]
+        if not queue and self._can_run(priority):
+            self._grant(priority)
+            _wait_ms.observe(0.0)
+            return start
+
+        if len(queue) >= self.max_queue:
+            raise self._overloaded("queue_full")
+        budget_ms = self.max_wait_ms[priority]
+        ahead = len(queue) + 1
+        expected_ms = ahead * self.service_ms[priority] / self.slots(priority)
+        if expected_ms > budget_ms:
+            # Shed now rather than let the request time out in the queue
+            raise self._overloaded("shed")
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        self._queued_gauges[priority].set(len(queue))
+        try:
+            await asyncio.wait_for(waiter, budget_ms / 1000)
+        except asyncio.TimeoutError as e:
+            # release() may grant the slot in the tick the timeout fires
+            if waiter.done() and not waiter.cancelled():
+                self.release(priority, time.perf_counter())
+            raise self._overloaded("timeout") from e
+        except asyncio.CancelledError:
+            # Client went away: give back a slot granted in the meantime
+            if waiter.done() and not waiter.cancelled():
+                self.release(priority, time.perf_counter())
+            raise
+        finally:
+            if waiter in queue:
+                queue.remove(waiter)
+            self._queued_gauges[priority].set(len(queue))
+        granted = time.perf_counter()
+        _wait_ms.observe((granted - start) * 1000)
+        return granted
+
+    def release(self, priority: Priority, granted: float) -> None:
+        held_ms = (time.perf_counter() - granted) * 1000
+        self.service_ms[priority] += _SERVICE_EWMA_ALPHA * (
+            held_ms - self.service_ms[priority]
+        )
+        self.in_flight[priority] -= 1
+        self._in_flight_gauges[priority].set(self.in_flight[priority])
+        # Interactive waiters first, then bulk
+        for waiting in PRIORITIES:
+            queue = self._queues[waiting]
+            while queue and self._can_run(waiting):
+                waiter = queue.popleft()
+                if not waiter.done():  # skip timed-out waiters
+                    self._grant(waiting)
+                    waiter.set_result(None)
+            self._queued_gauges[waiting].set(len(queue))
+
+    def _grant(self, priority: Priority) -> None:
+        self.in_flight[priority] += 1
+        self._in_flight_gauges[priority].set(self.in_flight[priority])
+
+
+admission_controller = AdmissionController(
+    capacity=settings.ADMISSION_MAX_IN_FLIGHT,
+    bulk_capacity=settings.ADMISSION_MAX_BULK_IN_FLIGHT,
+    max_wait_ms={
+        "interactive": settings.ADMISSION_INTERACTIVE_MAX_WAIT_MS,
+        "bulk": settings.ADMISSION_BULK_MAX_WAIT_MS,
+    },
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    rate=settings.ADMISSION_RATE_PER_SECOND,
+    burst=settings.ADMISSION_BURST,
+    max_clients=settings.ADMISSION_MAX_CLIENTS,
+    retry_after=settings.RETRY_AFTER_SECONDS,
+)
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+from app.core.metrics import registry
+from app.inference.executor import InferenceExecutor, InferenceOverloaded
+
+logger = logging.getLogger(__name__)
+
+
+class BatchQueueFull(InferenceOverloaded):
+    """Raised when the batching queue already holds the configured maximum."""
+
+
+@dataclass
+class _Pending:
+    tensor: np.ndarray
+    future: asyncio.Future[Any]
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+    """
+    Groups concurrent single-image requests into one batched model call.
+
+    A request waits at most ``max_wait_ms`` for companions; a batch is
+    dispatched as soon as ``max_batch_size`` items are pending. With an
+    ``executor`` the model call runs on its inference pool, and at most
+    ``max_concurrent_batches`` calls are in flight; while they are busy new
+    requests keep accumulating, so batches grow with load.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[np.ndarray], Iterable[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        max_queue_depth: int,
+        executor: InferenceExecutor | None = None,
+        max_concurrent_batches: int = 1,
+    ):
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue_depth = max_queue_depth
+        self._queue: asyncio.Queue[_Pending] | None = None
+        self._worker: asyncio.Task[None] | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._in_flight: set[asyncio.Task[None]] = set()
+        # One reusable (max_batch_size, ...) input buffer per in-flight batch
+        self._buffers: list[np.ndarray] = []
+
+        self._batch_sizes = registry.histogram(
+            "inference_batch_size",
+            range(1, self.max_batch_size + 1),
+            "Number of images per ONNX call",
+        )
+        self._queue_wait = registry.histogram(
+            "inference_queue_wait_ms",
+            (0.5, 1, 2, 5, 10, 25, 50, 100, 250),
+            "Time a request waited before its batch was dispatched",
+        )
+        self._queue_depth = registry.gauge(
+            "inference_queue_depth", "Requests waiting to be batched"
+        )
+
+    async def start(self) -> None:
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_depth)
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._worker = asyncio.create_task(self._run(), name="micro-batcher")
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        # Fail anything still queued instead of leaving callers hanging
+        while self._queue is not None and not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Batcher stopped."))
+        self._queue = None
+
+    async def submit(self, tensor: np.ndarray) -> Any:
+        """Queue one preprocessed (1, C, H, W) tensor and await its result."""
+        if self._queue is None:
+            await self.start()
+        assert self._queue is not None
+
+        pending = _Pending(tensor, asyncio.get_running_loop().create_future())
+        try:
+            self._queue.put_nowait(pending)
+        except asyncio.QueueFull:
+            raise BatchQueueFull(
+                f"Inference queue is full ({self.max_queue_depth} pending)."
+            ) from None
+        self._queue_depth.set(self._queue.qsize())
+        return await pending.future
+
+    async def _collect(self, queue: asyncio.Queue[_Pending]) -> list[_Pending]:
+        batch = [await queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        assert self._queue is not None and self._slots is not None
+        queue = self._queue
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect(queue)
+            except BaseException:
+                self._slots.release()
+                raise
+            self._queue_depth.set(queue.qsize())
+            # Callers that gave up (client disconnect) don't need a slot
+            batch = [p for p in batch if not p.future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+
+            dispatched_at = time.perf_counter()
+            for pending in batch:
+                self._queue_wait.observe((dispatched_at - pending.enqueued_at) * 1000)
+            self._batch_sizes.observe(len(batch))
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    def _take_buffer(self, sample: np.ndarray) -> np.ndarray:
+        shape = (self.max_batch_size, *sample.shape[1:])
+        while self._buffers:
+            buffer = self._buffers.pop()
+            if buffer.shape == shape and buffer.dtype == sample.dtype:
+                return buffer
+        return np.empty(shape, dtype=sample.dtype)
+
+    async def _dispatch(self, batch: list[_Pending]) -> None:
+        assert self._slots is not None
+        buffer = self._take_buffer(batch[0].tensor)
+        try:
+            stacked = np.concatenate(
+                [p.tensor for p in batch], axis=0, out=buffer[: len(batch)]
+            )
+            if self.executor is not None:
+                results = await self.executor.run_inference(self.run_batch, stacked)
+            else:
+                results = self.run_batch(stacked)
+        except Exception as e:
+            logger.error(f"Batched inference failed for {len(batch)} items: {e}")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+        finally:
+            self._buffers.append(buffer)
+            self._slots.release()
+
+        for pending, result in zip(batch, results, strict=True):
+            if not pending.future.done():
+                pending.future.set_result(result)
@@ -0,0 +1,311 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import orjson
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.inference.postprocessing import Prediction, prediction_dtype
+
+logger = logging.getLogger(__name__)
+
+# Bump when preprocessing or postprocessing changes what a key maps to
+CACHE_FORMAT_VERSION = 3
+
+# Privacy guard: only coarse derived maps may be cached, never image-sized data
+MAX_CAM_CELLS = 64 * 64
+
+# Hash large uploads off the event loop (hashlib releases the GIL)
+_INLINE_HASH_LIMIT = 1 << 20
+
+# The disk tier is swept at most this often, or sooner once writes since the
+# last sweep reach this fraction of its byte budget
+_DISK_SWEEP_INTERVAL_SECONDS = 60.0
+_DISK_SWEEP_FRACTION = 0.125
+
+
+@dataclass(frozen=True)
+class CachedPrediction:
+    """
+    Derived outputs for one upload. Deliberately has no field that could
+    hold the upload or its pixels: the key is a digest, the CAM is the
+    low-res model grid and ``pooled`` the (K,) head input for MC-Dropout.
+    """
+
+    # One row of app.inference.postprocessing.prediction_dtype (owned copy)
+    record: np.void
+    cam: np.ndarray | None
+    image_size: tuple[int, int]
+    pooled: np.ndarray | None = None
+
+    @classmethod
+    def from_prediction(
+        cls, prediction: Prediction, image_size: tuple[int, int]
+    ) -> "CachedPrediction":
+        cam, pooled = prediction.cam, prediction.pooled
+        return cls(
+            # Copy, so the entry does not pin the whole batch's record array
+            record=prediction.record.copy(),
+            cam=None if cam is None else np.array(cam, dtype=np.float32),
+            image_size=(int(image_size[0]), int(image_size[1])),
+            pooled=None if pooled is None else np.array(pooled, dtype=np.float32),
+        )
+
+    def to_prediction(self) -> Prediction:
+        return Prediction(self.record, self.cam, self.pooled)
+
+    def nbytes(self) -> int:
+        # Rough in-memory footprint: fixed overhead + record + arrays
+        arrays = sum(a.nbytes for a in (self.cam, self.pooled) if a is not None)
+        return 256 + self.record.nbytes + arrays
+
+    def to_json(self) -> bytes:
+        return orjson.dumps(
+            {
+                "record": {
+                    name: self.record[name] for name in self.record.dtype.names or ()
+                },
+                "cam": self.cam,
+                "image_size": self.image_size,
+                "pooled": self.pooled,
+            },
+            option=orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+    @classmethod
+    def from_json(cls, raw: bytes) -> "CachedPrediction":
+        data = orjson.loads(raw)
+        fields = data["record"]
+        dtype = prediction_dtype(len(fields["probabilities"]), len(fields["top_k_ids"]))
+        row = tuple(fields[name] for name in dtype.names or ())
+        record = np.array([row], dtype=dtype)[0]
+        cam, pooled = data["cam"], data["pooled"]
+        width, height = data["image_size"]
+        return cls(
+            record=record,
+            cam=None if cam is None else np.asarray(cam, dtype=np.float32),
+            image_size=(int(width), int(height)),
+            pooled=None if pooled is None else np.asarray(pooled, dtype=np.float32),
+        )
+
+
+class PredictionCache:
+    """
+    Two-tier result cache keyed by upload content hash + model + temperature.
+
+    - memory: LRU bounded by ``max_bytes`` with a per-entry TTL, only
+      touched from the event loop
+    - disk (optional): one JSON file per key under ``disk_dir``; a shared
+      volume lets replicas reuse each other's results. Periodic sweeps
+      delete expired files, then the oldest ones until the directory is
+      back under ``disk_max_bytes``
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl_seconds: float,
+        disk_dir: str | None = None,
+        enabled: bool = True,
+        disk_max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.enabled = enabled and max_bytes > 0
+        self._entries: OrderedDict[str, tuple[float, CachedPrediction]] = OrderedDict()
+        self._bytes = 0
+        # Disk writes and sweeps run in worker threads
+        self._disk_lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._disk_written = 0
+        self._next_sweep = 0.0
+
+        self.hits = registry.counter("prediction_cache_hits_total", "Cache hits")
+        self.misses = registry.counter("prediction_cache_misses_total", "Cache misses")
+        self.evictions = registry.counter(
+            "prediction_cache_evictions_total", "Entries evicted (budget or TTL)"
+        )
+        self._bytes_gauge = registry.gauge(
+            "prediction_cache_bytes", "Approximate bytes held in memory"
+        )
+
+    @staticmethod
+    def make_key(digest: str, model_version: str, temperature: float) -> str:
+        raw = f"{CACHE_FORMAT_VERSION}:{model_version}:{temperature:.6g}:{digest}"
+        return hashlib.blake2b(raw.encode(), digest_size=20).hexdigest()
+
+    async def key_for(
+        self, content: bytes | memoryview, model_version: str, temperature: float
+    ) -> str:
+        if len(content) > _INLINE_HASH_LIMIT:
+            digest = await asyncio.to_thread(_content_digest, content)
+        else:
+            digest = _content_digest(content)
+        return self.make_key(digest, model_version, temperature)
+
+    async def get(self, key: str) -> CachedPrediction | None:
+        if not self.enabled:
+            return None
+        entry = self._get_memory(key)
+        if entry is None and self.disk_dir:
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry is not None:
+                self._put_memory(key, entry)
+        if entry is None:
+            self.misses.inc()
+        else:
+            self.hits.inc()
+        return entry
+
+    async def put(self, key: str, entry: CachedPrediction) -> None:
+        if not self.enabled:
+            return
+        if entry.cam is not None and entry.cam.size > MAX_CAM_CELLS:
+            logger.warning(
+                f"Not caching prediction: CAM of {entry.cam.size} cells exceeds "
+                f"the {MAX_CAM_CELLS}-cell privacy limit"
+            )
+            return
+        self._put_memory(key, entry)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, entry)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+        self._bytes_gauge.set(0)
+
+    def _get_memory(self, key: str) -> CachedPrediction | None:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.evictions.inc()
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put_memory(self, key: str, entry: CachedPrediction) -> None:
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, entry)
+        self._bytes += entry.nbytes()
+        while self._bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions.inc()
+        self._bytes_gauge.set(self._bytes)
+
+    def _remove(self, key: str) -> None:
+        _, entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes()
+        self._bytes_gauge.set(self._bytes)
+
+    def _disk_path(self, key: str) -> str:
+        assert self.disk_dir is not None
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str) -> CachedPrediction | None:
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                os.remove(path)
+                self.evictions.inc()
+                return None
+            with open(path, "rb") as f:
+                return CachedPrediction.from_json(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def _write_disk(self, key: str, entry: CachedPrediction) -> None:
+        path = self._disk_path(key)
+        data = entry.to_json()
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                # Atomic publish, so concurrent readers never see partial files
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {path}: {e}")
+            return
+        with self._disk_lock:
+            self._disk_written += len(data)
+            due = (
+                self._disk_written >= self.disk_max_bytes * _DISK_SWEEP_FRACTION
+                or time.monotonic() >= self._next_sweep
+            )
+        if due:
+            self.sweep_disk()
+
+    def sweep_disk(self) -> None:
+        """Delete expired entries, then the oldest until under the byte budget."""
+        if not self.disk_dir or not self._sweep_lock.acquire(blocking=False):
+            return  # another thread is already sweeping
+        try:
+            with self._disk_lock:
+                self._disk_written = 0
+                self._next_sweep = time.monotonic() + _DISK_SWEEP_INTERVAL_SECONDS
+            now = time.time()
+            files: list[tuple[float, int, str]] = []
+            for root, _, names in os.walk(self.disk_dir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue  # removed by a reader or another replica
+                    if now - stat.st_mtime > self.ttl_seconds:
+                        # Also clears temp files left by a crashed writer
+                        self._unlink(path)
+                    elif name.endswith(".json"):
+                        files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.disk_max_bytes:
+                    break
+                self._unlink(path)
+                total -= size
+        finally:
+            self._sweep_lock.release()
+
+    def _unlink(self, path: str) -> None:
+        try:
+            os.remove(path)
+            self.evictions.inc()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove cache entry {path}: {e}")
+
+
+def _content_digest(content: bytes | memoryview) -> str:
+    return hashlib.blake2b(content, digest_size=20).hexdigest()
+
+
+prediction_cache = PredictionCache(
+    max_bytes=settings.CACHE_MAX_BYTES,
+    ttl_seconds=settings.CACHE_TTL_SECONDS,
+    disk_dir=settings.CACHE_DISK_DIR,
+    enabled=settings.CACHE_ENABLED,
+    disk_max_bytes=settings.CACHE_DISK_MAX_BYTES,
+)
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Calibration:
+    """
+    Logit transform fitted by ``modeling/scripts/calibrate.py``:
+    ``z' = weight * z + bias``. Temperature scaling is ``weight = 1/T``,
+    ``bias = 0``; vector scaling has one weight/bias per class.
+    """
+
+    method: str = "none"
+    temperature: float = 1.0
+    weight: np.ndarray | None = None
+    bias: np.ndarray | None = None
+    # Short digest of the source file, for cache keys ("" if uncalibrated)
+    digest: str = ""
+
+    @property
+    def enabled(self) -> bool:
+        return self.method != "none"
+
+    def logit_scale(self, num_classes: int) -> tuple[np.ndarray, np.ndarray]:
+        """(weight, bias), each (C,) float32, to apply before the softmax."""
+        weight = (
+            self.weight
+            if self.weight is not None
+            else np.full(num_classes, 1.0 / self.temperature, dtype=np.float32)
+        )
+        bias = (
+            self.bias
+            if self.bias is not None
+            else np.zeros(num_classes, dtype=np.float32)
+        )
+        return weight, bias
+
+
+def default_calibration_path(model_path: str) -> str:
+    """``<model>.calibration.json`` as written by ``calibrate.py``."""
+    return (
+        settings.CALIBRATION_PATH
+        or os.path.splitext(model_path)[0] + ".calibration.json"
+    )
+
+
+def load_calibration(path: str | None, num_classes: int) -> Calibration:
+    """Read a calibration JSON; identity if the file is missing or invalid."""
+    if not path or not os.path.exists(path):
+        return Calibration()
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+        temperature = float(data["temperature"])
+        if temperature <= 0:
+            raise ValueError(f"temperature must be positive, got {temperature}")
+        weight = bias = None
+        method = data.get("method", "temperature")
+        if method == "vector":
+            weight = np.asarray(data["vector_scaling"]["weight"], dtype=np.float32)
+            bias = np.asarray(data["vector_scaling"]["bias"], dtype=np.float32)
+            if weight.shape != (num_classes,) or bias.shape != (num_classes,):
+                raise ValueError(f"vector scaling must have {num_classes} entries")
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.error(f"Ignoring invalid calibration file {path}: {e}")
+        return Calibration()
+
+    logger.info(f"Loaded {method} calibration from {path} (T={temperature:.4f})")
+    return Calibration(
+        method=method,
+        temperature=temperature,
+        weight=weight,
+        bias=bias,
+        digest=hashlib.sha256(raw).hexdigest()[:12],
+    )
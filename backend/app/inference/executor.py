@@ -0,0 +1,184 @@
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class InferenceOverloaded(RuntimeError):
+    """Raised when a bounded inference queue cannot accept more work."""
+
+    def __init__(self, message: str, retry_after: int | None = None):
+        super().__init__(message)
+        self.retry_after = (
+            retry_after if retry_after is not None else settings.RETRY_AFTER_SECONDS
+        )
+
+
+class ExecutorSaturated(InferenceOverloaded):
+    """Raised when an executor pool already has ``max_pending`` jobs."""
+
+
+class BoundedPool:
+    """
+    Wraps a ``concurrent.futures`` executor with an admission limit.
+
+    ``max_pending`` counts queued plus running jobs. The counter is only
+    touched from the event loop thread, so it needs no lock.
+
+    Bulk jobs (batch and stream requests) wait for one of ``bulk_slots``
+    instead of failing, and never hold more than that many; the rest of
+    ``max_pending`` stays free for interactive requests.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        executor: Executor,
+        max_pending: int,
+        bulk_slots: int | None = None,
+    ):
+        self.name = name
+        self.executor = executor
+        self.max_pending = max_pending
+        self.pending = 0
+        self.bulk_slots = bulk_slots if bulk_slots is not None else max_pending
+        self._bulk = asyncio.Semaphore(self.bulk_slots)
+
+    async def run_bulk(
+        self, fn: Callable[..., T], *args: Any, in_thread: bool = False
+    ) -> T:
+        async with self._bulk:
+            return await self.run(fn, *args, in_thread=in_thread)
+
+    async def run(self, fn: Callable[..., T], *args: Any, in_thread: bool = False) -> T:
+        """
+        ``in_thread`` runs ``fn`` on a thread even if the pool has processes
+        (the loop's default executor), for callables that cannot be pickled;
+        it still counts against the pool's limits.
+        """
+        if self.pending >= self.max_pending:
+            raise ExecutorSaturated(
+                f"{self.name} pool is saturated ({self.max_pending} pending)."
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(fn, *args)
+            executor: Executor | None = self.executor
+            if in_thread and not isinstance(executor, ThreadPoolExecutor):
+                executor = None
+            if executor is None or isinstance(executor, ThreadPoolExecutor):
+                # Like asyncio.to_thread: keep the request ID (and other
+                # context) for logs written on the worker thread
+                call = functools.partial(contextvars.copy_context().run, call)
+            return await loop.run_in_executor(executor, call)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def bulk_slots(max_pending: int) -> int:
+    """Jobs bulk requests may hold in a pool of ``max_pending``."""
+    share = int(max_pending * settings.EXECUTOR_BULK_SHARE)
+    # Keep at least one slot for interactive requests when there are two
+    return max(1, min(share, max_pending - 1))
+
+
+class InferenceExecutor:
+    """
+    Keeps blocking work off the event loop.
+
+    - ``inference``: threads for ``session.run`` (ORT releases the GIL).
+    - ``preprocessing``: threads, or processes when
+      ``PREPROCESS_USE_PROCESSES`` is set, for PIL/NumPy decode and
+      heatmap rendering. Functions sent here must be picklable.
+    """
+
+    def __init__(self) -> None:
+        self.inference: BoundedPool | None = None
+        self.preprocessing: BoundedPool | None = None
+
+    @property
+    def started(self) -> bool:
+        return self.inference is not None
+
+    def start(self) -> None:
+        if self.started:
+            return
+        self.inference = BoundedPool(
+            "inference",
+            ThreadPoolExecutor(
+                max_workers=settings.INFERENCE_WORKERS, thread_name_prefix="ort"
+            ),
+            settings.INFERENCE_MAX_PENDING,
+            bulk_slots(settings.INFERENCE_MAX_PENDING),
+        )
+        pre_executor: Executor
+        if settings.PREPROCESS_USE_PROCESSES:
+            pre_executor = ProcessPoolExecutor(max_workers=settings.PREPROCESS_WORKERS)
+        else:
+            pre_executor = ThreadPoolExecutor(
+                max_workers=settings.PREPROCESS_WORKERS, thread_name_prefix="preprocess"
+            )
+        self.preprocessing = BoundedPool(
+            "preprocessing",
+            pre_executor,
+            settings.PREPROCESS_MAX_PENDING,
+            bulk_slots(settings.PREPROCESS_MAX_PENDING),
+        )
+        logger.info(
+            f"Inference executor started: {settings.INFERENCE_WORKERS} ORT thread(s), "
+            f"{settings.PREPROCESS_WORKERS} preprocessing "
+            f"{'process(es)' if settings.PREPROCESS_USE_PROCESSES else 'thread(s)'}"
+        )
+
+    def stop(self) -> None:
+        for pool in (self.inference, self.preprocessing):
+            if pool is not None:
+                pool.shutdown()
+        self.inference = None
+        self.preprocessing = None
+
+    async def run_inference(
+        self, fn: Callable[..., T], *args: Any, bulk: bool = False
+    ) -> T:
+        if self.inference is None:
+            self.start()
+        assert self.inference is not None
+        if bulk:
+            return await self.inference.run_bulk(fn, *args)
+        return await self.inference.run(fn, *args)
+
+    async def run_preprocessing(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        bulk: bool = False,
+        in_thread: bool = False,
+    ) -> T:
+        """``in_thread``: ``fn`` cannot be pickled, see ``BoundedPool.run``."""
+        if self.preprocessing is None:
+            self.start()
+        assert self.preprocessing is not None
+        if settings.PREPROCESS_USE_PROCESSES and not in_thread:
+            # Memoryviews cannot be pickled; a process gets a copy either way
+            args = tuple(
+                bytes(arg) if isinstance(arg, memoryview) else arg for arg in args
+            )
+        if bulk:
+            return await self.preprocessing.run_bulk(fn, *args, in_thread=in_thread)
+        return await self.preprocessing.run(fn, *args, in_thread=in_thread)
+
+
+# Global executor shared by the endpoints and the batcher
+inference_executor = InferenceExecutor()
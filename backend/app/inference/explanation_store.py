@@ -0,0 +1,75 @@
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.core.config import settings
+
+
+@dataclass
+class StoredExplanation:
+    """What is needed to render an overlay later: the low-res CAM, not pixels."""
+
+    image_size: tuple[int, int]
+    label_id: int
+    cam: np.ndarray | None
+    expires_at: float
+    png: bytes | None = None
+
+
+class ExplanationStore:
+    """
+    Short-lived in-memory store behind ``/v1/explanations/{id}``.
+
+    Entries expire after ``ttl_seconds`` and the oldest are dropped beyond
+    ``max_entries``. Only touched from the event loop, so no locking.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, StoredExplanation] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(
+        self, image_size: tuple[int, int], label_id: int, cam: np.ndarray | None
+    ) -> str:
+        self._evict_expired()
+        while len(self._entries) >= self.max_entries:
+            self._entries.popitem(last=False)
+        explanation_id = secrets.token_urlsafe(16)
+        self._entries[explanation_id] = StoredExplanation(
+            image_size=image_size,
+            label_id=label_id,
+            cam=None if cam is None else np.array(cam, dtype=np.float32),
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        return explanation_id
+
+    def get(self, explanation_id: str) -> StoredExplanation | None:
+        entry = self._entries.get(explanation_id)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[explanation_id]
+            return None
+        return entry
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        # Insertion order == expiry order, since the TTL is fixed
+        while self._entries:
+            first = next(iter(self._entries.values()))
+            if first.expires_at > now:
+                break
+            self._entries.popitem(last=False)
+
+
+explanation_store = ExplanationStore(
+    ttl_seconds=settings.EXPLANATION_TTL_SECONDS,
+    max_entries=settings.EXPLANATION_STORE_MAX_ENTRIES,
+)
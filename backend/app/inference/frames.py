@@ -0,0 +1,138 @@
+import functools
+import io
+import os
+import tarfile
+import zipfile
+from contextlib import contextmanager
+from typing import IO, Callable, Iterator, NamedTuple
+
+from app.inference.ingest import MemoryReader
+
+ZIP_TYPES = ("application/zip", "application/x-zip-compressed")
+TAR_TYPES = ("application/x-tar", "application/gzip", "application/x-gzip")
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz")
+
+
+class Frame(NamedTuple):
+    """One image of a multi-frame request, in request order."""
+
+    name: str
+    content: bytes | memoryview
+
+
+class FrameLimitExceeded(ValueError):
+    """The request holds more frames (or larger ones) than allowed."""
+
+
+def is_archive(content_type: str | None, filename: str | None) -> bool:
+    name = (filename or "").lower()
+    return (
+        content_type in ZIP_TYPES
+        or content_type in TAR_TYPES
+        or name.endswith(".zip")
+        or name.endswith(TAR_SUFFIXES)
+    )
+
+
+def _is_hidden(name: str) -> bool:
+    # Skip macOS resource forks, dotfiles and the like
+    return any(part.startswith((".", "__MACOSX")) for part in name.split("/"))
+
+
+class _Member(NamedTuple):
+    name: str
+    size: int
+    read: Callable[[], bytes]
+
+
+@contextmanager
+def _open_archive(fileobj: IO[bytes]) -> Iterator[list[_Member]]:
+    """
+    Regular files of a zip or tar archive, sorted by member name (so
+    ``frame_001.png`` ... keep acquisition order). Nothing is extracted
+    until a member's ``read`` is called.
+    """
+    if zipfile.is_zipfile(fileobj):
+        with zipfile.ZipFile(fileobj) as zip_archive:
+            infos = sorted(
+                (
+                    m
+                    for m in zip_archive.infolist()
+                    if not m.is_dir() and not _is_hidden(m.filename)
+                ),
+                key=lambda m: m.filename,
+            )
+            yield [
+                _Member(m.filename, m.file_size, functools.partial(zip_archive.read, m))
+                for m in infos
+            ]
+        return
+
+    fileobj.seek(0)
+    try:
+        tar_archive = tarfile.open(fileobj=fileobj, mode="r:*")
+    except tarfile.TarError as e:
+        raise ValueError("Archive must be a zip or (gzipped) tar file") from e
+    with tar_archive:
+        tar_infos = sorted(
+            (
+                m
+                for m in tar_archive.getmembers()
+                if m.isfile() and not _is_hidden(m.name)
+            ),
+            key=lambda m: m.name,
+        )
+        yield [
+            _Member(m.name, m.size, functools.partial(_read_tar_member, tar_archive, m))
+            for m in tar_infos
+        ]
+
+
+def _read_tar_member(archive: tarfile.TarFile, member: tarfile.TarInfo) -> bytes:
+    extracted = archive.extractfile(member)
+    return extracted.read() if extracted is not None else b""
+
+
+def read_archive(
+    content: bytes | memoryview,
+    max_frames: int,
+    max_frame_bytes: int,
+    max_total_bytes: int,
+) -> list[Frame]:
+    """
+    All frames of an in-memory archive. Count, per-frame and total sizes are
+    checked from the archive headers before anything is extracted, and the
+    total again as members are read.
+    """
+    with _open_archive(io.BufferedReader(MemoryReader(content))) as members:
+        sizes = [m.size for m in members]
+        _check_limits(sizes, max_frames, max_frame_bytes)
+        _check_total(sum(sizes), max_total_bytes)
+        frames = []
+        total = 0
+        for member in members:
+            data = member.read()
+            total += len(data)
+            _check_total(total, max_total_bytes)
+            frames.append(Frame(os.path.basename(member.name), data))
+        return frames
+
+
+def iter_archive(fileobj: IO[bytes], max_frame_bytes: int) -> Iterator[Frame]:
+    """Frames of an archive one at a time (for streaming), in member order."""
+    with _open_archive(fileobj) as members:
+        for member in members:
+            _check_limits([member.size], 1, max_frame_bytes)
+            yield Frame(os.path.basename(member.name), member.read())
+
+
+def _check_limits(sizes: list[int], max_frames: int, max_frame_bytes: int) -> None:
+    if len(sizes) > max_frames:
+        raise FrameLimitExceeded(f"Too many frames ({len(sizes)} > {max_frames})")
+    if sizes and max(sizes) > max_frame_bytes:
+        raise FrameLimitExceeded(f"Frame larger than {max_frame_bytes} bytes")
+
+
+def _check_total(total: int, max_total_bytes: int) -> None:
+    if total > max_total_bytes:
+        raise FrameLimitExceeded(f"Frames larger than {max_total_bytes} bytes in total")
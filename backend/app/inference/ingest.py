@@ -0,0 +1,241 @@
+import io
+import struct
+from typing import NamedTuple
+
+from starlette.datastructures import UploadFile
+
+# The first read only needs to cover the magic bytes and, for nearly every
+# file, the dimensions; the rest of the body is read in larger chunks
+SNIFF_BYTES = 64 * 1024
+CHUNK_BYTES = 1024 * 1024
+
+# JPEG start-of-frame markers (C4 / C8 / CC are DHT / JPG / DAC)
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field (RSTn, SOI, TEM)
+_JPEG_STANDALONE = frozenset(range(0xD0, 0xD9)) | {0x01}
+_MAGICS = (
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",
+    b"GIF8",
+    b"BM",
+    b"RIFF",
+    b"II*\x00",
+    b"MM\x00*",
+)
+
+
+class UploadTooLarge(ValueError):
+    """The upload exceeds the byte or pixel limit."""
+
+
+class InvalidImage(ValueError):
+    """The upload is not an image in a supported format."""
+
+
+class ImageHeader(NamedTuple):
+    format: str
+    width: int
+    height: int
+
+
+class ImageUpload(NamedTuple):
+    # Zero-copy view of the received bytes, see ``preprocessing.decode_image``
+    data: memoryview
+    header: ImageHeader
+
+
+def sniff_image(data: bytes | bytearray | memoryview) -> ImageHeader | None:
+    """
+    Format and dimensions from the first bytes of a file, without decoding.
+
+    Supports PNG, JPEG, GIF, BMP, WebP and TIFF. Returns None while more
+    data is needed; raises ``InvalidImage`` once the bytes cannot be one
+    of those formats.
+    """
+    head = bytes(data[:16])
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        if len(data) < 24:
+            return None
+        if bytes(data[12:16]) != b"IHDR":
+            raise InvalidImage("Corrupt PNG header")
+        width, height = struct.unpack_from(">II", data, 16)
+        return ImageHeader("PNG", width, height)
+    if head.startswith(b"\xff\xd8\xff"):
+        return _sniff_jpeg(data)
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        if len(data) < 10:
+            return None
+        return ImageHeader("GIF", *struct.unpack_from("<HH", data, 6))
+    if head.startswith(b"BM"):
+        return _sniff_bmp(data)
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return _sniff_webp(data)
+    if head.startswith((b"II*\x00", b"MM\x00*")):
+        return _sniff_tiff(data)
+    if len(head) < 12 and any(
+        head.startswith(m) or m.startswith(head) for m in _MAGICS
+    ):
+        return None
+    raise InvalidImage("File must be a PNG, JPEG, GIF, BMP, WebP or TIFF image")
+
+
+def _sniff_jpeg(data: bytes | bytearray | memoryview) -> ImageHeader | None:
+    # Walk the marker segments up to the first start-of-frame
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            raise InvalidImage("Corrupt JPEG header")
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker == 0xD9:  # end of image
+            break
+        if marker in _JPEG_STANDALONE:
+            pos += 2
+            continue
+        if marker in _JPEG_SOF:
+            if pos + 9 > len(data):
+                return None
+            height, width = struct.unpack_from(">HH", data, pos + 5)
+            return ImageHeader("JPEG", width, height)
+        pos += 2 + struct.unpack_from(">H", data, pos + 2)[0]
+    else:
+        return None
+    raise InvalidImage("JPEG without a frame header")
+
+
+def _sniff_bmp(data: bytes | bytearray | memoryview) -> ImageHeader | None:
+    if len(data) < 26:
+        return None
+    if struct.unpack_from("<I", data, 14)[0] == 12:  # OS/2 BITMAPCOREHEADER
+        width, height = struct.unpack_from("<HH", data, 18)
+    else:
+        width, height = struct.unpack_from("<ii", data, 18)
+    # Negative height: rows stored top-down
+    return ImageHeader("BMP", width, abs(height))
+
+
+def _sniff_webp(data: bytes | bytearray | memoryview) -> ImageHeader | None:
+    if len(data) < 30:
+        return None
+    chunk = bytes(data[12:16])
+    if chunk == b"VP8 ":
+        width, height = struct.unpack_from("<HH", data, 26)
+        return ImageHeader("WEBP", width & 0x3FFF, height & 0x3FFF)
+    if chunk == b"VP8L":
+        bits = struct.unpack_from("<I", data, 21)[0]
+        return ImageHeader("WEBP", (bits & 0x3FFF) + 1, (bits >> 14 & 0x3FFF) + 1)
+    if chunk == b"VP8X":
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return ImageHeader("WEBP", width, height)
+    raise InvalidImage("Corrupt WebP header")
+
+
+def _sniff_tiff(data: bytes | bytearray | memoryview) -> ImageHeader | None:
+    endian = "<" if data[0] == 0x49 else ">"
+    if len(data) < 8:
+        return None
+    offset = struct.unpack_from(endian + "I", data, 4)[0]
+    if offset + 2 > len(data):
+        return None
+    count = struct.unpack_from(endian + "H", data, offset)[0]
+    if offset + 2 + 12 * count > len(data):
+        return None
+    size: dict[int, int] = {}
+    for entry in range(offset + 2, offset + 2 + 12 * count, 12):
+        tag, kind = struct.unpack_from(endian + "HH", data, entry)
+        if tag in (256, 257):  # ImageWidth, ImageLength
+            value_format = endian + ("H" if kind == 3 else "I")
+            size[tag] = struct.unpack_from(value_format, data, entry + 8)[0]
+    if len(size) != 2:
+        raise InvalidImage("TIFF without image dimensions")
+    return ImageHeader("TIFF", size[256], size[257])
+
+
+def check_dimensions(width: int, height: int, max_pixels: int) -> None:
+    if width <= 0 or height <= 0:
+        raise InvalidImage(f"Invalid image size {width}x{height}")
+    if width * height > max_pixels:
+        raise UploadTooLarge(
+            f"Image of {width}x{height} pixels is over the {max_pixels} pixel limit"
+        )
+
+
+async def read_upload(
+    upload: UploadFile, max_bytes: int, max_pixels: int | None = None
+) -> tuple[memoryview, ImageHeader | None]:
+    """
+    Read an upload in chunks, stopping as soon as it is known to be too
+    large. With ``max_pixels`` the header is sniffed as it arrives, so a
+    non-image or an oversized (or decompression bomb) image is refused
+    after the first chunk instead of after a full read and decode.
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge(f"Upload larger than {max_bytes} bytes")
+    buffer = bytearray()
+    header: ImageHeader | None = None
+    while chunk := await upload.read(CHUNK_BYTES if buffer else SNIFF_BYTES):
+        if len(buffer) + len(chunk) > max_bytes:
+            raise UploadTooLarge(f"Upload larger than {max_bytes} bytes")
+        buffer += chunk
+        if max_pixels is not None and header is None:
+            header = sniff_image(buffer)
+            if header is not None:
+                check_dimensions(header.width, header.height, max_pixels)
+    return memoryview(buffer), header
+
+
+async def read_image(
+    upload: UploadFile, max_bytes: int, max_pixels: int
+) -> ImageUpload:
+    """An image upload validated by its content, not its declared type."""
+    data, header = await read_upload(upload, max_bytes, max_pixels)
+    if header is None:
+        raise InvalidImage("Truncated or empty image")
+    return ImageUpload(data, header)
+
+
+class MemoryReader(io.RawIOBase):
+    """
+    Seekable file over a buffer without copying it (``io.BytesIO`` copies
+    anything but ``bytes``). Each ``read`` copies only what it returns.
+    """
+
+    def __init__(self, data: bytes | bytearray | memoryview):
+        super().__init__()
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int | None = -1) -> bytes:
+        end = len(self._view)
+        if size is not None and size >= 0:
+            end = min(self._pos + size, end)
+        chunk = self._view[self._pos : end].tobytes()
+        self._pos = max(end, self._pos)
+        return chunk
+
+    def readall(self) -> bytes:
+        return self.read(-1)
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:  # type: ignore[override]
+        chunk = self._view[self._pos : self._pos + len(buffer)]
+        memoryview(buffer).cast("B")[: len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        starts = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}
+        base = starts[whence]
+        self._pos = max(base + offset, 0)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
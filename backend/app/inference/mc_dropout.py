@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+
+from app.core.config import settings
+from app.inference.postprocessing import Postprocessor
+
+# torchvision's MobileNetV3 classifier dropout, used if the export predates
+# "dropout_p" in <model>.cam.npz
+DEFAULT_DROPOUT_P = 0.2
+
+
+def _hardswish(x: np.ndarray) -> np.ndarray:
+    activated: np.ndarray = x * np.clip(x + 3, 0, 6) / 6
+    return activated
+
+
+class McDropoutHead:
+    """
+    Monte Carlo Dropout over the classifier head.
+
+    MobileNetV3 only has dropout between the two head Linear layers, so the
+    backbone output is identical across passes: the T stochastic passes run
+    on the pooled features from the prediction's forward pass, tiled along
+    a pass axis and evaluated as one (N, T, H) x (H, C) product instead of
+    T model calls.
+    """
+
+    def __init__(self, weights: dict[str, np.ndarray], dropout_p: float | None = None):
+        self.fc1_weight = weights["fc1_weight"].astype(np.float32)  # (H, K)
+        self.fc1_bias = weights["fc1_bias"].astype(np.float32)
+        self.fc2_weight = weights["fc2_weight"].astype(np.float32)  # (C, H)
+        self.fc2_bias = weights["fc2_bias"].astype(np.float32)
+        if dropout_p is None:
+            dropout_p = float(weights.get("dropout_p", DEFAULT_DROPOUT_P))
+        self.dropout_p = dropout_p
+
+    @classmethod
+    def from_file(cls, path: str | None) -> "McDropoutHead | None":
+        """Head weights from ``<model>.cam.npz``; None for single-Linear exports."""
+        if not path or not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            weights = {key: data[key] for key in data.files}
+        if "fc2_bias" not in weights or "fc1_weight" not in weights:
+            return None
+        return cls(weights, settings.MC_DROPOUT_P)
+
+    def sample_logits(
+        self, pooled: np.ndarray, passes: int, seed: int | None = None
+    ) -> np.ndarray:
+        """
+        Logits of ``passes`` dropout samples per item: (N, K) -> (N, T, C).
+        Inverted dropout, as in training: kept units are scaled by 1/(1-p).
+        """
+        rng = np.random.default_rng(seed)
+        pre_activation = pooled.astype(np.float32) @ self.fc1_weight.T + self.fc1_bias
+        hidden = _hardswish(pre_activation)
+        keep = rng.random((hidden.shape[0], passes, hidden.shape[1]), dtype=np.float32)
+        mask = (keep >= self.dropout_p).astype(np.float32)
+        mask *= 1.0 / (1.0 - self.dropout_p)
+        mask *= hidden[:, np.newaxis, :]
+        return mask @ self.fc2_weight.T + self.fc2_bias
+
+
+def mc_dropout_uncertainty(
+    head: McDropoutHead,
+    postprocessor: Postprocessor,
+    pooled: np.ndarray,
+    passes: int,
+    seed: int | None = None,
+    weight: np.ndarray | None = None,
+    bias: np.ndarray | None = None,
+) -> dict[str, float]:
+    """
+    Uncertainty decomposition for one item from ``passes`` dropout samples:
+    total = H(mean_t p_t), aleatoric = mean_t H(p_t) and
+    epistemic = total - aleatoric (the mutual information between the
+    prediction and the weights). All T samples go through the shared
+    postprocessing kernel as one (T, C) batch, calibrated with the model's
+    ``weight``/``bias`` like the single prediction.
+    """
+    logits = head.sample_logits(pooled.reshape(1, -1), passes, seed)[0]
+    samples = postprocessor.run(logits, weight, bias)
+    mean = samples["probabilities"].mean(axis=0, dtype=np.float64)
+    # log(mean) as unscaled logits: the kernel's softmax returns mean itself
+    summary = postprocessor.run(np.log(np.maximum(mean, 1e-30))[np.newaxis])[0]
+    class_id = int(summary["class_id"])
+    total = float(summary["entropy"])
+    aleatoric = float(samples["entropy"].mean(dtype=np.float64))
+    return {
+        "passes": passes,
+        "class_id": class_id,
+        "mean_confidence": float(mean[class_id]),
+        "confidence_std": float(samples["probabilities"][:, class_id].std()),
+        "predictive_entropy": total,
+        "aleatoric": aleatoric,
+        # Clamp float round-off; MI is non-negative
+        "epistemic": max(total - aleatoric, 0.0),
+    }
@@ -1,23 +1,89 @@
-import numpy as np
 import logging
 import os
-import onnxruntime as ort
-from typing import List, Dict, Any
+import time
+from typing import Any, Dict, Sequence
+
+import numpy as np
+
 from app.core.config import settings
+from app.inference.calibration import (
+    Calibration,
+    default_calibration_path,
+    load_calibration,
+)
+from app.inference.mc_dropout import McDropoutHead
+from app.inference.postprocessing import (
+    BatchTiming,
+    Postprocessor,
+    Prediction,
+    PredictionBatch,
+)
+from app.inference.session_options import create_session, file_digest, resolve_profile
+from app.inference.xai import CamEngine, default_cam_weights_path
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CLASSES = ("Abdominal", "Brain", "Cervix", "Femur", "Other", "Thorax")
+
+
+def _rss_bytes() -> int | None:
+    """Resident set size of this process (Linux), None where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
 class ModelWrapper:
-    def __init__(self, model_path: str):
-        self.classes = [
-            "Abdominal", "Brain", "Cervix", "Femur", "Other", "Thorax"
-        ]
+    def __init__(
+        self,
+        model_path: str,
+        variant: str = "fp32",
+        classes: Sequence[str] = DEFAULT_CLASSES,
+        calibration_path: str | None = None,
+        cam_weights_path: str | None = None,
+        temperature: float | None = None,
+    ):
+        """
+        Sidecar files default to the ones next to ``MODEL_PATH`` (the INT8
+        graph shares the FP32 head weights and calibration). A fixed
+        ``temperature`` takes precedence over the calibration file.
+        """
+        self.classes = list(classes)
         self.model_path = model_path
+        self.variant = variant
         self.session = None
+        self.runtime_info: Dict[str, Any] = {}
+        # Approximate host memory held by the loaded session
+        self.memory: Dict[str, int | None] = {
+            "model_file_bytes": None,
+            "session_rss_bytes": None,
+        }
+        self.postprocessor = Postprocessor(self.classes)
+        self.weights_digest = "unloaded"
+        # Temperature / vector scaling from calibrate.py, applied before the softmax
+        if temperature is not None:
+            self.calibration = Calibration(
+                method="temperature",
+                temperature=temperature,
+                digest=f"t{temperature:g}",
+            )
+        else:
+            self.calibration = load_calibration(
+                calibration_path or default_calibration_path(settings.MODEL_PATH),
+                len(self.classes),
+            )
+        if cam_weights_path is None:
+            cam_weights_path = default_cam_weights_path(settings.MODEL_PATH)
+        # Grad-CAM needs both the "features" graph output and the head weights
+        self.cam_engine = CamEngine.from_file(cam_weights_path)
+        # MC-Dropout reuses the same head weights and the pooled features
+        self.mc_head = McDropoutHead.from_file(cam_weights_path)
         self.load_model()
 
-    def load_model(self):
-        """Loads the ONNX model."""
+    def load_model(self) -> None:
+        """Loads the ONNX model with the configured session profile."""
         if not os.path.exists(self.model_path):
             logger.critical(f"Model file not found at {self.model_path}")
             # In production, we might want to crash or raise Error,
@@ -26,44 +92,92 @@ class ModelWrapper:
             return
 
         try:
-            self.session = ort.InferenceSession(self.model_path)
-            logger.info(f"ONNX model loaded successfully from {self.model_path}")
+            profile = resolve_profile()
+            # Hashed once: the weights version and the optimized-graph cache key
+            digest = file_digest(self.model_path)
+            self.weights_digest = digest[:16]
+            # ORT exposes no per-session allocator stats: the RSS growth
+            # across session creation is the closest process-level measure
+            rss_before = _rss_bytes()
+            self.session, self.runtime_info = create_session(
+                self.model_path, profile, digest
+            )
+            rss_after = _rss_bytes()
+            self.memory = {
+                "model_file_bytes": os.path.getsize(self.model_path),
+                "session_rss_bytes": (
+                    max(rss_after - rss_before, 0)
+                    if rss_before is not None and rss_after is not None
+                    else None
+                ),
+            }
+            logger.info(
+                f"ONNX model loaded successfully from {self.model_path} "
+                f"(profile={profile.name}, intra_op={profile.intra_op_threads}, "
+                f"optimized_cache={self.runtime_info['optimized_model_cache']})"
+            )
         except Exception as e:
             logger.error(f"Failed to load ONNX model: {e}")
             self.session = None
 
-    def predict(self, image: np.ndarray) -> Dict[str, Any]:
+    @property
+    def model_version(self) -> str:
+        """What produces the outputs (weights + calibration), for cache keys."""
+        version = f"{self.variant}-{self.weights_digest}"
+        if self.calibration.enabled:
+            version += f"+cal-{self.calibration.digest}"
+        return version
+
+    @property
+    def temperature(self) -> float:
+        return self.calibration.temperature
+
+    def logit_scale(self) -> tuple[np.ndarray | None, np.ndarray | None]:
+        """Calibration (weight, bias) for ``Postprocessor.run``, None if disabled."""
+        if not self.calibration.enabled:
+            return None, None
+        return self.calibration.logit_scale(self.postprocessor.num_classes)
+
+    def predict(self, image: np.ndarray) -> Prediction:
         """
         Runs inference on the input image.
         Args:
             image: Preprocessed image (Batch, C, H, W)
         Returns:
-            Dict containing probabilities and class predictions.
+            Prediction for the first batch item.
+        """
+        return self.predict_batch(image)[0]
+
+    def predict_batch(self, batch: np.ndarray) -> PredictionBatch:
+        """
+        Runs a single ONNX call over a stacked batch.
+        Args:
+            batch: Preprocessed images (Batch, C, H, W)
+        Returns:
+            Structured records (plus CAMs / pooled features), in input order.
         """
         if self.session is None:
             raise RuntimeError("Model is not loaded.")
 
         input_name = self.session.get_inputs()[0].name
+        output_names = [o.name for o in self.session.get_outputs()]
         # ONNX Runtime expects numpy input
-        outputs = self.session.run(None, {input_name: image})
-        logits = outputs[0]
-
-        # Softmax
-        exp_preds = np.exp(logits)
-        probs = exp_preds / np.sum(exp_preds, axis=1, keepdims=True)
-        probs = probs[0] # First sample
-
-        # Get top class
-        class_idx = np.argmax(probs)
-        class_name = self.classes[class_idx]
-        confidence = float(probs[class_idx])
-
-        return {
-            "class": class_name,
-            "class_id": int(class_idx),
-            "confidence": confidence,
-            "probabilities": {cls: float(comp) for cls, comp in zip(self.classes, probs)}
-        }
+        start = time.perf_counter()
+        outputs = self.session.run(None, {input_name: batch})
+        ran = time.perf_counter()
+
+        # Calibration, softmax, top-k, entropy and margin for the whole batch
+        weight, bias = self.logit_scale()
+        records = self.postprocessor.run(outputs[0], weight, bias)
 
-# Global model instance
-model_engine = ModelWrapper(model_path=settings.MODEL_PATH)
+        cams = None
+        pooled = None
+        if "features" in output_names:
+            features = outputs[output_names.index("features")]
+            # Head input, kept for MC-Dropout sampling (N, K)
+            pooled = features.mean(axis=(2, 3))
+            if self.cam_engine is not None:
+                # Same forward pass as the prediction: no second model run
+                cams = self.cam_engine.compute(features, records["class_id"])
+        timing = BatchTiming((ran - start) * 1000, (time.perf_counter() - ran) * 1000)
+        return PredictionBatch(records, cams, pooled, timing)
@@ -0,0 +1,186 @@
+from typing import Iterator, NamedTuple, Sequence
+
+import numpy as np
+
+TOP_K = 3
+LABEL_DTYPE = "U32"
+
+
+def prediction_dtype(num_classes: int, top_k: int) -> np.dtype:
+    """One structured record per image; ``probabilities`` are calibrated."""
+    return np.dtype(
+        [
+            ("label", LABEL_DTYPE),
+            ("class_id", np.int32),
+            # Raw (uncalibrated) probability of class_id
+            ("confidence", np.float32),
+            ("calibrated_confidence", np.float32),
+            ("entropy", np.float32),
+            # Gap between the two most likely classes
+            ("margin", np.float32),
+            ("top_k_ids", np.int32, (top_k,)),
+            ("top_k_probs", np.float32, (top_k,)),
+            ("probabilities", np.float32, (num_classes,)),
+        ]
+    )
+
+
+class Postprocessor:
+    """
+    Logits (N, C) -> structured records (N,) in one vectorized pass:
+    calibration, log-sum-exp softmax, argmax/top-k, entropy and margin.
+
+    Log-probabilities are formed as ``(z - max) - log(sum(exp(z - max)))``,
+    so there is no overflow or precision loss for large logits and no
+    epsilon in the entropy. Results can be written into a caller-owned
+    ``out`` array.
+    """
+
+    def __init__(self, classes: Sequence[str], top_k: int = TOP_K):
+        self.classes = np.asarray(classes, dtype=LABEL_DTYPE)
+        self.num_classes = len(classes)
+        self.top_k = max(1, min(top_k, self.num_classes))
+        self.dtype = prediction_dtype(self.num_classes, self.top_k)
+
+    def allocate(self, n: int) -> np.ndarray:
+        return np.empty(n, dtype=self.dtype)
+
+    def run(
+        self,
+        logits: np.ndarray,
+        weight: np.ndarray | None = None,
+        bias: np.ndarray | None = None,
+        out: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        ``weight``/``bias`` (C,) scale the logits before the softmax
+        (temperature or vector scaling); ``confidence`` keeps the raw
+        probability of the predicted class.
+        """
+        raw = np.asarray(logits, dtype=np.float32)
+        n = raw.shape[0]
+        if out is None:
+            out = self.allocate(n)
+        rows = np.arange(n)
+
+        raw_log_probs = _log_softmax(raw)
+        if weight is None and bias is None:
+            log_probs = raw_log_probs.copy()
+        else:
+            scaled = raw * (weight if weight is not None else 1.0)
+            if bias is not None:
+                scaled += bias
+            log_probs = _log_softmax(scaled)
+
+        probs = out["probabilities"]
+        np.exp(log_probs, out=probs)
+        # -sum(p * log p), reusing log_probs as scratch
+        log_probs *= probs
+        np.sum(log_probs, axis=1, out=out["entropy"])
+        np.negative(out["entropy"], out=out["entropy"])
+
+        if self.top_k == self.num_classes:
+            top_ids = np.argsort(-probs, axis=1, kind="stable")
+        else:
+            partition = np.argpartition(-probs, self.top_k - 1, axis=1)
+            candidates = partition[:, : self.top_k]
+            order = np.argsort(
+                -np.take_along_axis(probs, candidates, axis=1), axis=1, kind="stable"
+            )
+            top_ids = np.take_along_axis(candidates, order, axis=1)
+        top_ids = top_ids[:, : self.top_k]
+        out["top_k_ids"] = top_ids
+        out["top_k_probs"] = np.take_along_axis(probs, top_ids, axis=1)
+
+        class_ids = top_ids[:, 0]
+        out["class_id"] = class_ids
+        out["label"] = self.classes[class_ids]
+        out["calibrated_confidence"] = out["top_k_probs"][:, 0]
+        out["confidence"] = np.exp(raw_log_probs[rows, class_ids])
+        top_probs = out["top_k_probs"]
+        out["margin"] = top_probs[:, 0] - top_probs[:, 1] if self.top_k > 1 else 1.0
+        return out
+
+
+def _log_softmax(z: np.ndarray) -> np.ndarray:
+    # Shift by the row max first, so both exp and the subtraction stay small
+    shifted: np.ndarray = z - z.max(axis=1, keepdims=True)
+    shifted -= np.log(np.exp(shifted).sum(axis=1, keepdims=True))
+    return shifted
+
+
+class BatchTiming(NamedTuple):
+    """Where one model call spent its time (ms); shared by the batch's rows."""
+
+    session_ms: float
+    postprocess_ms: float
+
+
+class Prediction(NamedTuple):
+    """One image's record plus the per-image arrays that do not fit a record."""
+
+    record: np.void
+    # Low-res Grad-CAM (h, w) and pooled head input (K,), when the model has them
+    cam: np.ndarray | None = None
+    pooled: np.ndarray | None = None
+    # None for cached predictions
+    timing: BatchTiming | None = None
+
+    @property
+    def label(self) -> str:
+        return str(self.record["label"])
+
+    @property
+    def class_id(self) -> int:
+        return int(self.record["class_id"])
+
+    @property
+    def confidence(self) -> float:
+        return float(self.record["confidence"])
+
+    @property
+    def calibrated_confidence(self) -> float:
+        return float(self.record["calibrated_confidence"])
+
+    @property
+    def entropy(self) -> float:
+        return float(self.record["entropy"])
+
+    @property
+    def probabilities(self) -> np.ndarray:
+        probabilities: np.ndarray = self.record["probabilities"]
+        return probabilities
+
+
+class PredictionBatch:
+    """
+    Output of one model call: structured records plus optional CAMs and
+    pooled features, all indexed by batch position. Sequence-like, so the
+    micro-batcher can hand each caller its own row.
+    """
+
+    def __init__(
+        self,
+        records: np.ndarray,
+        cams: np.ndarray | None = None,
+        pooled: np.ndarray | None = None,
+        timing: BatchTiming | None = None,
+    ):
+        self.records = records
+        self.cams = cams
+        self.pooled = pooled
+        self.timing = timing
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, idx: int) -> Prediction:
+        return Prediction(
+            self.records[idx],
+            None if self.cams is None else self.cams[idx],
+            None if self.pooled is None else self.pooled[idx],
+            self.timing,
+        )
+
+    def __iter__(self) -> Iterator[Prediction]:
+        return (self[idx] for idx in range(len(self)))
@@ -1,21 +1,196 @@
-from PIL import Image
 import io
+import time
+from typing import IO, NamedTuple
+
 import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+from app.inference.ingest import MemoryReader, check_dimensions
+
+# Must match the eval transforms in modeling/scripts/train.py:
+# Resize(256) -> CenterCrop(224) -> ToTensor() -> Normalize(ImageNet)
+RESIZE_SIZE = 256
+CROP_SIZE = 224
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+# Modes kept as-is: grayscale stays single channel until normalization
+NATIVE_MODES = ("RGB", "L")
+GRAYSCALE_MODES = ("LA", "La", "1")
+
+
+def decode_image(
+    file_bytes: bytes | memoryview, min_size: int | None = RESIZE_SIZE
+) -> tuple[Image.Image, tuple[int, int]]:
+    """
+    Decode bytes into a PIL Image in "RGB" or "L" mode, plus the original
+    (width, height) from the file header.
+
+    The buffer is read in place (no ``BytesIO`` copy), and images over
+    ``UPLOAD_MAX_PIXELS`` are refused from their header, before any pixel
+    data is decoded.
+
+    With ``min_size`` the image is decoded no larger than needed for a
+    shorter side of at least ``min_size``: JPEGs use libjpeg's DCT-domain
+    scaling (1/2, 1/4, 1/8) via ``draft``; other formats are fully decoded
+    and then box-reduced by an integer factor before any mode conversion.
+    Pass ``None`` for a full-resolution decode.
+    """
+    # BytesIO shares a bytes object but would copy any other buffer
+    source: IO[bytes]
+    if isinstance(file_bytes, bytes):
+        source = io.BytesIO(file_bytes)
+    else:
+        source = io.BufferedReader(MemoryReader(file_bytes))
+    image: Image.Image = Image.open(source)
+    original_size = image.size
+    check_dimensions(*original_size, settings.UPLOAD_MAX_PIXELS)
+    if min_size and image.format == "JPEG":
+        draft_mode = image.mode if image.mode in NATIVE_MODES else "RGB"
+        image.draft(draft_mode, (min_size, min_size))
+
+    if image.mode in GRAYSCALE_MODES:
+        image = image.convert("L")
+    elif image.mode not in NATIVE_MODES:
+        image = image.convert("RGB")
+
+    if min_size:
+        # Keep 2x headroom so the final antialiased resize stays faithful
+        factor = min(image.size) // (2 * min_size)
+        if factor >= 2:
+            image = image.reduce(factor)
+    image.load()
+    return image, original_size
+
+
+def load_image(
+    file_bytes: bytes | memoryview, min_size: int | None = RESIZE_SIZE
+) -> Image.Image:
+    """Load bytes into a PIL Image ("RGB" or "L"), see ``decode_image``."""
+    return decode_image(file_bytes, min_size)[0]
+
+
+class PreprocessingEngine:
+    """
+    Fused equivalent of the training eval transforms.
+
+    Resize + center crop is a single PIL resample restricted to the source
+    region that survives the crop, and /255 + normalization collapse into
+    one multiply-add written straight into a caller-owned float32 CHW
+    buffer. The engine holds no mutable state, so it is thread-safe.
+    """
+
+    def __init__(
+        self,
+        resize_size: int = RESIZE_SIZE,
+        crop_size: int = CROP_SIZE,
+        mean: tuple[float, float, float] = IMAGENET_MEAN,
+        std: tuple[float, float, float] = IMAGENET_STD,
+    ):
+        self.resize_size = resize_size
+        self.crop_size = crop_size
+        std_arr = np.asarray(std, dtype=np.float32)
+        # (x / 255 - mean) / std  ==  x * scale + offset
+        self.scale = (1.0 / (255.0 * std_arr)).reshape(3, 1, 1)
+        self.offset = (-np.asarray(mean, dtype=np.float32) / std_arr).reshape(3, 1, 1)
+
+    def crop_box(self, size: tuple[int, int]) -> tuple[float, float, float, float]:
+        """
+        Source-pixel box that Resize(resize_size) + CenterCrop(crop_size)
+        would keep, using torchvision's rounding rules.
+        """
+        width, height = size
+        short, long = (width, height) if width <= height else (height, width)
+        new_short, new_long = self.resize_size, int(self.resize_size * long / short)
+        if width <= height:
+            new_w, new_h = new_short, new_long
+        else:
+            new_w, new_h = new_long, new_short
+
+        left = int(round((new_w - self.crop_size) / 2.0))
+        top = int(round((new_h - self.crop_size) / 2.0))
+        sx, sy = width / new_w, height / new_h
+        right, bottom = left + self.crop_size, top + self.crop_size
+        return (left * sx, top * sy, right * sx, bottom * sy)
+
+    def resize_crop(self, image: Image.Image) -> Image.Image:
+        """Resize + center crop in one resample (bilinear, antialiased)."""
+        return image.resize(
+            (self.crop_size, self.crop_size),
+            Image.Resampling.BILINEAR,
+            box=self.crop_box(image.size),
+        )
+
+    def write(self, image: Image.Image, out: np.ndarray) -> None:
+        """Preprocess ``image`` into ``out`` (3, crop, crop) float32, in place."""
+        pixels = np.asarray(self.resize_crop(image))
+        if pixels.ndim == 2:
+            # Grayscale: broadcast the single channel into all three
+            chw = pixels[np.newaxis]
+        else:
+            # HWC uint8 -> CHW float32 happens inside the multiply (strided view)
+            chw = pixels.transpose(2, 0, 1)
+        np.multiply(chw, self.scale, out=out)
+        out += self.offset
+
+    def allocate(self, batch_size: int) -> np.ndarray:
+        shape = (batch_size, 3, self.crop_size, self.crop_size)
+        return np.empty(shape, dtype=np.float32)
+
+    def preprocess(self, image: Image.Image) -> np.ndarray:
+        """Single image -> fresh (1, 3, crop, crop) tensor."""
+        out = self.allocate(1)
+        self.write(image, out[0])
+        return out
+
+    def preprocess_batch(
+        self, images: list[Image.Image], out: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Fill ``out[:len(images)]`` (allocated if omitted) and return that view."""
+        if out is None:
+            out = self.allocate(len(images))
+        for idx, image in enumerate(images):
+            self.write(image, out[idx])
+        return out[: len(images)]
+
+
+engine = PreprocessingEngine()
 
-def load_image(file_bytes: bytes) -> Image.Image:
-    """Load bytes into PIL Image and convert to RGB."""
-    bg_image = Image.open(io.BytesIO(file_bytes))
-    if bg_image.mode != "RGB":
-        bg_image = bg_image.convert("RGB")
-    return bg_image
 
 def preprocess_for_model(image: Image.Image) -> np.ndarray:
-    """Resize and normalize image for model inference."""
-    # MVP: Resize to 224x224 and scale to 0-1
-    img = image.resize((224, 224))
-    img_arr = np.array(img).astype(np.float32) / 255.0
-    # HWC -> CHW/Batch
-    # img_arr = np.transpose(img_arr, (2, 0, 1))
-    # img_arr = np.expand_dims(img_arr, axis=0) # Batch dim
-    # Keeping it simple for MVP Dummy model which expects nothing specific yet
-    return img_arr
+    """Resize, crop and normalize image for model inference (1, C, H, W)."""
+    return engine.preprocess(image)
+
+
+class PreparedInput(NamedTuple):
+    tensor: np.ndarray
+    # Original (width, height), before any reduced decode
+    image_size: tuple[int, int]
+    decode_ms: float
+    preprocess_ms: float
+
+
+def prepare_input(
+    file_bytes: bytes | memoryview, out: np.ndarray | None = None
+) -> PreparedInput:
+    """
+    Decode and preprocess in one call. Picklable, so it can run in a process
+    pool; timings are returned rather than recorded so they survive that.
+
+    With ``out`` (a (3, crop, crop) row of a batch buffer) the tensor is
+    written there in place and ``tensor`` is that row; otherwise a fresh
+    (1, 3, crop, crop) array is allocated.
+    """
+    start = time.perf_counter()
+    image, original_size = decode_image(file_bytes)
+    decoded = time.perf_counter()
+    if out is None:
+        tensor = preprocess_for_model(image)
+    else:
+        engine.write(image, out)
+        tensor = out
+    done = time.perf_counter()
+    return PreparedInput(
+        tensor, original_size, (decoded - start) * 1000, (done - decoded) * 1000
+    )
@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Any, Callable, Sequence
+
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.inference.executor import inference_executor
+
+if TYPE_CHECKING:
+    from app.inference import batching, calibration, model, warmup, xai
+    from app.inference.batching import MicroBatcher
+    from app.inference.model import ModelWrapper
+else:
+    # Loaded with the first model, not when the API imports the registry
+    batching = lazy_import("app.inference.batching")
+    calibration = lazy_import("app.inference.calibration")
+    model = lazy_import("app.inference.model")
+    warmup = lazy_import("app.inference.warmup")
+    xai = lazy_import("app.inference.xai")
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownModel(LookupError):
+    """No model registered under the requested name."""
+
+
+class ModelLoadError(RuntimeError):
+    """A reload produced no usable session; the previous model keeps serving."""
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    name: str
+    path: str
+    variant: str = "fp32"
+    # Free-form label (e.g. a training run); cache keys use the weights digest
+    version: str | None = None
+    # None: the model's built-in class list
+    classes: tuple[str, ...] | None = None
+    # Fixed temperature; overrides the calibration file
+    temperature: float | None = None
+    calibration_path: str | None = None
+    # None: the sidecars next to MODEL_PATH (filled in at load time)
+    cam_weights_path: str | None = None
+
+    @property
+    def watched_paths(self) -> tuple[str, ...]:
+        """Files whose change triggers a hot reload."""
+        return tuple(
+            p for p in (self.path, self.calibration_path, self.cam_weights_path) if p
+        )
+
+
+def resolve_model_path(variant: str | None = None) -> str:
+    """Path of the configured model variant ("fp32" or "int8")."""
+    variant = variant or settings.MODEL_VARIANT
+    if variant == "fp32":
+        return settings.MODEL_PATH
+    if variant == "int8":
+        if settings.MODEL_INT8_PATH:
+            return settings.MODEL_INT8_PATH
+        root, ext = os.path.splitext(settings.MODEL_PATH)
+        return f"{root}.int8{ext}"
+    raise ValueError(f"Unknown MODEL_VARIANT '{variant}', expected 'fp32' or 'int8'")
+
+
+def default_specs() -> tuple[list[ModelSpec], str]:
+    """The single ``MODEL_VARIANT`` model."""
+    spec = ModelSpec(
+        name=settings.MODEL_VARIANT,
+        path=resolve_model_path(),
+        variant=settings.MODEL_VARIANT,
+    )
+    return [spec], spec.name
+
+
+def _with_sidecars(spec: ModelSpec) -> ModelSpec:
+    # The INT8 graph shares the FP32 head weights and calibration
+    return replace(
+        spec,
+        calibration_path=spec.calibration_path
+        or calibration.default_calibration_path(settings.MODEL_PATH),
+        cam_weights_path=spec.cam_weights_path
+        or xai.default_cam_weights_path(settings.MODEL_PATH),
+    )
+
+
+def load_specs(path: str) -> tuple[list[ModelSpec], str]:
+    """
+    Read a registry file::
+
+        {"default": "fp32",
+         "models": [{"name": "fp32", "path": "model.onnx"},
+                    {"name": "int8", "path": "model.int8.onnx", "variant": "int8",
+                     "temperature": 1.4, "calibration_path": "model.calibration.json"}]}
+
+    Relative paths are resolved against the registry file's directory.
+    Sidecars default to ``<path>.calibration.json`` / ``<path>.cam.npz``.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path) as f:
+        data = json.load(f)
+
+    def resolve(value: str | None) -> str | None:
+        return None if value is None else os.path.join(base, value)
+
+    specs = []
+    for entry in data["models"]:
+        model_path = resolve(entry["path"])
+        assert model_path is not None
+        root = os.path.splitext(model_path)[0]
+        specs.append(
+            ModelSpec(
+                name=entry["name"],
+                path=model_path,
+                variant=entry.get("variant", "fp32"),
+                version=entry.get("version"),
+                classes=tuple(entry["classes"]) if "classes" in entry else None,
+                temperature=entry.get("temperature"),
+                calibration_path=resolve(entry.get("calibration_path"))
+                or root + ".calibration.json",
+                cam_weights_path=resolve(entry.get("cam_weights_path"))
+                or root + ".cam.npz",
+            )
+        )
+    return specs, data.get("default", specs[0].name if specs else "")
+
+
+def build_engine(spec: ModelSpec) -> ModelWrapper:
+    return model.ModelWrapper(
+        model_path=spec.path,
+        variant=spec.variant,
+        classes=spec.classes or model.DEFAULT_CLASSES,
+        calibration_path=spec.calibration_path,
+        cam_weights_path=spec.cam_weights_path,
+        temperature=spec.temperature,
+    )
+
+
+def _file_state(paths: Sequence[str]) -> tuple[tuple[int, int] | None, ...]:
+    states: list[tuple[int, int] | None] = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            states.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            states.append(None)
+    return tuple(states)
+
+
+@dataclass(eq=False)
+class LoadedModel:
+    """
+    One model generation: session, calibration and its own micro-batcher
+    (batches never mix models). Requests hold a lease for their whole
+    lifetime; a swapped-out generation is stopped once its last lease ends.
+    """
+
+    spec: ModelSpec
+    engine: ModelWrapper
+    batcher: MicroBatcher
+    file_state: tuple[tuple[int, int] | None, ...]
+    # Model-call latency per warm-up batch size; None until warmed up
+    warmup_ms: dict[int, float] | None = None
+    loaded_at: float = field(default_factory=time.time)
+    active: int = 0
+    _idle: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def __post_init__(self) -> None:
+        self._idle.set()
+
+    def acquire(self) -> "LoadedModel":
+        self.active += 1
+        self._idle.clear()
+        return self
+
+    def release(self) -> None:
+        self.active -= 1
+        if self.active == 0:
+            self._idle.set()
+
+    async def retire(self) -> None:
+        """Stop the batcher after in-flight requests on this generation finish."""
+        await self._idle.wait()
+        await self.batcher.stop()
+        logger.info(f"Retired model '{self.spec.name}' ({self.engine.model_version})")
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "name": self.spec.name,
+            "version": self.spec.version,
+            "variant": self.spec.variant,
+            "model_version": self.engine.model_version,
+            "loaded": self.engine.session is not None,
+            "loaded_at": self.loaded_at,
+            "warmup_ms": self.warmup_ms,
+            "classes": self.engine.classes,
+            "calibration": {
+                "method": self.engine.calibration.method,
+                "temperature": self.engine.calibration.temperature,
+            },
+            "active_requests": self.active,
+            "memory": self.engine.memory,
+        }
+
+
+class ModelRegistry:
+    """
+    Named models served side by side, selected per request (``?model=``).
+
+    A reload builds and warms up the new generation off the event loop,
+    then swaps the dict entry in one step: new requests see the new model,
+    requests already holding a lease finish on the old one.
+
+    ``ready`` turns true once startup has loaded and warmed up every model,
+    and false again when shutdown begins.
+    """
+
+    def __init__(
+        self,
+        specs: Sequence[ModelSpec],
+        default: str,
+        factory: Callable[[ModelSpec], ModelWrapper] = build_engine,
+    ):
+        self._specs = {spec.name: spec for spec in specs}
+        if len(self._specs) != len(specs):
+            raise ValueError("Model names in the registry must be unique")
+        if default not in self._specs:
+            raise ValueError(f"Default model '{default}' is not in the registry")
+        self.default = default
+        self.factory = factory
+        self._models: dict[str, LoadedModel] = {}
+        self._lock = asyncio.Lock()
+        self._watcher: asyncio.Task[None] | None = None
+        self._retiring: set[asyncio.Task[None]] = set()
+        self._started = False
+
+    @classmethod
+    def from_settings(cls) -> "ModelRegistry":
+        if settings.MODEL_REGISTRY_PATH:
+            specs, default = load_specs(settings.MODEL_REGISTRY_PATH)
+        else:
+            specs, default = default_specs()
+        return cls(specs, default)
+
+    @property
+    def ready(self) -> bool:
+        return self._started and all(
+            loaded.warmup_ms is not None for loaded in self._models.values()
+        )
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._specs)
+
+    def get(self, name: str | None = None) -> LoadedModel:
+        name = name or self.default
+        try:
+            return self._models[name]
+        except KeyError:
+            raise UnknownModel(
+                f"Unknown model '{name}'; available: {', '.join(self._specs)}"
+            ) from None
+
+    def models(self) -> list[LoadedModel]:
+        return list(self._models.values())
+
+    def _build(self, spec: ModelSpec) -> LoadedModel:
+        # Blocking: session creation
+        spec = _with_sidecars(spec)
+        state = _file_state(spec.watched_paths)
+        engine = self.factory(spec)
+        batcher = batching.MicroBatcher(
+            run_batch=engine.predict_batch,
+            max_batch_size=settings.BATCH_MAX_SIZE,
+            max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+            max_queue_depth=settings.BATCH_MAX_QUEUE_DEPTH,
+            executor=inference_executor,
+            max_concurrent_batches=settings.INFERENCE_WORKERS,
+        )
+        return LoadedModel(spec, engine, batcher, state)
+
+    def load_all(self) -> None:
+        """Load every model that is not loaded yet (blocking)."""
+        for name, spec in self._specs.items():
+            if name not in self._models:
+                self._models[name] = self._build(spec)
+
+    async def _warm_up(self, loaded: LoadedModel) -> bool:
+        if loaded.engine.session is None:
+            return False
+        start = time.perf_counter()
+        try:
+            loaded.warmup_ms = await warmup.warm_up(
+                loaded.engine, warmup.warmup_batch_sizes()
+            )
+        except Exception as e:
+            logger.error(f"Warm-up of model '{loaded.spec.name}' failed: {e}")
+            return False
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(
+            f"Model '{loaded.spec.name}' warmed up in {elapsed_ms:.0f} ms "
+            f"(batch sizes {list(loaded.warmup_ms)})"
+        )
+        return True
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self.load_all)
+        for loaded in self._models.values():
+            await loaded.batcher.start()
+            if loaded.warmup_ms is None:
+                await self._warm_up(loaded)
+        self._started = True
+        interval = settings.MODEL_RELOAD_INTERVAL_SECONDS
+        if interval > 0 and self._watcher is None:
+            self._watcher = asyncio.create_task(
+                self._watch(interval), name="model-watcher"
+            )
+
+    async def stop(self) -> None:
+        self._started = False
+        if self._watcher is not None:
+            self._watcher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._watcher
+            self._watcher = None
+        if self._retiring:
+            await asyncio.gather(*self._retiring, return_exceptions=True)
+        for loaded in self._models.values():
+            await loaded.batcher.stop()
+
+    async def reload(self, name: str) -> LoadedModel:
+        """Load a new generation of ``name`` and swap it in atomically."""
+        if name not in self._specs:
+            raise UnknownModel(f"Unknown model '{name}'")
+        async with self._lock:
+            current = self._models.get(name)
+            fresh = await asyncio.to_thread(self._build, self._specs[name])
+            await fresh.batcher.start()
+            # Warm up before the swap, so no request lands on a cold session
+            if (
+                not await self._warm_up(fresh)
+                and current is not None
+                and current.warmup_ms is not None
+            ):
+                await fresh.batcher.stop()
+                serving = current.engine.model_version
+                raise ModelLoadError(
+                    f"Reload of model '{name}' failed; still serving {serving}"
+                )
+            self._models[name] = fresh
+            logger.info(f"Swapped in model '{name}' ({fresh.engine.model_version})")
+            if current is not None:
+                task = asyncio.create_task(current.retire())
+                self._retiring.add(task)
+                task.add_done_callback(self._retiring.discard)
+        return fresh
+
+    async def _watch(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            for name, loaded in list(self._models.items()):
+                state = await asyncio.to_thread(_file_state, loaded.spec.watched_paths)
+                if state == loaded.file_state or state[0] is None:
+                    continue
+                logger.info(f"Model files of '{name}' changed; reloading")
+                try:
+                    await self.reload(name)
+                except Exception as e:
+                    logger.error(f"Hot reload of model '{name}' failed: {e}")
+                    # Don't retry the same broken files every interval
+                    loaded.file_state = state
+
+
+# Global registry; models are loaded at startup
+model_registry = ModelRegistry.from_settings()
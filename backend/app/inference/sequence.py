@@ -0,0 +1,132 @@
+import heapq
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.responses import SmoothingMode
+
+
+class SmoothedFrame(NamedTuple):
+    class_id: int
+    confidence: float
+    probabilities: np.ndarray
+
+
+class KeyFrame(NamedTuple):
+    frame_index: int
+    entropy: float
+    confidence: float
+    timestamp: float | None = None
+
+
+class ProbabilitySmoother:
+    """
+    Incremental smoothing of per-frame class probabilities; the state is
+    one (C,) vector, whatever the sequence length.
+
+    - ``ema``: exponential moving average, ``s = alpha * p + (1 - alpha) * s``
+    - ``hmm``: forward filter of a sticky HMM: the plane stays the same
+      with probability ``stay_prob``, otherwise switches uniformly; the
+      per-frame softmax is used as the emission likelihood
+    """
+
+    def __init__(
+        self,
+        mode: SmoothingMode,
+        alpha: float = settings.SEQUENCE_EMA_ALPHA,
+        stay_prob: float = settings.SEQUENCE_HMM_STAY_PROB,
+    ):
+        if mode not in ("none", "ema", "hmm"):
+            raise ValueError(f"Unknown smoothing mode '{mode}'")
+        self.mode = mode
+        self.alpha = alpha
+        self.stay_prob = stay_prob
+        self.state: np.ndarray | None = None
+
+    def update(self, probs: np.ndarray) -> SmoothedFrame:
+        probs = np.asarray(probs, dtype=np.float64)
+        if self.state is None or self.mode == "none":
+            state = probs
+        elif self.mode == "ema":
+            state = self.alpha * probs + (1.0 - self.alpha) * self.state
+        else:
+            num_classes = probs.shape[0]
+            switch = (1.0 - self.stay_prob) / max(num_classes - 1, 1)
+            # A @ s for A = stay on the diagonal, switch elsewhere, in O(C)
+            prior = self.stay_prob * self.state + switch * (1.0 - self.state)
+            state = prior * np.maximum(probs, 1e-12)
+            state /= state.sum()
+        self.state = state
+        class_id = int(np.argmax(state))
+        return SmoothedFrame(class_id, float(state[class_id]), state)
+
+
+class KeyFrameSelector:
+    """
+    Keeps the ``k`` lowest-entropy frames per class seen so far, in O(C * k)
+    memory: each class has a bounded max-heap on entropy, so a new frame
+    only replaces the current worst one.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        # class_id -> heap of (-entropy, -frame_index, frame); heap[0] is the worst kept
+        self._heaps: dict[int, list[tuple[float, int, KeyFrame]]] = {}
+
+    def offer(self, class_id: int, frame: KeyFrame) -> None:
+        if self.k <= 0:
+            return
+        heap = self._heaps.setdefault(class_id, [])
+        item = (-frame.entropy, -frame.frame_index, frame)
+        if len(heap) < self.k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def best(self) -> dict[int, list[KeyFrame]]:
+        """Kept frames per class, lowest entropy first."""
+        return {
+            class_id: [frame for *_, frame in sorted(heap, reverse=True)]
+            for class_id, heap in sorted(self._heaps.items())
+        }
+
+
+class SequenceProcessor:
+    """Per-stream post-processing: smoothing plus key-frame selection."""
+
+    def __init__(
+        self, classes: list[str], smoothing: SmoothingMode = "none", top_k: int = 0
+    ):
+        self.classes = classes
+        self.smoother = ProbabilitySmoother(smoothing)
+        self.key_frames = KeyFrameSelector(top_k)
+
+    def update(
+        self,
+        frame_index: int,
+        probs: np.ndarray,
+        entropy: float,
+        timestamp: float | None = None,
+    ) -> SmoothedFrame:
+        """``probs`` (C,) and ``entropy`` from the prediction record of a frame."""
+        smoothed = self.smoother.update(probs)
+        # Entropy ranks a frame's own prediction, so it is filed under its own
+        # argmax: right after a transition the smoothed label still lags
+        class_id = int(np.argmax(probs))
+        self.key_frames.offer(
+            class_id, KeyFrame(frame_index, entropy, float(probs[class_id]), timestamp)
+        )
+        return smoothed
+
+    def summary(self) -> dict[str, list[dict[str, Any]]]:
+        return {
+            self.classes[class_id]: [_key_frame_json(frame) for frame in frames]
+            for class_id, frames in self.key_frames.best().items()
+        }
+
+
+def _key_frame_json(frame: KeyFrame) -> dict[str, Any]:
+    # Same key as the per-frame lines of the stream
+    fields = frame._asdict()
+    return {"index": fields.pop("frame_index"), **fields}
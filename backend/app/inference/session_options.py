@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import os
+from dataclasses import asdict, dataclass, replace
+from typing import Any
+
+import onnxruntime as ort
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+@dataclass(frozen=True)
+class SessionProfile:
+    """
+    Named ONNX Runtime tuning preset.
+    ``intra_op_threads=None`` means "derive from the container CPU quota",
+    divided across ``INFERENCE_WORKERS`` unless ``split_cpus`` is off.
+    """
+
+    name: str
+    intra_op_threads: int | None = None
+    inter_op_threads: int = 1
+    graph_optimization: str = "all"
+    execution_mode: str = "sequential"
+    enable_cpu_mem_arena: bool = True
+    enable_mem_pattern: bool = True
+    allow_spinning: bool = True
+    split_cpus: bool = True
+
+
+PROFILES: dict[str, SessionProfile] = {
+    # ORT defaults, apart from sizing threads to the CPU quota
+    "default": SessionProfile("default"),
+    # Single requests: every core on one call, spin-wait between ops
+    "latency": SessionProfile("latency", split_cpus=False),
+    # Batched load with several ORT workers: split cores, no busy-waiting
+    "throughput": SessionProfile("throughput", allow_spinning=False),
+    # Small containers: one thread, no arena or pattern pre-allocation
+    "low_memory": SessionProfile(
+        "low_memory",
+        intra_op_threads=1,
+        enable_cpu_mem_arena=False,
+        enable_mem_pattern=False,
+        allow_spinning=False,
+    ),
+}
+
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring affinity and the cgroup v2 quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def resolve_profile() -> SessionProfile:
+    """Look up ``ORT_PROFILE`` and apply the per-field overrides from Settings."""
+    profile = PROFILES.get(settings.ORT_PROFILE)
+    if profile is None:
+        logger.warning(
+            f"Unknown ORT_PROFILE '{settings.ORT_PROFILE}', using 'default'. "
+            f"Available: {sorted(PROFILES)}"
+        )
+        profile = PROFILES["default"]
+
+    intra = settings.ORT_INTRA_OP_THREADS or profile.intra_op_threads
+    if intra is None:
+        workers = settings.INFERENCE_WORKERS if profile.split_cpus else 1
+        # Each ORT worker thread gets an equal share of the quota
+        intra = max(1, available_cpus() // max(1, workers))
+    return replace(
+        profile,
+        intra_op_threads=intra,
+        inter_op_threads=settings.ORT_INTER_OP_THREADS or profile.inter_op_threads,
+    )
+
+
+def file_digest(path: str) -> str:
+    """sha256 hex digest of a (possibly large) file, read in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Graph level written to the optimized-model cache. ORT_ENABLE_ALL adds
+# layout transforms (e.g. NCHWc) specific to the CPU that ran them, so the
+# cache stops at "extended"; cached graphs are loaded without optimizing
+# again, which is what makes a warm boot fast
+CACHED_OPTIMIZATION = {"basic": "basic", "extended": "extended", "all": "extended"}
+
+
+def _optimized_model_path(
+    model_path: str, profile: SessionProfile, digest: str | None
+) -> str | None:
+    """
+    Cache location for the optimized graph. The key covers the model bytes,
+    optimization level and ORT version, so stale caches are never reused.
+    """
+    cache_dir = settings.ORT_OPTIMIZED_MODEL_DIR
+    if not cache_dir or profile.graph_optimization == "disable":
+        return None
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    level = CACHED_OPTIMIZATION[profile.graph_optimization]
+    digest = digest or file_digest(model_path)
+    name = f"{stem}.{level}.ort{ort.__version__}.{digest[:16]}.onnx"
+    return os.path.join(cache_dir, name)
+
+
+def _session_options(profile: SessionProfile, level: str) -> ort.SessionOptions:
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = profile.intra_op_threads or 0
+    options.inter_op_num_threads = profile.inter_op_threads
+    options.execution_mode = EXECUTION_MODES[profile.execution_mode]
+    options.enable_cpu_mem_arena = profile.enable_cpu_mem_arena
+    options.enable_mem_pattern = profile.enable_mem_pattern
+    options.add_session_config_entry(
+        "session.intra_op.allow_spinning", "1" if profile.allow_spinning else "0"
+    )
+    options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[level]
+    return options
+
+
+def _write_optimized_model(
+    model_path: str, cached_path: str, profile: SessionProfile, providers: list[str]
+) -> None:
+    """
+    Optimize ``model_path`` into the cache. ORT writes a per-process temp
+    file that is then renamed into place, so workers booting together never
+    load a partially written graph.
+    """
+    os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+    options = _session_options(profile, CACHED_OPTIMIZATION[profile.graph_optimization])
+    tmp_path = f"{cached_path}.{os.getpid()}.tmp"
+    options.optimized_model_filepath = tmp_path
+    try:
+        ort.InferenceSession(model_path, sess_options=options, providers=providers)
+        os.replace(tmp_path, cached_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def create_session(
+    model_path: str, profile: SessionProfile, digest: str | None = None
+) -> tuple[ort.InferenceSession, dict[str, Any]]:
+    """
+    Build an InferenceSession for ``profile``. Returns the session and a
+    description of the applied options (reported by ``/v1/metadata``).
+    ``digest`` is the model's ``file_digest``, computed here if omitted.
+    """
+    providers = ["CPUExecutionProvider"]
+    cached_path = _optimized_model_path(model_path, profile, digest)
+    if cached_path is None:
+        session = ort.InferenceSession(
+            model_path,
+            sess_options=_session_options(profile, profile.graph_optimization),
+            providers=providers,
+        )
+        optimized_cache = "disabled"
+    else:
+        optimized_cache = "hit"
+        if not os.path.exists(cached_path):
+            _write_optimized_model(model_path, cached_path, profile, providers)
+            optimized_cache = "miss"
+        session = ort.InferenceSession(
+            cached_path,
+            sess_options=_session_options(profile, "disable"),
+            providers=providers,
+        )
+    info: dict[str, Any] = {
+        **asdict(profile),
+        "optimized_model_cache": optimized_cache,
+        "optimized_model_path": cached_path,
+    }
+    return session, info
@@ -0,0 +1,95 @@
+import importlib.util
+import itertools
+from typing import IO, Generator, Iterable, Iterator, NamedTuple
+
+import numpy as np
+from PIL import Image
+
+from app.inference.frames import Frame
+from app.inference.preprocessing import engine, load_image
+
+VIDEO_SUFFIXES = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+
+
+class VideoDecodingUnavailable(RuntimeError):
+    """Video input needs the optional PyAV dependency (``pip install av``)."""
+
+
+class StreamFrame(NamedTuple):
+    # Position in the source, before striding
+    frame_index: int
+    name: str | None
+    # Presentation time in seconds (video only)
+    timestamp: float | None
+    image: Image.Image | None
+    error: str | None = None
+
+
+class FrameChunk(NamedTuple):
+    frames: list[StreamFrame]
+    # One row per frame without an error, in order; None if all failed
+    tensor: np.ndarray | None
+
+
+def is_video(content_type: str | None, filename: str | None) -> bool:
+    return (content_type or "").startswith("video/") or (
+        filename or ""
+    ).lower().endswith(VIDEO_SUFFIXES)
+
+
+def video_decoding_available() -> bool:
+    return importlib.util.find_spec("av") is not None
+
+
+def iter_image_frames(
+    frames: Iterable[Frame], stride: int = 1
+) -> Generator[StreamFrame, None, None]:
+    """Decode still frames one at a time; skipped frames are never decoded."""
+    for index, frame in enumerate(frames):
+        if index % stride:
+            continue
+        try:
+            image = load_image(frame.content)
+        except Exception as e:
+            yield StreamFrame(
+                index, frame.name, None, None, f"Could not decode image: {e}"
+            )
+        else:
+            yield StreamFrame(index, frame.name, None, image)
+
+
+def iter_video_frames(
+    fileobj: IO[bytes], stride: int = 1
+) -> Generator[StreamFrame, None, None]:
+    """
+    Decode an MP4/AVI/... clip frame by frame with PyAV. Every frame has to
+    be decoded (inter-frame coding), but skipped ones are not converted.
+    """
+    try:
+        import av
+    except ImportError as e:
+        raise VideoDecodingUnavailable(
+            "Video decoding requires PyAV (pip install av)"
+        ) from e
+
+    with av.open(fileobj, mode="r") as container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        for index, frame in enumerate(container.decode(stream)):
+            if index % stride:
+                continue
+            # to_image() does the same conversion, but is untyped in PyAV's stubs
+            image = Image.fromarray(frame.to_ndarray(format="rgb24"))
+            yield StreamFrame(index, None, frame.time, image)
+
+
+def read_chunk(source: Iterator[StreamFrame], size: int) -> FrameChunk:
+    """
+    Pull up to ``size`` frames from ``source`` and preprocess them into one
+    batch. Blocking; run it off the event loop. Images are dropped once
+    preprocessed so memory stays at one chunk whatever the clip length.
+    """
+    frames = list(itertools.islice(source, size))
+    images = [f.image for f in frames if f.image is not None]
+    tensor = engine.preprocess_batch(images) if images else None
+    return FrameChunk([f._replace(image=None) for f in frames], tensor)
@@ -0,0 +1,77 @@
+import asyncio
+import io
+import logging
+import time
+
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.inference.mc_dropout import mc_dropout_uncertainty
+from app.inference.model import ModelWrapper
+from app.inference.preprocessing import prepare_input
+from app.inference.xai import render_heatmap_png
+
+logger = logging.getLogger(__name__)
+
+warmup_ms = registry.histogram(
+    "model_warmup_ms",
+    (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    "Latency of each synthetic warm-up batch",
+)
+
+
+def warmup_batch_sizes() -> list[int]:
+    """``WARMUP_BATCH_SIZES``, or every size the micro-batcher can form."""
+    if settings.WARMUP_BATCH_SIZES is not None:
+        return sorted({size for size in settings.WARMUP_BATCH_SIZES if size > 0})
+    return list(range(1, max(1, settings.BATCH_MAX_SIZE) + 1))
+
+
+def synthetic_upload(size: tuple[int, int] = (320, 256)) -> bytes:
+    """A noise PNG, so decode and resize do real work (not a constant image)."""
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (size[1], size[0]), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels, mode="L").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def warm_up(engine: ModelWrapper, batch_sizes: list[int]) -> dict[int, float]:
+    """
+    Run synthetic requests through the new session before it takes traffic:
+    decode/preprocess, one model call, heatmap rendering and MC-Dropout when
+    the model supports them, then one ONNX call per batch size (ORT
+    allocates and picks kernels per input shape).
+
+    Everything runs on a thread of its own rather than the shared pools, so
+    a reload under load neither fails on a saturated pool nor takes slots
+    from requests.
+
+    Returns the latency in ms of the model call for each batch size.
+    """
+    prepared = await asyncio.to_thread(prepare_input, synthetic_upload())
+    result = (await asyncio.to_thread(engine.predict_batch, prepared.tensor))[0]
+    if result.cam is not None:
+        await asyncio.to_thread(
+            render_heatmap_png, prepared.image_size, result.class_id, result.cam
+        )
+    if engine.mc_head is not None and result.pooled is not None:
+        await asyncio.to_thread(
+            mc_dropout_uncertainty,
+            engine.mc_head,
+            engine.postprocessor,
+            result.pooled,
+            8,
+            0,
+        )
+
+    latencies: dict[int, float] = {}
+    for size in batch_sizes:
+        batch = np.repeat(prepared.tensor, size, axis=0)
+        start = time.perf_counter()
+        await asyncio.to_thread(engine.predict_batch, batch)
+        latencies[size] = (time.perf_counter() - start) * 1000
+        warmup_ms.observe(latencies[size])
+    return latencies
@@ -1,77 +1,186 @@
-import numpy as np
-from PIL import Image
 import base64
+import logging
+import os
 from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
 from app.core.config import settings
+from app.inference.preprocessing import engine as preprocessing_engine
 
-def generate_heatmap(image: Image.Image, label_id: int) -> str | None:
+logger = logging.getLogger(__name__)
+
+
+def _hardswish_grad(x: np.ndarray) -> np.ndarray:
+    grad = np.where(x < -3, 0.0, np.where(x > 3, 1.0, (2 * x + 3) / 6))
+    return grad.astype(np.float32)
+
+
+class CamEngine:
     """
-    Generate a Grad-CAM heatmap.
-    For this demo/research code (if no model attached), we simulate a heatmap.
+    Grad-CAM without a backward pass.
+
+    The exported graph returns the last conv feature maps A (N, K, h, w)
+    next to the logits. The head is global-avg-pool -> Linear -> Hardswish
+    -> Linear, so d(logit_c)/dA is available in closed form from the
+    classifier weights; the CAM is then relu(sum_k alpha_k * A_k). A head
+    with a single Linear layer reduces to classic CAM.
     """
-    width, height = image.size
 
-    # Simulate a heatmap based on label_id (deterministic for same label)
-    # In a real scenario, we would use hooks on the last conv layer.
+    def __init__(self, weights: dict[str, np.ndarray]):
+        self.fc1_weight: np.ndarray | None
+        if "fc1_weight" in weights:
+            self.fc1_weight = weights["fc1_weight"].astype(np.float32)  # (H, K)
+            self.fc1_bias = weights["fc1_bias"].astype(np.float32)
+            self.fc2_weight = weights["fc2_weight"].astype(np.float32)  # (C, H)
+        else:
+            self.fc1_weight = None
+            self.fc2_weight = weights["weight"].astype(np.float32)  # (C, K)
 
-    # Create a grid
-    x = np.linspace(0, 1, width)
-    y = np.linspace(0, 1, height)
-    xv, yv = np.meshgrid(x, y)
+    @classmethod
+    def from_file(cls, path: str | None) -> "CamEngine | None":
+        if not path or not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls({key: data[key] for key in data.files})
 
-    # Center of attention depends on label to make it look "smart"
-    # Centers for new 6-class schema:
-    # ["Abdominal", "Brain", "Cervix", "Femur", "Other", "Thorax"]
-    centers = {
-        0: (0.5, 0.5), # Abdominal (Center)
-        1: (0.5, 0.4), # Brain (Upper Center)
-        2: (0.5, 0.8), # Cervix (Lower)
-        3: (0.3, 0.6), # Femur (Left-Mid)
-        4: (0.5, 0.5), # Other (Center)
-        5: (0.6, 0.4), # Thorax (Right-Upper)
-    }
-    cx, cy = centers.get(label_id, (0.5, 0.5))
+    def channel_weights(self, pooled: np.ndarray, class_ids: np.ndarray) -> np.ndarray:
+        """alpha (N, K): gradient of each target logit w.r.t. pooled features."""
+        out_weights: np.ndarray = self.fc2_weight[class_ids]  # (N, H) or (N, K)
+        if self.fc1_weight is None:
+            return out_weights
+        hidden = pooled @ self.fc1_weight.T + self.fc1_bias
+        alpha: np.ndarray = (out_weights * _hardswish_grad(hidden)) @ self.fc1_weight
+        return alpha
 
-    # Gaussian blob
-    sigma = 0.2
-    d2 = (xv - cx)**2 + (yv - cy)**2
-    g = np.exp(-d2 / (2 * sigma**2))
+    def compute(self, features: np.ndarray, class_ids: np.ndarray) -> np.ndarray:
+        """Low-res CAMs (N, h, w) scaled to [0, 1] per sample."""
+        features = features.astype(np.float32, copy=False)
+        alpha = self.channel_weights(features.mean(axis=(2, 3)), class_ids)
+        cams: np.ndarray = np.maximum(np.einsum("nk,nkhw->nhw", alpha, features), 0)
+        peak = cams.max(axis=(1, 2), keepdims=True)
+        np.divide(cams, peak, out=cams, where=peak > 0)
+        return cams
 
-    # Normalize to 0-255
-    heatmap_norm = (g * 255).astype(np.uint8)
 
-    # Apply colormap (Jet-like: Blue -> Green -> Red)
-    # Simple manual mapping
-    heatmap_img = Image.fromarray(heatmap_norm, mode="L")
-    heatmap_colored = Image.new("RGBA", (width, height))
+def default_cam_weights_path(model_path: str) -> str:
+    """``<model>.cam.npz`` as written by ``convert_to_onnx.py``."""
+    return settings.XAI_CAM_WEIGHTS_PATH or os.path.splitext(model_path)[0] + ".cam.npz"
 
-    # We can use PIL to colorize if we had a palette,
-    # but manually creating RGBA is easy enough with numpy
-    # Lets make it simple: Red channel = intensity, alpha = intensity/2
 
-    # Create RGBA array
-    rgba = np.zeros((height, width, 4), dtype=np.uint8)
-    rgba[..., 0] = 255 # Red
-    # Green and Blue reduce as intensity increases to make it "hot"
-    # Actually standard heapmap is usually:
-    # Low: Blue, Mid: Green, High: Red
-    # Implementation of simple Jet-ish mapping:
+def generate_heatmap(
+    image_size: tuple[int, int], label_id: int, cam: np.ndarray | None = None
+) -> str | None:
+    """
+    Generate a Grad-CAM heatmap for an image of the given (width, height),
+    as a base64 PNG. See ``render_heatmap_png``.
+    """
+    png = render_heatmap_png(image_size, label_id, cam)
+    return base64.b64encode(png).decode("utf-8")
+
 
-    vals = heatmap_norm / 255.0
+def render_heatmap_png(
+    image_size: tuple[int, int], label_id: int, cam: np.ndarray | None = None
+) -> bytes:
+    """
+    Render the heatmap overlay as PNG bytes, the size of the image (capped
+    at ``XAI_MAX_OUTPUT_DIM``).
+    ``cam`` is the low-res map from ``CamEngine``; without one (model exported
+    without feature maps) a label-dependent placeholder blob is drawn.
+    The map only covers the region the model saw (Resize + CenterCrop, see
+    ``PreprocessingEngine.crop_box``): it is upscaled into that box and the
+    rest of the overlay stays transparent.
+    Only the size is needed, so this can run in a process pool.
+    """
+    # Everything is computed at grid resolution; the only full-size
+    # buffers are the single uint8 upscale and the canvas it is pasted on
+    if cam is None:
+        cam = _placeholder_blob(PLACEHOLDER_GRID, label_id)
+    levels = (np.clip(cam, 0, 1) * 255).astype(np.uint8)
+    size = overlay_size(image_size)
+    left, top, right, bottom = _overlay_crop_box(image_size, size)
+    heat = Image.fromarray(levels).resize(
+        (right - left, bottom - top), Image.Resampling.BILINEAR
+    )
+    # Palette index 0 is fully transparent
+    overlay = Image.new("L", size, 0)
+    overlay.paste(heat, (left, top))
 
+    # Palette PNG: 1 byte/pixel, colors and alpha come from the LUT
+    overlay.putpalette(HEATMAP_LUT, rawmode="RGBA")
+    buffer = BytesIO()
+    overlay.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def overlay_size(image_size: tuple[int, int]) -> tuple[int, int]:
+    """Image size scaled down (aspect kept) so neither side exceeds the cap."""
+    width, height = image_size
+    limit = settings.XAI_MAX_OUTPUT_DIM
+    if limit <= 0 or max(width, height) <= limit:
+        return width, height
+    scale = limit / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _overlay_crop_box(
+    image_size: tuple[int, int], size: tuple[int, int]
+) -> tuple[int, int, int, int]:
+    """The model's crop box of ``image_size``, in overlay pixels."""
+    left, top, right, bottom = preprocessing_engine.crop_box(image_size)
+    sx, sy = size[0] / image_size[0], size[1] / image_size[1]
+    box = (round(left * sx), round(top * sy), round(right * sx), round(bottom * sy))
+    # At least one pixel, even for tiny capped overlays
+    return box[0], box[1], max(box[2], box[0] + 1), max(box[3], box[1] + 1)
+
+
+def _build_lut() -> bytes:
+    """256-entry RGBA colormap (Jet-like: Blue -> Green -> Red)."""
+    vals = np.arange(256) / 255.0
+    lut = np.empty((256, 4), dtype=np.uint8)
     # Red: 0 at 0.5, 1 at 0.75+
-    rgba[..., 0] = np.clip((vals - 0.5) * 2 * 255, 0, 255).astype(np.uint8)
+    lut[:, 0] = np.clip((vals - 0.5) * 2 * 255, 0, 255)
     # Green: 1 at 0.5, 0 at 0 and 1
-    rgba[..., 1] = np.clip((1 - np.abs(vals - 0.5) * 2) * 255, 0, 255).astype(np.uint8)
+    lut[:, 1] = np.clip((1 - np.abs(vals - 0.5) * 2) * 255, 0, 255)
     # Blue: 1 at 0-0.25, 0 at 0.5+
-    rgba[..., 2] = np.clip((0.5 - vals) * 2 * 255, 0, 255).astype(np.uint8)
-
+    lut[:, 2] = np.clip((0.5 - vals) * 2 * 255, 0, 255)
     # Alpha: varying with intensity (transparent at low attributes)
-    rgba[..., 3] = np.clip(vals * 200, 0, 180).astype(np.uint8)
+    lut[:, 3] = np.clip(vals * 200, 0, 180)
+    return lut.tobytes()
+
+
+HEATMAP_LUT = _build_lut()
+
+# Placeholder blobs are smooth, so a small grid upsamples cleanly
+PLACEHOLDER_GRID = 32
 
-    overlay = Image.fromarray(rgba, mode="RGBA")
 
-    return image_to_base64(overlay)
+def _placeholder_blob(grid: int, label_id: int) -> np.ndarray:
+    """Simulated heatmap based on label_id (deterministic for same label)."""
+
+    # Normalized coordinates; like a CAM, the grid covers the crop box
+    x = np.linspace(0, 1, grid, dtype=np.float32)
+
+    # Center of attention depends on label to make it look "smart"
+    # Centers for new 6-class schema:
+    # ["Abdominal", "Brain", "Cervix", "Femur", "Other", "Thorax"]
+    centers = {
+        0: (0.5, 0.5),  # Abdominal (Center)
+        1: (0.5, 0.4),  # Brain (Upper Center)
+        2: (0.5, 0.8),  # Cervix (Lower)
+        3: (0.3, 0.6),  # Femur (Left-Mid)
+        4: (0.5, 0.5),  # Other (Center)
+        5: (0.6, 0.4),  # Thorax (Right-Upper)
+    }
+    cx, cy = centers.get(label_id, (0.5, 0.5))
+
+    # Gaussian blob (separable: outer product of two 1-D profiles)
+    sigma = 0.2
+    gx = np.exp(-((x - cx) ** 2) / (2 * sigma**2))
+    gy = np.exp(-((x - cy) ** 2) / (2 * sigma**2))
+    return np.outer(gy, gx)
+
 
 def image_to_base64(image: Image.Image) -> str:
     buffer = BytesIO()
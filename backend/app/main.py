@@ -1,27 +1,43 @@
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
-from typing import AsyncGenerator
-import uuid
 import logging
 import os
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 
+from app.api.v1.router import api_router
 from app.core.config import settings
 from app.core.logging import setup_logging
-from app.api.v1.router import api_router
+from app.core.metrics import PROMETHEUS_CONTENT_TYPE, registry
+from app.core.middleware import RequestContextMiddleware
+from app.inference.admission import admission_controller
+from app.inference.executor import inference_executor
+from app.inference.registry import model_registry
 
 # Setup logging
 setup_logging()
 logger = logging.getLogger(__name__)
 
+
 @asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Load model on startup
-    if not os.path.exists(settings.MODEL_PATH):
-        logger.warning(f"Model not found at {settings.MODEL_PATH}. Inference will fail until model is present.")
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    # Load models on startup
+    inference_executor.start()
+    await model_registry.start()
+    for loaded in model_registry.models():
+        if not os.path.exists(loaded.spec.path):
+            logger.warning(
+                f"Model '{loaded.spec.name}' not found at {loaded.spec.path}. "
+                "Inference will fail until model is present."
+            )
     yield
+    await model_registry.stop()
+    inference_executor.stop()
     logger.info("Shutting down")
 
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
@@ -30,27 +46,29 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
-# CORS
+# Request ID, timings, in-flight limit, admission control (pure ASGI)
+app.add_middleware(RequestContextMiddleware, admission=admission_controller)
+
+# CORS, added last so it is outermost: 429/503 rejections carry its headers
+# (browsers can read them), and preflights never wait for admission
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.BACKEND_CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-Request-ID"],
 )
 
-# Request ID Middleware
-@app.middleware("http")
-async def request_id_middleware(request: Request, call_next): # type: ignore
-    request_id = str(uuid.uuid4())
-    # Inject request_id into log context could be done here with ContextVar
-    # For simplicity, we just add it to response headers
-    response = await call_next(request)
-    response.headers["X-Request-ID"] = request_id
-    return response
-
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Prometheus scrape endpoint (text exposition format)."""
+    return Response(registry.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.get("/")
-def root(): # type: ignore
+def root():  # type: ignore
     return {"message": "Fetal Plane Explorer API. Go to /docs for API documentation."}
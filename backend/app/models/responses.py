@@ -1,19 +1,78 @@
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
+ExplainMode = Literal["none", "lazy", "inline"]
+# Batch responses never inline overlays
+BatchExplainMode = Literal["none", "lazy"]
+# Temporal smoothing for /v1/predict/stream (app/inference/sequence.py)
+SmoothingMode = Literal["none", "ema", "hmm"]
+
+
 class PredictionResult(BaseModel):
     label: str
     class_id: int
     confidence: float
 
+
+class McDropoutMetrics(BaseModel):
+    passes: int = Field(..., description="Number of stochastic passes T")
+    class_id: int = Field(..., description="Top class of the mean MC prediction")
+    mean_confidence: float
+    confidence_std: float = Field(
+        ..., description="Std of the top-class probability across passes"
+    )
+    predictive_entropy: float = Field(
+        ..., description="Total uncertainty: entropy of the mean prediction"
+    )
+    aleatoric: float = Field(
+        ..., description="Expected entropy over passes (data uncertainty)"
+    )
+    epistemic: float = Field(..., description="Mutual information (model uncertainty)")
+
+
 class UncertaintyMetrics(BaseModel):
-    predictive_entropy: float = Field(..., description="Entropy of the predictive distribution")
+    predictive_entropy: float = Field(
+        ..., description="Entropy of the predictive distribution"
+    )
     calibrated_confidence: float = Field(..., description="Calibrated top-1 confidence")
+    mc_dropout: McDropoutMetrics | None = None
+
 
 class ExplanationArtifacts(BaseModel):
+    mode: ExplainMode = "inline"
     heatmap_base64: str | None = None
     overlay_base64: str | None = None
+    heatmap_content_id: str | None = Field(
+        default=None,
+        description="Content-ID of the raw PNG part in multipart/mixed responses",
+    )
+    explanation_id: str | None = Field(
+        default=None, description="Handle for explain=lazy"
+    )
+    explanation_url: str | None = Field(
+        default=None, description="Where to fetch the lazy overlay PNG"
+    )
+
 
 class PredictionResponse(BaseModel):
     prediction: PredictionResult
     uncertainty: UncertaintyMetrics
     explanation: ExplanationArtifacts
+
+
+class FramePrediction(BaseModel):
+    index: int = Field(..., description="Position of the frame in the request")
+    filename: str | None = None
+    prediction: PredictionResult | None = None
+    uncertainty: UncertaintyMetrics | None = None
+    explanation: ExplanationArtifacts | None = None
+    error: str | None = Field(
+        default=None, description="Why this frame has no prediction"
+    )
+
+
+class BatchPredictionResponse(BaseModel):
+    num_frames: int
+    num_failed: int
+    frames: list[FramePrediction]
@@ -0,0 +1,149 @@
+"""
+Per-request overhead of the request middleware, in process (no sockets).
+
+    python -m scripts.bench_middleware                 # 2000 requests per case
+    python -m scripts.bench_middleware --requests 5000
+
+Run from backend/. The same routes are served three ways: with no request
+middleware, with the former ``@app.middleware("http")`` version
+(Starlette's ``BaseHTTPMiddleware``) and with ``RequestContextMiddleware``;
+overhead is each one's median latency minus the bare app's. Without the
+model file (Git LFS), /v1/predict runs on a session returning zeros, which
+leaves the middleware cost unchanged.
+"""
+
+import argparse
+import asyncio
+import io
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable
+
+import httpx
+import numpy as np
+from fastapi import FastAPI, Request, Response
+from PIL import Image
+
+from app.api.v1.router import api_router
+from app.core.config import settings
+from app.core.logging import request_id_var, resolve_request_id
+from app.core.middleware import RequestContextMiddleware
+from app.core.timing import start_request
+from app.inference.cache import prediction_cache
+from app.inference.registry import model_registry
+from app.main import lifespan
+
+
+async def base_http_request_id(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """The request middleware before the pure ASGI rewrite."""
+    request_id = resolve_request_id(request.headers.get("x-request-id"))
+    request_id_var.set(request_id)
+    timings = start_request()
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    response.headers["Server-Timing"] = timings.finish()
+    return response
+
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+    if variant == "base_http":
+        app.middleware("http")(base_http_request_id)
+    elif variant == "asgi":
+        app.add_middleware(RequestContextMiddleware)
+    app.include_router(api_router, prefix=settings.API_V1_STR)
+    return app
+
+
+class ZeroSession:
+    """Constant outputs with the served model's shapes."""
+
+    def __init__(self, num_classes: int) -> None:
+        self.num_classes = num_classes
+
+    def get_inputs(self) -> list[Any]:
+        return [
+            type("Input", (), {"name": "input", "shape": ["batch_size", 3, 224, 224]})
+        ]
+
+    def get_outputs(self) -> list[Any]:
+        return [
+            type("Output", (), {"name": name, "shape": []})
+            for name in ("output", "features")
+        ]
+
+    def run(self, output_names: Any, feeds: dict[str, np.ndarray]) -> list[np.ndarray]:
+        n = feeds["input"].shape[0]
+        return [
+            np.zeros((n, self.num_classes), np.float32),
+            np.zeros((n, 3, 7, 7), np.float32),
+        ]
+
+
+def png_upload() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (320, 240), (90, 90, 90)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def measure(app: FastAPI, path: str, requests: int, image: bytes) -> list[float]:
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for _ in range(requests):
+            prediction_cache.clear()
+            start = time.perf_counter()
+            if path == "/v1/predict":
+                files = {"file": ("frame.png", image, "image/png")}
+                response = await client.post(
+                    path, files=files, params={"explain": "none"}
+                )
+            else:
+                response = await client.get(path)
+            latencies.append((time.perf_counter() - start) * 1e6)
+            if response.status_code != 200:
+                raise RuntimeError(
+                    f"{path} returned {response.status_code}: {response.text}"
+                )
+    return latencies[requests // 10 :]  # drop warm-up
+
+
+async def run(requests: int) -> None:
+    variants = {name: build_app(name) for name in ("none", "base_http", "asgi")}
+    image = png_upload()
+    async with lifespan(variants["none"]):
+        engine = model_registry.get().engine
+        if engine.session is None:
+            print("model not loaded: /v1/predict uses a zero-output session\n")
+            engine.session = ZeroSession(len(engine.classes))  # type: ignore[assignment]
+        header = ("path", "middleware", "p50 us", "p90 us", "overhead us")
+        print("{:<14} {:<11} {:>9} {:>9} {:>12}".format(*header))
+        for path in (
+            f"{settings.API_V1_STR}/healthz",
+            f"{settings.API_V1_STR}/predict",
+        ):
+            medians = {}
+            for name, app in variants.items():
+                latencies = sorted(await measure(app, path, requests, image))
+                medians[name] = statistics.median(latencies)
+                p90 = latencies[int(len(latencies) * 0.9)]
+                overhead = medians[name] - medians["none"]
+                row = (path, name, medians[name], p90, overhead)
+                print("{:<14} {:<11} {:9.1f} {:9.1f} {:12.1f}".format(*row))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
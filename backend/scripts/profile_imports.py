@@ -0,0 +1,66 @@
+"""
+Import-time profile of the API, from ``python -X importtime``.
+
+    python scripts/profile_imports.py                  # top 25 by cumulative time
+    python scripts/profile_imports.py --budget-ms 1500 # exit 1 if over budget
+
+Run from backend/. Also fails if ``import app.main`` pulls in any of the
+heavy runtime modules, which must stay lazy (see app/core/lazy.py).
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ("numpy", "PIL", "onnxruntime")
+
+
+def profile(module: str) -> list[tuple[int, int, str]]:
+    """(self_us, cumulative_us, name) for every module imported by ``module``."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    rows = profile(args.module)
+    total_ms = next(cum for _, cum, name in rows if name.strip() == args.module) / 1000
+    print(f"{'self ms':>9} {'cum ms':>9}  module")
+    slowest = sorted(rows, key=lambda r: r[1], reverse=True)[: args.top]
+    for self_us, cumulative_us, name in slowest:
+        print(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
+    print(f"\nimport {args.module}: {total_ms:.1f} ms")
+
+    status = 0
+    loaded = {name.strip().split(".")[0] for _, _, name in rows}
+    heavy = [module for module in HEAVY_MODULES if module in loaded]
+    if heavy:
+        print(f"FAIL: eagerly imports {', '.join(heavy)}")
+        status = 1
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"FAIL: over the {args.budget_ms:.0f} ms budget")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,64 @@
+from types import SimpleNamespace
+from typing import Any, Generator
+
+import numpy as np
 import pytest
-from typing import Generator
 from fastapi.testclient import TestClient
+
+from app.inference.cache import prediction_cache
+from app.inference.registry import model_registry
 from app.main import app
 
+
+class FakeSession:
+    """
+    Stand-in for ``ort.InferenceSession`` so tests run without the LFS model.
+    Logits are a fixed linear function of the per-channel image mean; the
+    "features" output stands in for the last conv maps.
+    """
+
+    def __init__(self, num_classes: int = 6) -> None:
+        rng = np.random.default_rng(0)
+        self.weights = rng.standard_normal((3, num_classes)).astype(np.float32)
+        self.batch_sizes: list[int] = []
+
+    def get_inputs(self) -> list[Any]:
+        return [SimpleNamespace(name="input", shape=["batch_size", 3, 224, 224])]
+
+    def get_outputs(self) -> list[Any]:
+        return [
+            SimpleNamespace(name="output", shape=["batch_size", 6]),
+            SimpleNamespace(name="features", shape=["batch_size", 3, 7, 7]),
+        ]
+
+    def run(self, output_names: Any, feeds: dict[str, np.ndarray]) -> list[np.ndarray]:
+        batch = feeds["input"]
+        self.batch_sizes.append(batch.shape[0])
+        # 7x7 "feature maps": the image average-pooled in 32x32 blocks
+        features = batch.reshape(batch.shape[0], 3, 7, 32, 7, 32).mean(axis=(3, 5))
+        return [features.mean(axis=(2, 3)) @ self.weights, features]
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_session() -> Generator[FakeSession, None, None]:
+    # Load (without the model file) before startup, so the app keeps these engines
+    model_registry.load_all()
+    model_engine = model_registry.get().engine
+    original = model_engine.session
+    session = FakeSession()
+    model_engine.session = session  # type: ignore[assignment]
+    yield session
+    model_engine.session = original
+
+
+@pytest.fixture(autouse=True)
+def clear_prediction_cache() -> Generator[None, None, None]:
+    # Tests reuse identical images; keep each one on the uncached path
+    prediction_cache.clear()
+    yield
+    prediction_cache.clear()
+
+
 @pytest.fixture(scope="module")
 def client() -> Generator[TestClient, None, None]:
     with TestClient(app) as c:
@@ -0,0 +1,198 @@
+import asyncio
+import io
+from collections import OrderedDict
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from starlette.types import Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.middleware import RequestContextMiddleware
+from app.inference.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    admission_controller,
+    default_bulk_capacity,
+    default_capacity,
+    route_priority,
+)
+
+
+def _png() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), (100, 150, 200)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_token_bucket_per_client() -> None:
+    async def scenario() -> None:
+        controller = AdmissionController(capacity=10, rate=1.0, burst=2)
+        for _ in range(2):
+            controller.release(
+                "interactive", await controller.acquire("a", "interactive")
+            )
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("a", "interactive")
+        assert rejected.value.status_code == 429 and rejected.value.retry_after == 1
+        # Other clients have their own quota
+        await controller.acquire("b", "interactive")
+
+    asyncio.run(scenario())
+
+
+def test_freed_slots_go_to_interactive_first() -> None:
+    async def scenario() -> list[str]:
+        controller = AdmissionController(capacity=2, bulk_capacity=1)
+        order: list[str] = []
+
+        async def request(name: str, priority: str) -> None:
+            await controller.acquire(name, priority)  # type: ignore[arg-type]
+            order.append(name)
+
+        bulk = await controller.acquire("bulk-1", "bulk")
+        # Bulk may only hold half the slots, so the second one queues
+        waiting_bulk = asyncio.create_task(request("bulk-2", "bulk"))
+        single = await controller.acquire("single-1", "interactive")
+        waiting_single = asyncio.create_task(request("single-2", "interactive"))
+        await asyncio.sleep(0)
+        assert order == [] and controller.in_flight == {"interactive": 1, "bulk": 1}
+
+        controller.release("bulk", bulk)
+        await waiting_single
+        assert not waiting_bulk.done()
+        controller.release("interactive", single)
+        await waiting_bulk
+        return order
+
+    assert asyncio.run(scenario()) == ["single-2", "bulk-2"]
+
+
+def test_overload_is_shed_on_arrival_or_after_the_wait_budget() -> None:
+    async def scenario() -> None:
+        controller = AdmissionController(
+            capacity=1, max_wait_ms={"interactive": 20.0, "bulk": 20.0}
+        )
+        await controller.acquire("a", "interactive")
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await controller.acquire("b", "interactive")
+        assert timed_out.value.status_code == 503
+        assert not controller._queues["interactive"]
+
+        # Requests have been holding their slot for ~1 s: a 20 ms budget
+        # cannot be met, so the next one is refused without queueing
+        controller.service_ms["interactive"] = 1000.0
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("c", "interactive")
+        assert loop.time() - start < 0.01
+
+    asyncio.run(scenario())
+
+
+def test_slot_granted_as_the_wait_times_out_is_given_back(monkeypatch) -> None:  # type: ignore[no-untyped-def]
+    from app.inference import admission
+
+    async def scenario() -> None:
+        controller = AdmissionController(capacity=1)
+        first = await controller.acquire("a", "interactive")
+
+        async def racing_wait_for(waiter, timeout):  # type: ignore[no-untyped-def]
+            # The holder finishes in the same tick the budget runs out
+            # (asyncio.wait_for on Python 3.12+ then still times out)
+            controller.release("interactive", first)
+            assert waiter.done()
+            raise asyncio.TimeoutError
+
+        monkeypatch.setattr(admission.asyncio, "wait_for", racing_wait_for)
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("b", "interactive")
+        assert controller.in_flight == {"interactive": 0, "bulk": 0}
+
+    asyncio.run(scenario())
+
+
+def test_capacity_follows_ort_threads_and_executor_limits(monkeypatch) -> None:  # type: ignore[no-untyped-def]
+    monkeypatch.setattr(settings, "INFERENCE_MAX_PENDING", 4)
+    monkeypatch.setattr(settings, "PREPROCESS_MAX_PENDING", 64)
+    monkeypatch.setattr(settings, "BATCH_MAX_SIZE", 8)
+    monkeypatch.setattr(settings, "ORT_INTRA_OP_THREADS", 3)
+    monkeypatch.setattr(settings, "INFERENCE_WORKERS", 2)
+    # Bulk: 2 of 4 model calls, 32 of 64 decode jobs at 16 per request
+    assert default_bulk_capacity() == 2
+    # One request per ORT thread: 3 intra-op threads x 2 workers
+    assert default_capacity() == 6
+    # ... but no more than the 32 jobs the preprocessing pool keeps
+    monkeypatch.setattr(settings, "ORT_INTRA_OP_THREADS", 64)
+    assert default_capacity() == 32
+    monkeypatch.setattr(settings, "BATCH_MAX_SIZE", 32)
+    assert default_bulk_capacity() == 1
+    assert route_priority("/v1/predict/stream") == "bulk"
+    assert route_priority("/v1/explanations/abc") == "interactive"
+    assert route_priority("/v1/models") is None
+
+
+def test_rejected_before_the_body_is_read() -> None:
+    async def scenario() -> list[Message]:
+        controller = AdmissionController(
+            capacity=1, max_wait_ms={"interactive": 0.0, "bulk": 0.0}
+        )
+        await controller.acquire("other", "interactive")
+        sent: list[Message] = []
+
+        async def app(scope: Scope, receive: Receive, send: Send) -> None:
+            raise AssertionError("the app must not run")
+
+        async def receive() -> Message:
+            raise AssertionError("the body must not be read")
+
+        async def send(message: Message) -> None:
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/v1/predict", "headers": []}
+        await RequestContextMiddleware(app, admission=controller)(scope, receive, send)
+        return sent
+
+    start, body = asyncio.run(scenario())
+    assert start["status"] == 503
+    assert (b"retry-after", b"1") in start["headers"]
+    assert b"busy" in body["body"]
+
+
+def test_predict_rate_limited_with_retry_after(client: TestClient, monkeypatch) -> None:  # type: ignore[no-untyped-def]
+    monkeypatch.setattr(admission_controller, "rate", 0.01)
+    monkeypatch.setattr(admission_controller, "burst", 1.0)
+    monkeypatch.setattr(admission_controller, "_buckets", OrderedDict())
+    files = {"file": ("a.png", _png(), "image/png")}
+    assert client.post("/v1/predict?explain=none", files=files).status_code == 200
+    limited = client.post("/v1/predict?explain=none", files=files)
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+    # Quotas are per client
+    other = client.post(
+        "/v1/predict?explain=none", files=files, headers={"X-API-Key": "k2"}
+    )
+    assert other.status_code == 200
+    assert "admission;dur=" in other.headers["Server-Timing"]
+
+
+def test_rejections_carry_cors_headers(client: TestClient, monkeypatch) -> None:  # type: ignore[no-untyped-def]
+    monkeypatch.setattr(admission_controller, "rate", 0.01)
+    monkeypatch.setattr(admission_controller, "burst", 1.0)
+    monkeypatch.setattr(admission_controller, "_buckets", OrderedDict())
+    origin = settings.BACKEND_CORS_ORIGINS[0]
+    files = {"file": ("a.png", _png(), "image/png")}
+    headers = {"Origin": origin, "X-API-Key": "cors"}
+    client.post("/v1/predict?explain=none", files=files, headers=headers)
+    limited = client.post("/v1/predict?explain=none", files=files, headers=headers)
+    assert limited.status_code == 429
+    # The browser can read the rejection and its Retry-After
+    assert limited.headers["access-control-allow-origin"] == origin
+    assert "retry-after" in limited.headers["access-control-expose-headers"].lower()
+    # Preflights are answered before admission, so they use no quota
+    preflight = client.options(
+        "/v1/predict",
+        headers={"Origin": origin, "Access-Control-Request-Method": "POST"},
+    )
+    assert preflight.status_code == 200
@@ -1,12 +1,15 @@
-from fastapi.testclient import TestClient
 import io
+
+from fastapi.testclient import TestClient
 from PIL import Image
 
+
 def test_health(client: TestClient) -> None:
     response = client.get("/v1/healthz")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
 
+
 def test_metadata(client: TestClient) -> None:
     response = client.get("/v1/metadata")
     assert response.status_code == 200
@@ -14,9 +17,11 @@ def test_metadata(client: TestClient) -> None:
     assert "version" in data
     assert "model_mode" in data
 
+
 def test_predict_validation_error(client: TestClient) -> None:
     response = client.post("/v1/predict")
-    assert response.status_code == 422 # Missing file
+    assert response.status_code == 422  # Missing file
+
 
 def test_predict_synthetic(client: TestClient) -> None:
     # Create dummy image
@@ -24,17 +29,195 @@ def test_predict_synthetic(client: TestClient) -> None:
     buf = io.BytesIO()
     img.save(buf, format="PNG")
     buf.seek(0)
-    
+
     response = client.post(
-        "/v1/predict",
-        files={"file": ("test.png", buf, "image/png")}
+        "/v1/predict", files={"file": ("test.png", buf, "image/png")}
     )
     assert response.status_code == 200
     data = response.json()
-    
+
     assert "prediction" in data
     assert "uncertainty" in data
     assert "explanation" in data
     assert data["prediction"]["class_id"] >= 0
     assert data["uncertainty"]["predictive_entropy"] > 0
     assert data["explanation"]["heatmap_base64"] is not None
+
+
+def test_predict_saturated_returns_retry_after(client: TestClient, monkeypatch) -> None:  # type: ignore[no-untyped-def]
+    from app.inference.executor import inference_executor
+
+    assert inference_executor.preprocessing is not None
+    monkeypatch.setattr(inference_executor.preprocessing, "max_pending", 0)
+
+    buf = io.BytesIO()
+    Image.new("RGB", (32, 32)).save(buf, format="PNG")
+    buf.seek(0)
+    files = {"file": ("test.png", buf, "image/png")}
+    response = client.post("/v1/predict", files=files)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def _png(size: tuple[int, int] = (64, 48)) -> io.BytesIO:
+    buf = io.BytesIO()
+    Image.new("RGB", size, color="gray").save(buf, format="PNG")
+    buf.seek(0)
+    return buf
+
+
+def test_predict_lazy_explanation(client: TestClient) -> None:
+    response = client.post(
+        "/v1/predict?explain=lazy", files={"file": ("test.png", _png(), "image/png")}
+    )
+    assert response.status_code == 200
+    explanation = response.json()["explanation"]
+    assert explanation["heatmap_base64"] is None
+    assert explanation["explanation_id"]
+
+    overlay = client.get(explanation["explanation_url"])
+    assert overlay.status_code == 200
+    assert overlay.headers["content-type"] == "image/png"
+    assert Image.open(io.BytesIO(overlay.content)).size == (64, 48)
+
+
+def test_predict_without_explanation(client: TestClient) -> None:
+    response = client.post(
+        "/v1/predict?explain=none", files={"file": ("test.png", _png(), "image/png")}
+    )
+    assert response.status_code == 200
+    explanation = response.json()["explanation"]
+    assert explanation["heatmap_base64"] is None
+    assert explanation["explanation_id"] is None
+
+
+def test_unknown_explanation_is_404(client: TestClient) -> None:
+    assert client.get("/v1/explanations/does-not-exist").status_code == 404
+
+
+def test_predict_multipart_response(client: TestClient) -> None:
+    import json
+    from email.parser import BytesParser
+
+    response = client.post(
+        "/v1/predict",
+        files={"file": ("test.png", _png(), "image/png")},
+        headers={"Accept": "multipart/mixed"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("multipart/mixed")
+
+    content_type = response.headers["content-type"].encode()
+    message = BytesParser().parsebytes(
+        b"Content-Type: " + content_type + b"\r\n\r\n" + response.content
+    )
+    json_part, png_part = message.get_payload()
+    data = json.loads(json_part.get_payload(decode=True))
+    assert data["explanation"]["heatmap_base64"] is None
+    assert png_part["Content-ID"] == f"<{data['explanation']['heatmap_content_id']}>"
+    assert Image.open(io.BytesIO(png_part.get_payload(decode=True))).size == (64, 48)
+
+
+def test_predict_repeated_upload_hits_cache(client: TestClient, fake_session) -> None:  # type: ignore[no-untyped-def]
+    url = "/v1/predict?explain=none"
+    first = client.post(url, files={"file": ("a.png", _png(), "image/png")})
+    runs = len(fake_session.batch_sizes)
+    second = client.post(url, files={"file": ("b.png", _png(), "image/png")})
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert len(fake_session.batch_sizes) == runs
+    assert second.json()["prediction"] == first.json()["prediction"]
+
+
+def test_predict_batch_isolates_bad_frames(client: TestClient, fake_session) -> None:  # type: ignore[no-untyped-def]
+    runs = len(fake_session.batch_sizes)
+    files = [
+        ("files", ("a.png", _png((64, 48)), "image/png")),
+        ("files", ("broken.png", io.BytesIO(b"not an image"), "image/png")),
+        ("files", ("c.png", _png((32, 32)), "image/png")),
+    ]
+    response = client.post("/v1/predict/batch", files=files)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["num_frames"], data["num_failed"]) == (3, 1)
+    assert [f["filename"] for f in data["frames"]] == ["a.png", "broken.png", "c.png"]
+    assert data["frames"][1]["prediction"] is None and data["frames"][1]["error"]
+    assert data["frames"][2]["explanation"]["heatmap_base64"] is None
+    # Both good frames went through a single ONNX call
+    assert fake_session.batch_sizes[runs:] == [2]
+
+
+def test_predict_batch_matches_single_predictions(  # type: ignore[no-untyped-def]
+    client: TestClient, fake_session, monkeypatch
+) -> None:
+    from app.core.config import settings
+    from app.inference.cache import prediction_cache
+
+    # Several chunks through the two reused batch buffers, one frame failing
+    monkeypatch.setattr(settings, "BATCH_MAX_SIZE", 2)
+    colors = [(200, 30, 30), (30, 200, 30), (30, 30, 200), (120, 120, 10)]
+    images = [Image.new("RGB", (80, 60), color) for color in colors]
+    uploads = []
+    for image in images:
+        buf = io.BytesIO()
+        image.save(buf, format="PNG")
+        uploads.append(buf.getvalue())
+    files = [
+        ("files", (f"{idx}.png", data, "image/png")) for idx, data in enumerate(uploads)
+    ]
+    files.insert(0, ("files", ("broken.png", b"not an image", "image/png")))
+    frames = client.post("/v1/predict/batch", files=files).json()["frames"]
+    del frames[0]
+
+    prediction_cache.clear()
+    for frame, data in zip(frames, uploads, strict=True):
+        single = client.post(
+            "/v1/predict?explain=none", files={"file": ("a.png", data, "image/png")}
+        ).json()
+        assert frame["prediction"] == single["prediction"]
+
+
+def test_predict_batch_accepts_zip(client: TestClient) -> None:
+    import zipfile
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        for name in ("frame_002.png", "frame_001.png", "__MACOSX/._frame_001.png"):
+            zf.writestr(name, _png().getvalue())
+    archive.seek(0)
+    response = client.post(
+        "/v1/predict/batch?explain=lazy",
+        files={"files": ("sweep.zip", archive, "application/zip")},
+    )
+    assert response.status_code == 200
+    frames = response.json()["frames"]
+    assert [f["filename"] for f in frames] == ["frame_001.png", "frame_002.png"]
+    assert frames[0]["explanation"]["explanation_url"].startswith("/v1/explanations/")
+
+
+def test_calibration_changes_confidence(  # type: ignore[no-untyped-def]
+    client: TestClient, monkeypatch, tmp_path
+) -> None:
+    import json
+
+    from app.inference.calibration import load_calibration
+    from app.inference.registry import model_registry
+
+    model_engine = model_registry.get().engine
+
+    path = str(tmp_path / "model.calibration.json")
+    with open(path, "w") as f:
+        json.dump({"method": "temperature", "temperature": 2.0}, f)
+    calibration = load_calibration(path, len(model_engine.classes))
+    assert calibration.temperature == 2.0 and calibration.digest
+
+    uncalibrated_version = model_engine.model_version
+    monkeypatch.setattr(model_engine, "calibration", calibration)
+    assert model_engine.model_version != uncalibrated_version
+
+    files = {"file": ("a.png", _png(), "image/png")}
+    response = client.post("/v1/predict?explain=none", files=files)
+    data = response.json()
+    # T > 1 softens the distribution
+    calibrated = data["uncertainty"]["calibrated_confidence"]
+    assert calibrated < data["prediction"]["confidence"]
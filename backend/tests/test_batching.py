@@ -0,0 +1,112 @@
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.inference.batching import BatchQueueFull, MicroBatcher
+from app.inference.executor import BoundedPool
+
+calls: list[int] = []
+
+
+def _run_batch(batch: np.ndarray) -> list[float]:
+    calls.append(batch.shape[0])
+    return [float(x) for x in batch[:, 0, 0, 0]]
+
+
+def _tensor(value: float) -> np.ndarray:
+    return np.full((1, 3, 4, 4), value, dtype=np.float32)
+
+
+def test_concurrent_requests_share_one_call() -> None:
+    calls.clear()
+
+    async def scenario() -> list[float]:
+        batcher = MicroBatcher(
+            _run_batch, max_batch_size=8, max_wait_ms=50, max_queue_depth=16
+        )
+        await batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(_tensor(i)) for i in range(5)))
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(scenario())
+    assert results == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert calls == [5]
+
+
+def test_batches_are_capped_at_max_size() -> None:
+    calls.clear()
+
+    async def scenario() -> None:
+        batcher = MicroBatcher(
+            _run_batch, max_batch_size=4, max_wait_ms=50, max_queue_depth=16
+        )
+        await batcher.start()
+        try:
+            await asyncio.gather(*(batcher.submit(_tensor(i)) for i in range(10)))
+        finally:
+            await batcher.stop()
+
+    asyncio.run(scenario())
+    assert calls == [4, 4, 2]
+
+
+def test_full_queue_is_rejected() -> None:
+    async def scenario() -> None:
+        batcher = MicroBatcher(
+            _run_batch, max_batch_size=1, max_wait_ms=0, max_queue_depth=1
+        )
+        await batcher.start()
+        try:
+            first = asyncio.ensure_future(batcher.submit(_tensor(0)))
+            second = asyncio.ensure_future(batcher.submit(_tensor(1)))
+            with pytest.raises(BatchQueueFull):
+                await asyncio.gather(first, second)
+        finally:
+            await batcher.stop()
+
+    asyncio.run(scenario())
+
+
+def test_bulk_jobs_queue_and_leave_interactive_headroom() -> None:
+    async def scenario() -> tuple[int, int]:
+        gate = threading.Event()
+        pool = BoundedPool("test", ThreadPoolExecutor(max_workers=4), 3, bulk_slots=2)
+        try:
+            bulk = [asyncio.create_task(pool.run_bulk(gate.wait)) for _ in range(4)]
+            await asyncio.sleep(0.05)
+            # Extra bulk jobs wait instead of failing; interactive still fits
+            held = pool.pending
+            interactive = asyncio.create_task(pool.run(lambda: 1))
+            result = await interactive
+            gate.set()
+            await asyncio.gather(*bulk)
+            return held, result
+        finally:
+            gate.set()
+            pool.shutdown()
+
+    assert asyncio.run(scenario()) == (2, 1)
+
+
+def test_in_thread_jobs_skip_the_process_pool_but_count_against_it() -> None:
+    async def scenario() -> tuple[int, int]:
+        pool = BoundedPool("test", ProcessPoolExecutor(max_workers=1), 2)
+        seen: list[int] = []
+
+        def unpicklable() -> int:
+            seen.append(pool.pending)
+            return threading.get_ident()
+
+        try:
+            ident = await pool.run_bulk(unpicklable, in_thread=True)
+            return seen[0], ident
+        finally:
+            pool.shutdown()
+
+    pending, ident = asyncio.run(scenario())
+    assert pending == 1 and ident != threading.get_ident()
@@ -0,0 +1,71 @@
+import asyncio
+import os
+
+import numpy as np
+
+from app.inference.cache import CachedPrediction, PredictionCache
+from app.inference.postprocessing import Postprocessor, Prediction
+
+
+def _entry(cam_side: int = 7) -> CachedPrediction:
+    records = Postprocessor(["Brain", "Other"]).run(np.array([[2.0, 0.0]]))
+    prediction = Prediction(
+        records[0], np.zeros((cam_side, cam_side), dtype=np.float32)
+    )
+    return CachedPrediction.from_prediction(prediction, (640, 480))
+
+
+def test_key_depends_on_model_and_temperature() -> None:
+    base = PredictionCache.make_key("abc", "fp32-1", 1.0)
+    assert base == PredictionCache.make_key("abc", "fp32-1", 1.0)
+    assert base != PredictionCache.make_key("abc", "int8-1", 1.0)
+    assert base != PredictionCache.make_key("abc", "fp32-1", 1.5)
+
+
+def test_lru_evicts_within_byte_budget() -> None:
+    cache = PredictionCache(max_bytes=2 * _entry().nbytes(), ttl_seconds=60)
+
+    async def scenario() -> list[bool]:
+        for key in ("a", "b"):
+            await cache.put(key, _entry())
+        await cache.get("a")  # "b" becomes least recently used
+        await cache.put("c", _entry())
+        return [await cache.get(k) is not None for k in ("a", "b", "c")]
+
+    evictions = cache.evictions.value
+    assert asyncio.run(scenario()) == [True, False, True]
+    assert cache.evictions.value == evictions + 1
+
+
+def test_disk_tier_round_trip_and_privacy_limit(tmp_path) -> None:  # type: ignore[no-untyped-def]
+    writer = PredictionCache(max_bytes=1 << 20, ttl_seconds=60, disk_dir=str(tmp_path))
+    reader = PredictionCache(max_bytes=1 << 20, ttl_seconds=60, disk_dir=str(tmp_path))
+
+    async def scenario() -> tuple[CachedPrediction | None, CachedPrediction | None]:
+        await writer.put("k", _entry())
+        await writer.put("big", _entry(cam_side=224))
+        return await reader.get("k"), await reader.get("big")
+
+    shared, big = asyncio.run(scenario())
+    assert shared is not None and shared.image_size == (640, 480)
+    assert shared.record == _entry().record
+    assert shared.cam is not None and shared.cam.shape == (7, 7)
+    assert big is None
+
+
+def test_disk_sweep_enforces_budget_and_ttl(tmp_path) -> None:  # type: ignore[no-untyped-def]
+    cache = PredictionCache(max_bytes=1 << 20, ttl_seconds=60, disk_dir=str(tmp_path))
+
+    async def scenario() -> None:
+        for key in ("aa1", "aa2", "aa3"):
+            await cache.put(key, _entry())
+
+    asyncio.run(scenario())
+    stale = tmp_path / "aa" / "crashed.tmp"
+    stale.write_bytes(b"partial")
+    os.utime(stale, (0, 0))
+    os.utime(tmp_path / "aa" / "aa1.json", (1, 1))  # oldest entry
+    cache.disk_max_bytes = 2 * len(_entry().to_json())
+    cache.sweep_disk()
+    remaining = sorted(p.name for p in (tmp_path / "aa").iterdir())
+    assert remaining == ["aa2.json", "aa3.json"]
@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+# Cumulative `-X importtime` of app.main; generous, this guards against
+# heavy imports creeping back rather than measuring the machine
+IMPORT_BUDGET_MS = 2500
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Prints the top-level packages loaded by importing app.main
+_LIST_MODULES = (
+    "import sys, app.main; "
+    "print(','.join(sorted(m for m in sys.modules if '.' not in m)))"
+)
+
+
+def _import_app(*flags: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", _LIST_MODULES],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=BACKEND_DIR,
+    )
+
+
+def test_app_import_is_lazy() -> None:
+    loaded = set(_import_app().stdout.strip().split(","))
+    assert not loaded & {"numpy", "PIL", "onnxruntime"}
+
+
+def test_app_import_time_budget() -> None:
+    lines = _import_app("-X", "importtime").stderr.splitlines()
+    total_us = next(
+        int(line.split("|")[1])
+        for line in lines
+        if line.rstrip().endswith("| app.main")
+    )
+    assert total_us / 1000 < IMPORT_BUDGET_MS
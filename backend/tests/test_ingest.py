@@ -0,0 +1,98 @@
+import io
+import struct
+import zipfile
+import zlib
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.core.config import settings
+from app.inference.ingest import InvalidImage, MemoryReader, sniff_image
+from app.inference.preprocessing import decode_image
+
+
+def _encode(fmt: str, size: tuple[int, int] = (40, 30), **params: object) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, (120, 60, 30)).save(buf, format=fmt, **params)
+    return buf.getvalue()
+
+
+def _png_header(width: int, height: int) -> bytes:
+    # A valid signature and IHDR claiming the given size, no pixel data
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunk = b"IHDR" + ihdr
+    crc = struct.pack(">I", zlib.crc32(chunk))
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(ihdr)) + chunk + crc
+
+
+@pytest.mark.parametrize("fmt", ["PNG", "JPEG", "GIF", "BMP", "WEBP", "TIFF"])
+def test_sniff_reads_dimensions_from_header(fmt: str) -> None:
+    data = _encode(fmt)
+    header = sniff_image(data)
+    assert header is not None and (header.width, header.height) == (40, 30)
+    assert header.format == fmt
+
+
+def test_sniff_waits_for_jpeg_frame_header_past_exif() -> None:
+    data = _encode("JPEG", exif=b"Exif\x00\x00" + b"\x00" * 30000)
+    assert sniff_image(data[:1024]) is None
+    header = sniff_image(data)
+    assert header is not None and (header.width, header.height) == (40, 30)
+
+
+def test_sniff_rejects_non_images() -> None:
+    assert sniff_image(b"\x89PN") is None  # could still be a PNG
+    with pytest.raises(InvalidImage):
+        sniff_image(b"not an image at all")
+
+
+def test_memory_reader_decodes_like_bytes() -> None:
+    data = _encode("PNG", (300, 200))
+    image, size = decode_image(memoryview(bytearray(data)))
+    expected, _ = decode_image(data)
+    assert size == (300, 200)
+    assert np.array_equal(np.asarray(image), np.asarray(expected))
+    reader = MemoryReader(data)
+    assert reader.read(8) == data[:8] and reader.seek(0, io.SEEK_END) == len(data)
+
+
+def test_predict_checks_content_not_declared_type(client: TestClient) -> None:
+    files = {"file": ("a.png", b"GIF? no, text", "image/png")}
+    bogus = client.post("/v1/predict", files=files)
+    assert bogus.status_code == 400
+    undeclared = client.post(
+        "/v1/predict?explain=none",
+        files={"file": ("a.bin", _encode("PNG"), "application/octet-stream")},
+    )
+    assert undeclared.status_code == 200
+
+
+def test_predict_refuses_oversized_uploads(client: TestClient, monkeypatch) -> None:  # type: ignore[no-untyped-def]
+    # Decompression bomb: refused from the header, nothing is decoded
+    files = {"file": ("bomb.png", _png_header(50_000, 50_000), "image/png")}
+    bomb = client.post("/v1/predict", files=files)
+    assert bomb.status_code == 413 and "pixel limit" in bomb.json()["detail"]
+
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 1024)
+    files = {"file": ("a.bmp", _encode("BMP"), "image/bmp")}
+    large = client.post("/v1/predict", files=files)
+    assert large.status_code == 413
+
+
+def test_batch_archives_are_capped_as_uploaded_and_expanded(  # type: ignore[no-untyped-def]
+    client: TestClient, monkeypatch
+) -> None:
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for idx in range(3):
+            zf.writestr(f"frame_{idx}.bmp", _encode("BMP", (100, 100)))
+    files = {"files": ("sweep.zip", archive.getvalue(), "application/zip")}
+    # Compresses well: under the upload cap, over the total once expanded
+    monkeypatch.setattr(settings, "BATCH_ENDPOINT_MAX_TOTAL_BYTES", 60_000)
+    expanded = client.post("/v1/predict/batch", files=files)
+    assert expanded.status_code == 413 and "in total" in expanded.json()["detail"]
+
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 256)
+    assert client.post("/v1/predict/batch", files=files).status_code == 413
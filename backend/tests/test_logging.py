@@ -0,0 +1,91 @@
+import asyncio
+import contextvars
+import logging
+import queue
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+from fastapi.testclient import TestClient
+
+from app.core.logging import (
+    DroppingQueueHandler,
+    InfoThrottle,
+    JSONFormatter,
+    RequestIdFilter,
+    request_id_var,
+    resolve_request_id,
+)
+from app.inference.executor import BoundedPool
+
+
+def _record(level: int = logging.INFO, name: str = "app.test") -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, "message", None, None)
+
+
+def test_throttle_limits_info_per_logger_and_reports_suppressed() -> None:
+    throttle = InfoThrottle(rate_per_second=2, sample_rates={})
+    kept = [throttle.filter(_record()) for _ in range(5)]
+    assert kept == [True, True, False, False, False]
+    # Warnings bypass the limit, other loggers have their own bucket
+    assert throttle.filter(_record(logging.WARNING))
+    assert throttle.filter(_record(name="app.other"))
+
+    throttle._buckets["app.test"].updated -= 1.0  # one second later
+    record = _record()
+    assert throttle.filter(record)
+    assert getattr(record, "suppressed", 0) == 3
+
+
+def test_sampling_drops_info_only() -> None:
+    throttle = InfoThrottle(rate_per_second=0, sample_rates={"app.noisy": 0.0})
+    assert not throttle.filter(_record(name="app.noisy"))
+    assert throttle.filter(_record(logging.ERROR, name="app.noisy"))
+    assert throttle.filter(_record(name="app.quiet"))
+
+
+def test_records_are_formatted_on_the_listener_side() -> None:
+    handler = DroppingQueueHandler(queue.Queue())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord(
+            "app.test", logging.ERROR, __file__, 1, "failed %s", ("x",), sys.exc_info()
+        )
+    prepared = handler.prepare(record)
+    # Nothing rendered on the caller's thread
+    assert prepared.msg == "failed %s" and prepared.exc_info is not None
+    assert prepared.exc_text is None
+    line = orjson.loads(JSONFormatter().format(prepared))
+    assert line["message"] == "failed x" and "ValueError: boom" in line["exception"]
+
+
+def test_request_id_reaches_executor_threads() -> None:
+    def log_in_worker() -> str | None:
+        record = _record()
+        RequestIdFilter().filter(record)
+        return getattr(record, "request_id", None)
+
+    async def scenario() -> str | None:
+        request_id_var.set("req-123")
+        pool = BoundedPool("test", ThreadPoolExecutor(max_workers=1), 4)
+        try:
+            return await pool.run(log_in_worker)
+        finally:
+            pool.shutdown()
+
+    assert contextvars.copy_context().run(asyncio.run, scenario()) == "req-123"
+
+
+def test_request_id_header(client: TestClient) -> None:
+    assert (
+        client.get("/v1/healthz", headers={"X-Request-ID": "lb-42"}).headers[
+            "X-Request-ID"
+        ]
+        == "lb-42"
+    )
+    generated = client.get("/v1/healthz", headers={"X-Request-ID": "bad id\n"}).headers[
+        "X-Request-ID"
+    ]
+    assert generated != "bad id\n" and len(generated) == 36
+    assert resolve_request_id(None) != resolve_request_id(None)
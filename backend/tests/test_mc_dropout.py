@@ -0,0 +1,103 @@
+import io
+
+import numpy as np
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.inference.mc_dropout import McDropoutHead, _hardswish, mc_dropout_uncertainty
+from app.inference.postprocessing import Postprocessor
+
+POSTPROCESSOR = Postprocessor([f"class{i}" for i in range(6)])
+
+
+def _weights(k: int = 3, h: int = 16, c: int = 6) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(1)
+    return {
+        "fc1_weight": rng.standard_normal((h, k)).astype(np.float32),
+        "fc1_bias": rng.standard_normal(h).astype(np.float32),
+        "fc2_weight": rng.standard_normal((c, h)).astype(np.float32),
+        "fc2_bias": rng.standard_normal(c).astype(np.float32),
+    }
+
+
+def test_batched_passes_match_sequential_dropout() -> None:
+    weights = _weights()
+    head = McDropoutHead(weights, dropout_p=0.25)
+    pooled = np.random.default_rng(2).standard_normal((2, 3)).astype(np.float32)
+    batched = head.sample_logits(pooled, passes=5, seed=7)
+
+    # Same masks, applied one pass at a time
+    rng = np.random.default_rng(7)
+    hidden = _hardswish(pooled @ weights["fc1_weight"].T + weights["fc1_bias"])
+    keep = rng.random((2, 5, hidden.shape[1]), dtype=np.float32) >= 0.25
+    for n in range(2):
+        for t in range(5):
+            logits = (hidden[n] * keep[n, t] / 0.75) @ weights[
+                "fc2_weight"
+            ].T + weights["fc2_bias"]
+            np.testing.assert_allclose(batched[n, t], logits, rtol=1e-5, atol=1e-5)
+
+
+def test_decomposition_without_dropout_has_no_epistemic_part() -> None:
+    head = McDropoutHead(_weights(), dropout_p=0.0)
+    stats = mc_dropout_uncertainty(
+        head, POSTPROCESSOR, np.ones(3, dtype=np.float32), passes=8
+    )
+    assert stats["epistemic"] < 1e-5
+    assert np.isclose(stats["predictive_entropy"], stats["aleatoric"], atol=1e-5)
+
+    stats = mc_dropout_uncertainty(
+        McDropoutHead(_weights(), dropout_p=0.5),
+        POSTPROCESSOR,
+        np.ones(3, dtype=np.float32),
+        passes=32,
+        seed=0,
+    )
+    assert stats["epistemic"] > 0
+    assert stats["aleatoric"] <= stats["predictive_entropy"]
+
+
+def test_passes_use_the_model_calibration() -> None:
+    head = McDropoutHead(_weights(), dropout_p=0.0)
+    pooled = np.ones(3, dtype=np.float32)
+    weight = np.full(6, 0.5, dtype=np.float32)  # temperature 2
+    stats = mc_dropout_uncertainty(head, POSTPROCESSOR, pooled, passes=4, weight=weight)
+    logits = head.sample_logits(pooled.reshape(1, -1), passes=1)[0]
+    calibrated = POSTPROCESSOR.run(logits, weight)[0]
+    assert stats["class_id"] == int(calibrated["class_id"])
+    assert np.isclose(stats["mean_confidence"], calibrated["calibrated_confidence"])
+    assert np.isclose(stats["predictive_entropy"], calibrated["entropy"], atol=1e-5)
+
+
+def _png() -> io.BytesIO:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), color="gray").save(buf, format="PNG")
+    buf.seek(0)
+    return buf
+
+
+def test_predict_with_mc_dropout(client: TestClient, monkeypatch) -> None:  # type: ignore[no-untyped-def]
+    from app.inference.registry import model_registry
+
+    model_engine = model_registry.get().engine
+    response = client.post(
+        "/v1/predict?mc_passes=4", files={"file": ("a.png", _png(), "image/png")}
+    )
+    if model_engine.mc_head is None:
+        assert response.status_code == 501
+
+    monkeypatch.setattr(
+        model_engine, "mc_head", McDropoutHead(_weights(), dropout_p=0.2)
+    )
+    response = client.post(
+        "/v1/predict?explain=none&mc_passes=16&mc_seed=3",
+        files={"file": ("a.png", _png(), "image/png")},
+    )
+    assert response.status_code == 200
+    mc = response.json()["uncertainty"]["mc_dropout"]
+    assert mc["passes"] == 16 and mc["epistemic"] >= 0
+
+    too_many = client.post(
+        "/v1/predict?mc_passes=100000", files={"file": ("a.png", _png(), "image/png")}
+    )
+    assert too_many.status_code == 422
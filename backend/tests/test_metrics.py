@@ -0,0 +1,70 @@
+import io
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.core.metrics import MetricsRegistry
+from app.core.timing import RequestTimings
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), color=(90, 30, 200)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_prometheus_text_format() -> None:
+    metrics = MetricsRegistry()
+    stage = metrics.histogram("stage_ms", (1, 10), "Stage time", {"stage": "decode"})
+    stage.observe(0.5)
+    stage.observe(5)
+    stage.observe(50)
+    metrics.counter("hits_total", "Hits").inc(3)
+    text = metrics.render_prometheus()
+    assert "# TYPE stage_ms histogram" in text
+    assert 'stage_ms_bucket{stage="decode",le="1"} 1' in text
+    assert 'stage_ms_bucket{stage="decode",le="10"} 2' in text
+    assert 'stage_ms_bucket{stage="decode",le="+Inf"} 3' in text
+    assert 'stage_ms_count{stage="decode"} 3' in text
+    assert "# TYPE hits_total counter\nhits_total 3\n" in text
+
+
+def test_request_timings_accumulate_and_format() -> None:
+    timings = RequestTimings()
+    with timings.stage("read"):
+        pass
+    timings.record("decode", 2.0)
+    timings.record("decode", 3.0)
+    timings.record_model_call(10.0, 4.0, 1.0)
+    header = timings.finish()
+    assert header.startswith("read;dur=")
+    assert "decode;dur=5.00" in header
+    assert "queue;dur=5.00, inference;dur=4.00, postprocess;dur=1.00" in header
+    assert "xai" not in header and "total;dur=" in header
+
+
+def test_predict_reports_server_timing_and_metrics(client: TestClient) -> None:
+    response = client.post(
+        "/v1/predict", files={"file": ("a.png", _png(), "image/png")}
+    )
+    assert response.status_code == 200
+    stages = {
+        entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")
+    }
+    assert {
+        "read",
+        "cache",
+        "decode",
+        "preprocess",
+        "queue",
+        "inference",
+        "postprocess",
+        "xai",
+        "serialize",
+        "total",
+    } <= stages
+
+    metrics = client.get("/metrics")
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'request_stage_ms_count{stage="inference"}' in metrics.text
+    assert "inference_batch_size_bucket" in metrics.text
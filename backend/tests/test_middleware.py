@@ -0,0 +1,142 @@
+import asyncio
+from typing import Any
+
+from app.core.logging import request_id_var
+from app.core.middleware import RequestContextMiddleware
+from app.core.timing import current_timings
+
+
+def _scope(
+    path: str, headers: list[tuple[bytes, bytes]] | None = None
+) -> dict[str, Any]:
+    return {"type": "http", "method": "GET", "path": path, "headers": headers or []}
+
+
+async def _receive() -> dict[str, Any]:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+def test_headers_added_and_context_set() -> None:
+    seen: dict[str, Any] = {}
+
+    async def app(scope: Any, receive: Any, send: Any) -> None:
+        seen["request_id"] = request_id_var.get()
+        current_timings().record("decode", 2.0)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"x-app", b"1")],
+            }
+        )
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def scenario() -> list[dict[str, Any]]:
+        sent: list[dict[str, Any]] = []
+
+        async def send(message: dict[str, Any]) -> None:
+            sent.append(message)
+
+        middleware = RequestContextMiddleware(app, max_in_flight=1)
+        await middleware(
+            _scope("/v1/predict", [(b"x-request-id", b"lb-7")]), _receive, send
+        )
+        return sent
+
+    start, body = asyncio.run(scenario())
+    headers = dict(start["headers"])
+    assert seen["request_id"] == "lb-7" and headers[b"x-request-id"] == b"lb-7"
+    assert headers[b"x-app"] == b"1"
+    assert headers[b"server-timing"].startswith(b"decode;dur=2.00, total;dur=")
+    assert body["body"] == b"ok"
+
+
+def test_in_flight_limit_rejects_but_spares_probes() -> None:
+    async def scenario() -> list[int]:
+        release = asyncio.Event()
+
+        async def app(scope: Any, receive: Any, send: Any) -> None:
+            if scope["path"] == "/v1/predict":
+                await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        middleware = RequestContextMiddleware(app, max_in_flight=1, retry_after=3)
+        statuses: list[int] = []
+        retry_after: list[bytes] = []
+
+        async def send(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+                retry_after.extend(
+                    v for k, v in message["headers"] if k == b"retry-after"
+                )
+
+        first = asyncio.create_task(middleware(_scope("/v1/predict"), _receive, send))
+        await asyncio.sleep(0)
+        await middleware(_scope("/v1/predict"), _receive, send)  # over the limit
+        await middleware(_scope("/v1/healthz"), _receive, send)  # exempt
+        release.set()
+        await first
+        await middleware(_scope("/v1/predict"), _receive, send)  # slot freed
+        assert retry_after == [b"3"]
+        assert middleware.in_flight == 0
+        return statuses
+
+    assert asyncio.run(scenario()) == [503, 200, 200, 200]
+
+
+def test_streamed_body_is_not_buffered() -> None:
+    async def scenario() -> None:
+        first_chunk_sent = asyncio.Event()
+        finish = asyncio.Event()
+
+        async def app(scope: Any, receive: Any, send: Any) -> None:
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"a", "more_body": True})
+            await finish.wait()
+            await send({"type": "http.response.body", "body": b"b"})
+
+        async def send(message: dict[str, Any]) -> None:
+            if message.get("body") == b"a":
+                first_chunk_sent.set()
+
+        task = asyncio.create_task(
+            RequestContextMiddleware(app)(_scope("/v1/predict/stream"), _receive, send)
+        )
+        # The first chunk reaches the server while the app is still producing
+        await asyncio.wait_for(first_chunk_sent.wait(), timeout=1)
+        finish.set()
+        await task
+
+    asyncio.run(scenario())
+
+
+def test_body_limit_refuses_oversized_uploads_as_they_arrive() -> None:
+    from fastapi import FastAPI, UploadFile
+    from fastapi.testclient import TestClient
+
+    api = FastAPI()
+
+    @api.post("/v1/predict/stream")
+    async def upload(file: UploadFile) -> dict[str, int | None]:
+        return {"size": file.size}
+
+    middleware = RequestContextMiddleware(
+        api, body_limits=(("/v1/predict/stream", 4096),)
+    )
+    with TestClient(middleware) as client:
+        small = client.post("/v1/predict/stream", files={"file": ("a", b"x" * 100)})
+        assert small.status_code == 200 and small.json() == {"size": 100}
+        large = client.post("/v1/predict/stream", files={"file": ("a", b"x" * 8192)})
+        assert large.status_code == 413
+        assert "x-request-id" in large.headers
+        # Without a Content-Length the bytes are counted as they arrive
+        body = b"--b\r\nContent-Disposition: form-data; name=file; filename=a\r\n\r\n"
+        chunked = client.post(
+            "/v1/predict/stream",
+            content=iter([body] + [b"x" * 1024] * 8 + [b"\r\n--b--\r\n"]),
+            headers={"content-type": "multipart/form-data; boundary=b"},
+        )
+        assert "content-length" not in chunked.request.headers
+        assert chunked.status_code == 413
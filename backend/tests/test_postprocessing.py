@@ -0,0 +1,49 @@
+import numpy as np
+
+from app.inference.postprocessing import Postprocessor, PredictionBatch
+
+CLASSES = ["Abdominal", "Brain", "Cervix", "Femur", "Other", "Thorax"]
+
+
+def _softmax(logits: np.ndarray, temperature: float) -> np.ndarray:
+    # Plain float64 reference for the kernel
+    scaled = logits.astype(np.float64) / temperature
+    exp = np.exp(scaled - scaled.max())
+    return exp / exp.sum()
+
+
+def test_matches_reference_softmax_and_entropy() -> None:
+    logits = np.random.default_rng(0).standard_normal((5, 6)).astype(np.float32) * 3
+    weight = np.full(6, 0.5, dtype=np.float32)
+    records = Postprocessor(CLASSES).run(logits, weight=weight)
+    for row, record in zip(logits, records, strict=True):
+        calibrated = _softmax(row, 2.0)
+        raw = _softmax(row, 1.0)
+        np.testing.assert_allclose(record["probabilities"], calibrated, rtol=1e-5)
+        entropy = -np.sum(calibrated * np.log(calibrated))
+        assert np.isclose(record["entropy"], entropy, atol=1e-5)
+        assert np.isclose(record["calibrated_confidence"], calibrated.max())
+        assert np.isclose(record["confidence"], raw[record["class_id"]], rtol=1e-5)
+        assert record["label"] == CLASSES[record["class_id"]]
+        assert list(record["top_k_ids"]) == list(np.argsort(-calibrated)[:3])
+        top = np.sort(calibrated)[::-1]
+        assert np.isclose(record["margin"], top[0] - top[1], atol=1e-6)
+
+
+def test_extreme_logits_stay_finite() -> None:
+    logits = np.array([[1e4, -1e4, 0, 0, 0, 0], [-800, -800, -800, -800, -800, -799]])
+    records = Postprocessor(CLASSES).run(logits)
+    assert np.all(np.isfinite(records["probabilities"]))
+    assert np.all(np.isfinite(records["entropy"])) and records["entropy"][0] >= 0
+    np.testing.assert_allclose(records["probabilities"].sum(axis=1), 1.0, rtol=1e-6)
+    assert list(records["class_id"]) == [0, 5]
+
+
+def test_writes_into_preallocated_output() -> None:
+    post = Postprocessor(CLASSES)
+    out = post.allocate(4)
+    result = post.run(np.zeros((4, 6)), out=out)
+    assert result is out
+    batch = PredictionBatch(out, cams=np.ones((4, 7, 7)))
+    assert len(batch) == 4 and batch[2].cam is not None
+    assert np.isclose(batch[2].entropy, np.log(6))
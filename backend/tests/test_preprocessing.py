@@ -0,0 +1,73 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.inference.preprocessing import IMAGENET_STD, decode_image, engine
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def test_large_jpeg_is_decoded_at_reduced_size() -> None:
+    data = _encode(Image.new("RGB", (2000, 1500), color="gray"), "JPEG")
+    image, original_size = decode_image(data)
+    assert original_size == (2000, 1500)
+    assert image.size == (500, 375)  # 1/4 DCT scale keeps the short side >= 256
+
+
+def test_grayscale_stays_single_channel_until_normalization() -> None:
+    gray = Image.fromarray(
+        np.arange(300 * 400, dtype=np.uint32).reshape(300, 400).astype(np.uint8)
+    )
+    image, _ = decode_image(_encode(gray, "PNG"))
+    assert image.mode == "L"
+    np.testing.assert_allclose(
+        engine.preprocess(image), engine.preprocess(gray.convert("RGB")), atol=1e-6
+    )
+
+
+# The fused resample may round a pixel to the neighbouring 8-bit level
+ONE_LEVEL = 1.0 / 255.0 / min(IMAGENET_STD) + 1e-5
+
+
+@pytest.mark.parametrize(
+    "size", [(256, 256), (300, 400), (640, 480), (1001, 701), (224, 300)]
+)
+def test_matches_torchvision_eval_transforms(size: tuple[int, int]) -> None:
+    transforms = pytest.importorskip("torchvision.transforms")
+    # Same eval pipeline as modeling/scripts/train.py
+    reference = transforms.Compose(
+        [
+            transforms.Resize(256),
+            transforms.CenterCrop(224),
+            transforms.ToTensor(),
+            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+        ]
+    )
+    rng = np.random.default_rng(sum(size))
+    image = Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+
+    ours = engine.preprocess(image)
+    expected = reference(image).numpy()
+
+    assert ours.shape == (1, 3, 224, 224)
+    assert ours.dtype == np.float32
+    diff = np.abs(ours[0] - expected)
+    assert diff.max() <= ONE_LEVEL
+    assert (diff > 1e-4).mean() < 0.02
+
+
+def test_batch_writes_into_preallocated_buffer() -> None:
+    images = [Image.new("RGB", (320, 240), color=c) for c in ("red", "green", "blue")]
+    buffer = engine.allocate(8)
+
+    batch = engine.preprocess_batch(images, out=buffer)
+
+    assert batch.shape == (3, 3, 224, 224)
+    assert np.shares_memory(batch, buffer)
+    np.testing.assert_allclose(batch[1], engine.preprocess(images[1])[0])
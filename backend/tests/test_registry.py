@@ -0,0 +1,179 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from conftest import FakeSession
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.inference.model import DEFAULT_CLASSES, ModelWrapper
+from app.inference.registry import ModelRegistry, ModelSpec, load_specs
+
+
+def _factory(spec: ModelSpec) -> ModelWrapper:
+    classes = spec.classes or DEFAULT_CLASSES
+    engine = ModelWrapper(
+        spec.path, spec.variant, classes, temperature=spec.temperature
+    )
+    engine.session = FakeSession(len(classes))  # type: ignore[assignment]
+    return engine
+
+
+def _tensor() -> np.ndarray:
+    return np.zeros((1, 3, 224, 224), dtype=np.float32)
+
+
+def test_load_specs_resolves_relative_paths(tmp_path) -> None:  # type: ignore[no-untyped-def]
+    path = tmp_path / "models.json"
+    path.write_text(
+        json.dumps(
+            {
+                "default": "int8",
+                "models": [
+                    {"name": "fp32", "path": "model.onnx"},
+                    {
+                        "name": "int8",
+                        "path": "model.int8.onnx",
+                        "variant": "int8",
+                        "temperature": 1.5,
+                    },
+                ],
+            }
+        )
+    )
+    specs, default = load_specs(str(path))
+    assert default == "int8"
+    assert specs[0].path == str(tmp_path / "model.onnx")
+    assert specs[0].calibration_path == str(tmp_path / "model.calibration.json")
+    assert specs[1].temperature == 1.5
+
+
+def test_models_are_routed_by_name() -> None:
+    specs = [
+        ModelSpec("a", "missing-a.onnx"),
+        ModelSpec("b", "missing-b.onnx", classes=("x", "y"), temperature=2.0),
+    ]
+    registry = ModelRegistry(specs, "a", factory=_factory)
+    registry.load_all()
+    assert registry.get().spec.name == "a"
+    b = registry.get("b")
+    assert b.engine.classes == ["x", "y"] and b.engine.temperature == 2.0
+    assert b.engine.model_version != registry.get("a").engine.model_version
+
+
+def test_reload_swaps_without_dropping_leased_requests() -> None:
+    async def scenario() -> None:
+        registry = ModelRegistry(
+            [ModelSpec("a", "missing.onnx")], "a", factory=_factory
+        )
+        await registry.start()
+        try:
+            old = registry.get("a").acquire()
+            fresh = await registry.reload("a")
+            assert registry.get("a") is fresh and fresh is not old
+            # The in-flight request still completes on the old generation
+            result = await old.batcher.submit(_tensor())
+            assert result.label
+            old.release()
+            await asyncio.gather(*registry._retiring)
+            assert old.batcher._worker is None
+            assert (await fresh.batcher.submit(_tensor())).label
+        finally:
+            await registry.stop()
+
+    asyncio.run(scenario())
+
+
+def test_reload_warms_up_while_the_pool_is_saturated() -> None:
+    from app.inference.executor import inference_executor
+
+    async def scenario() -> None:
+        registry = ModelRegistry(
+            [ModelSpec("a", "missing.onnx")], "a", factory=_factory
+        )
+        await registry.start()
+        inference_executor.start()
+        pool = inference_executor.inference
+        assert pool is not None
+        try:
+            # Requests hold every inference slot: warm-up must not need one
+            pool.pending = pool.max_pending
+            fresh = await registry.reload("a")
+            assert registry.get("a") is fresh
+            assert fresh.warmup_ms is not None
+        finally:
+            pool.pending = 0
+            await registry.stop()
+
+    asyncio.run(scenario())
+
+
+def test_unknown_model_is_404(client: TestClient) -> None:
+    response = client.post(
+        "/v1/predict?model=nope", files={"file": ("a.png", b"x", "image/png")}
+    )
+    assert response.status_code == 404
+
+
+def test_list_models(client: TestClient) -> None:
+    data = client.get("/v1/models").json()
+    assert data["default"] == settings.MODEL_VARIANT
+    assert data["models"][0]["name"] == settings.MODEL_VARIANT
+    assert "session_rss_bytes" in data["models"][0]["memory"]
+
+
+def test_reload_requires_admin_token(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    assert client.post(f"/v1/models/{settings.MODEL_VARIANT}/reload").status_code == 403
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    response = client.post(
+        f"/v1/models/{settings.MODEL_VARIANT}/reload",
+        headers={"X-Admin-Token": "wrong"},
+    )
+    assert response.status_code == 401
+    response = client.post(
+        "/v1/models/nope/reload", headers={"X-Admin-Token": "secret"}
+    )
+    assert response.status_code == 404
+
+
+def test_readyz_after_warm_up(client: TestClient, fake_session) -> None:  # type: ignore[no-untyped-def]
+    response = client.get("/v1/readyz")
+    assert response.status_code == 200
+    warmup = response.json()["models"][settings.MODEL_VARIANT]["warmup_ms"]
+    # Every batch size the micro-batcher can form went through the session
+    assert sorted(int(size) for size in warmup) == list(
+        range(1, settings.BATCH_MAX_SIZE + 1)
+    )
+    assert set(range(1, settings.BATCH_MAX_SIZE + 1)) <= set(fake_session.batch_sizes)
+
+
+def test_not_ready_without_a_session() -> None:
+    def factory(spec: ModelSpec) -> ModelWrapper:
+        return ModelWrapper(spec.path)
+
+    async def scenario() -> tuple[bool, bool]:
+        registry = ModelRegistry([ModelSpec("a", "missing.onnx")], "a", factory=factory)
+        await registry.start()
+        ready = registry.ready
+        await registry.stop()
+        return ready, registry.get().warmup_ms is None
+
+    assert asyncio.run(scenario()) == (False, True)
+
+
+def test_ready_flips_after_start_and_back_on_stop() -> None:
+    async def scenario() -> list[bool]:
+        registry = ModelRegistry(
+            [ModelSpec("a", "missing.onnx")], "a", factory=_factory
+        )
+        states = [registry.ready]
+        await registry.start()
+        states.append(registry.ready)
+        await registry.stop()
+        states.append(registry.ready)
+        return states
+
+    assert asyncio.run(scenario()) == [False, True, False]
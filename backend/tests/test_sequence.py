@@ -0,0 +1,74 @@
+import numpy as np
+
+from app.inference.sequence import (
+    KeyFrame,
+    KeyFrameSelector,
+    ProbabilitySmoother,
+    SequenceProcessor,
+)
+
+
+def _flicker(num_frames: int = 20) -> list[np.ndarray]:
+    # Class 0 throughout, with every 4th frame flipping to class 1
+    frames = []
+    for idx in range(num_frames):
+        probs = np.array([0.3, 0.6, 0.1]) if idx % 4 == 3 else np.array([0.7, 0.2, 0.1])
+        frames.append(probs)
+    return frames
+
+
+def test_smoothers_remove_single_frame_flicker() -> None:
+    for mode in ("ema", "hmm"):
+        smoother = ProbabilitySmoother(mode, alpha=0.3, stay_prob=0.9)  # type: ignore[arg-type]
+        labels = [smoother.update(p).class_id for p in _flicker()]
+        assert labels == [0] * 20, mode
+        assert np.isclose(smoother.state.sum(), 1.0)  # type: ignore[union-attr]
+
+
+def test_hmm_follows_a_sustained_change() -> None:
+    smoother = ProbabilitySmoother("hmm", stay_prob=0.9)
+    for _ in range(10):
+        smoother.update(np.array([0.8, 0.1, 0.1]))
+    labels = [smoother.update(np.array([0.1, 0.8, 0.1])).class_id for _ in range(5)]
+    assert labels[-1] == 1
+
+
+def test_key_frames_keep_lowest_entropy_per_class() -> None:
+    selector = KeyFrameSelector(k=2)
+    rng = np.random.default_rng(0)
+    entropies = rng.uniform(0, 2, size=50)
+    for idx, entropy in enumerate(entropies):
+        selector.offer(idx % 2, KeyFrame(idx, float(entropy), 0.5))
+    best = selector.best()
+    for class_id in (0, 1):
+        expected = sorted(range(class_id, 50, 2), key=lambda i: entropies[i])[:2]
+        assert [f.frame_index for f in best[class_id]] == expected
+
+
+def test_sequence_processor_summary_uses_class_names() -> None:
+    processor = SequenceProcessor(["A", "B", "C"], smoothing="ema", top_k=1)
+    for idx, probs in enumerate(_flicker(8)):
+        entropy = float(-(probs * np.log(probs)).sum())
+        processor.update(idx, probs, entropy)
+    summary = processor.summary()
+    # The flicker frames are smoothed away, but filed under their own label
+    assert list(summary) == ["A", "B"]
+    assert summary["A"][0]["confidence"] == 0.7
+    assert summary["B"][0]["confidence"] == 0.6
+    assert set(summary["A"][0]) == {"index", "entropy", "confidence", "timestamp"}
+
+
+def test_key_frames_follow_the_raw_label_across_a_transition() -> None:
+    processor = SequenceProcessor(["A", "B", "C"], smoothing="ema", top_k=3)
+    for idx in range(20):
+        # Ten A frames, then ten sharper B frames: the smoothed label lags
+        # behind, but B's frames must not become A's key frames
+        probs = np.array([0.8, 0.1, 0.1] if idx < 10 else [0.02, 0.96, 0.02])
+        entropy = float(-(probs * np.log(probs)).sum())
+        smoothed = processor.update(idx, probs, entropy)
+        if idx == 10:
+            assert smoothed.class_id == 0
+    summary = processor.summary()
+    assert all(frame["index"] < 10 for frame in summary["A"])
+    assert [frame["index"] for frame in summary["B"]] == [10, 11, 12]
+    assert summary["B"][0]["confidence"] == 0.96
@@ -0,0 +1,56 @@
+import os
+
+import onnxruntime as ort
+import pytest
+
+from app.core.config import settings
+from app.inference import session_options
+from app.inference.session_options import PROFILES, create_session
+
+
+def _tiny_model(path: str) -> None:
+    onnx = pytest.importorskip("onnx")
+    helper = onnx.helper
+    graph = helper.make_graph(
+        [helper.make_node("Relu", ["input"], ["output"])],
+        "tiny",
+        [helper.make_tensor_value_info("input", onnx.TensorProto.FLOAT, [1, 4])],
+        [helper.make_tensor_value_info("output", onnx.TensorProto.FLOAT, [1, 4])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    onnx.save(model, path)
+
+
+def test_cached_graph_is_written_atomically_and_not_reoptimized(  # type: ignore[no-untyped-def]
+    tmp_path, monkeypatch
+) -> None:
+    model_path = str(tmp_path / "tiny.onnx")
+    _tiny_model(model_path)
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr(settings, "ORT_OPTIMIZED_MODEL_DIR", str(cache_dir))
+
+    loads: list[tuple[str, str, ort.GraphOptimizationLevel]] = []
+    real_session = ort.InferenceSession
+
+    def recording_session(path, sess_options, providers):  # type: ignore[no-untyped-def]
+        options = sess_options
+        loads.append(
+            (path, options.optimized_model_filepath, options.graph_optimization_level)
+        )
+        return real_session(path, sess_options=sess_options, providers=providers)
+
+    monkeypatch.setattr(session_options.ort, "InferenceSession", recording_session)
+    profile = PROFILES["default"]
+
+    _, info = create_session(model_path, profile)
+    assert info["optimized_model_cache"] == "miss"
+    assert os.listdir(cache_dir) == [os.path.basename(info["optimized_model_path"])]
+    # The optimizer wrote to a temp file, never to the final path
+    assert loads[0][1].endswith(".tmp")
+
+    loads.clear()
+    _, info = create_session(model_path, profile)
+    assert info["optimized_model_cache"] == "hit"
+    cached = info["optimized_model_path"]
+    assert loads == [(cached, "", ort.GraphOptimizationLevel.ORT_DISABLE_ALL)]
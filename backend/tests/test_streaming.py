@@ -0,0 +1,106 @@
+import io
+import zipfile
+
+import numpy as np
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+
+def _png(color: int) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (40, 30), color=(color, color, color)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _lines(body: str) -> list[dict]:  # type: ignore[type-arg]
+    return [orjson.loads(line) for line in body.splitlines()]
+
+
+def test_stream_archive_with_stride_and_bad_frame(client: TestClient) -> None:
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        for idx in range(10):
+            zf.writestr(
+                f"frame_{idx:03d}.png", b"corrupt" if idx == 4 else _png(idx * 20)
+            )
+    archive.seek(0)
+    response = client.post(
+        "/v1/predict/stream?stride=2",
+        files={"file": ("loop.zip", archive, "application/zip")},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = _lines(response.text)
+    frames, summary = lines[:-1], lines[-1]
+    assert [f["index"] for f in frames] == [0, 2, 4, 6, 8]
+    assert "error" in frames[2] and "label" in frames[3]
+    assert summary == {"done": True, "frames": 5, "emitted": 5}
+
+
+def test_stream_smoothing_and_key_frames(client: TestClient) -> None:
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        for idx in range(6):
+            zf.writestr(f"frame_{idx:03d}.png", _png(30 + idx * 30))
+    archive.seek(0)
+    response = client.post(
+        "/v1/predict/stream?smoothing=hmm&top_k=2",
+        files={"file": ("loop.zip", archive, "application/zip")},
+    )
+    lines = _lines(response.text)
+    assert all("smoothed_label" in line for line in lines[:-1])
+    key_frames = lines[-1]["key_frames"]
+    assert 0 < sum(len(frames) for frames in key_frames.values()) <= 2 * len(key_frames)
+    for frames in key_frames.values():
+        entropies = [f["entropy"] for f in frames]
+        assert entropies == sorted(entropies)
+
+
+def test_stream_video_emits_only_label_changes(client: TestClient) -> None:
+    av = pytest.importorskip("av")
+    clip = io.BytesIO()
+    with av.open(clip, "w", format="mp4") as container:
+        stream = container.add_stream("mpeg4", rate=10)
+        stream.width, stream.height, stream.pix_fmt = 64, 64, "yuv420p"
+        for idx in range(12):
+            pixels = np.full((64, 64, 3), 40 if idx < 6 else 220, dtype=np.uint8)
+            frame = av.VideoFrame.from_ndarray(pixels, format="rgb24")
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+    clip.seek(0)
+
+    response = client.post(
+        "/v1/predict/stream?on_change=true",
+        files={"file": ("clip.mp4", clip, "video/mp4")},
+    )
+    lines = _lines(response.text)
+    labels = [line["label"] for line in lines[:-1]]
+    assert all(a != b for a, b in zip(labels, labels[1:], strict=False))
+    assert lines[-1]["frames"] == 12 and lines[-1]["emitted"] == len(labels)
+    assert "timestamp" in lines[0]
+
+
+def test_stream_decodes_on_the_preprocessing_pool(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from app.inference.executor import inference_executor
+
+    calls: list[tuple[str, bool]] = []
+    run_preprocessing = inference_executor.run_preprocessing
+
+    async def recording(fn, *args, bulk=False, in_thread=False):  # type: ignore[no-untyped-def]
+        calls.append((fn.__name__, bulk))
+        return await run_preprocessing(fn, *args, bulk=bulk, in_thread=in_thread)
+
+    monkeypatch.setattr(inference_executor, "run_preprocessing", recording)
+    response = client.post(
+        "/v1/predict/stream",
+        files={"file": ("frame.png", _png(80), "image/png")},
+    )
+    assert _lines(response.text)[-1]["frames"] == 1
+    # One chunk with the frame, then the empty read that ends the stream
+    assert calls == [("read_chunk", True), ("read_chunk", True)]
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from app.inference.xai import CamEngine, generate_heatmap, render_heatmap_png
+
+
+def test_matches_autograd_grad_cam() -> None:
+    torch = pytest.importorskip("torch")
+    models = pytest.importorskip("torchvision.models")
+
+    torch.manual_seed(0)
+    model = models.mobilenet_v3_small(weights=None, num_classes=6).eval()
+    head = model.classifier
+    engine = CamEngine(
+        {
+            "fc1_weight": head[0].weight.detach().numpy(),
+            "fc1_bias": head[0].bias.detach().numpy(),
+            "fc2_weight": head[3].weight.detach().numpy(),
+        }
+    )
+
+    x = torch.randn(2, 3, 224, 224)
+    features = model.features(x).detach().requires_grad_(True)
+    logits = head(torch.flatten(model.avgpool(features), 1))
+    class_ids = logits.argmax(dim=1)
+    logits.gather(1, class_ids[:, None]).sum().backward()
+
+    # Reference Grad-CAM: spatially averaged gradients as channel weights
+    alpha = features.grad.mean(dim=(2, 3))
+    expected = (
+        torch.relu(torch.einsum("nk,nkhw->nhw", alpha, features)).detach().numpy()
+    )
+    expected /= expected.max(axis=(1, 2), keepdims=True)
+
+    cams = engine.compute(features.detach().numpy(), class_ids.numpy())
+    assert cams.shape == (2, 7, 7)
+    np.testing.assert_allclose(cams, expected, atol=1e-4)
+
+
+def test_heatmap_uses_cam_when_available() -> None:
+    cam = np.zeros((7, 7), dtype=np.float32)
+    cam[0, 0] = 1.0
+    assert generate_heatmap((64, 48), 0, cam) != generate_heatmap((64, 48), 0)
+
+
+def test_overlay_is_capped_and_colored_through_lut(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    import io
+
+    from PIL import Image
+
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "XAI_MAX_OUTPUT_DIM", 512)
+    cam = np.zeros((7, 7), dtype=np.float32)
+    cam[3, 3] = 1.0
+
+    overlay = Image.open(io.BytesIO(render_heatmap_png((2000, 1500), 0, cam)))
+    assert overlay.size == (512, 384)
+    rgba = overlay.convert("RGBA")
+    assert rgba.getpixel((256, 192))[0] > 200  # peak is red
+    assert rgba.getpixel((0, 0))[3] == 0  # background is transparent
+    # The crop box is scaled with the overlay: x=40 is left of it
+    assert rgba.getpixel((40, 192))[3] == 0
+
+
+def test_cam_lands_in_the_model_crop_box() -> None:
+    import io
+
+    from PIL import Image
+
+    from app.inference.preprocessing import engine
+
+    # Hot spot in the top-left CAM cell of a landscape image: the model saw
+    # only the central square, so it lands there, not in the image corner
+    cam = np.zeros((7, 7), dtype=np.float32)
+    cam[0, 0] = 1.0
+    size = (2000, 1500)
+    overlay = Image.open(io.BytesIO(render_heatmap_png(size, 0, cam)))
+    assert overlay.size == (1024, 768)
+    alpha = np.asarray(overlay.convert("RGBA"))[:, :, 3]
+
+    scale = 1024 / 2000
+    left, top, right, bottom = (v * scale for v in engine.crop_box(size))
+    cell = (right - left) / 7
+    # Centroid of the overlay (its alpha saturates near the peak)
+    ys, xs = np.indices(alpha.shape)
+    hot_x, hot_y = (float((c * alpha).sum() / alpha.sum()) for c in (xs, ys))
+    assert abs(hot_x - (left + cell / 2)) <= cell / 2
+    assert abs(hot_y - (top + cell / 2)) <= cell / 2
+    # Outside the crop box the overlay is transparent
+    assert alpha[:, : int(left) - 1].max() == 0
+    assert alpha[:, int(right) + 1 :].max() == 0
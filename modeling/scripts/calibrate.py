@@ -1,32 +1,233 @@
+"""
+Post-hoc calibration of the ONNX model: temperature or per-class vector
+scaling fitted on validation logits, with ECE/MCE reliability reports.
+
+The backend loads the output JSON (``<model>.calibration.json`` by default)
+and applies it before the softmax.
+"""
 import argparse
-import numpy as np
 import json
 import os
 
-def calibrate(logits_path: str, labels_path: str) -> float:
+import numpy as np
+
+NUM_BINS = 15
+CHUNK_ROWS = 1 << 16
+# log-spaced candidates for the coarse temperature search
+TEMPERATURE_GRID = np.exp(np.linspace(np.log(0.05), np.log(20.0), 200))
+
+
+def dump_logits(onnx_path: str, data_dir: str, out_dir: str, batch_size: int = 32):
+    """
+    Run the model once over ``<data_dir>/val`` and write the logits and
+    labels as .npy files, filled in place through a memory map so the
+    whole set never has to fit in RAM. Returns the two paths.
+    """
+    import onnxruntime as ort
+    from evaluate_detailed import FetalUltrasoundDataset
+    from quantize_onnx import EVAL_TRANSFORM
+
+    dataset = FetalUltrasoundDataset(data_dir, phase='val', transform=EVAL_TRANSFORM)
+    if len(dataset) == 0:
+        raise SystemExit(f"No validation images under {data_dir}/val")
+
+    session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+    num_classes = session.get_outputs()[0].shape[-1]
+
+    os.makedirs(out_dir, exist_ok=True)
+    logits_path = os.path.join(out_dir, "val_logits.npy")
+    labels_path = os.path.join(out_dir, "val_labels.npy")
+    logits = np.lib.format.open_memmap(
+        logits_path, mode="w+", dtype=np.float32, shape=(len(dataset), num_classes)
+    )
+    labels = np.lib.format.open_memmap(
+        labels_path, mode="w+", dtype=np.int64, shape=(len(dataset),)
+    )
+    for start in range(0, len(dataset), batch_size):
+        stop = min(start + batch_size, len(dataset))
+        items = [dataset[i] for i in range(start, stop)]
+        batch = np.stack([image.numpy() for image, _ in items])
+        logits[start:stop] = session.run(None, {input_name: batch})[0]
+        labels[start:stop] = [label for _, label in items]
+    logits.flush()
+    labels.flush()
+    print(f"Dumped {len(dataset)} validation logits to {logits_path}")
+    return logits_path, labels_path
+
+
+def log_softmax(z):
+    z = z - z.max(axis=-1, keepdims=True)
+    return z - np.log(np.exp(z).sum(axis=-1, keepdims=True))
+
+
+def nll_for_temperatures(logits, labels, temperatures):
     """
-    Find optimal temperature T to minimize ECE using NLL.
-    Placeholder verification script.
+    Mean NLL for every candidate temperature at once: (G,) -> (G,).
+    Rows are processed in chunks, so memory is O(G * chunk * C).
     """
-    print(f"Loading logits from {logits_path}")
-    print(f"Loading labels from {labels_path}")
-    
-    # Placeholder logic
-    optimal_temperature = 1.5
-    print(f"Optimal Temperature found: {optimal_temperature}")
-    return optimal_temperature
+    temperatures = np.atleast_1d(np.asarray(temperatures, dtype=np.float64))
+    total = np.zeros(len(temperatures))
+    for start in range(0, len(labels), CHUNK_ROWS):
+        z = np.asarray(logits[start:start + CHUNK_ROWS], dtype=np.float64)
+        y = np.asarray(labels[start:start + CHUNK_ROWS])
+        scaled = z[np.newaxis] / temperatures[:, np.newaxis, np.newaxis]  # (G, n, C)
+        log_probs = log_softmax(scaled)
+        total -= log_probs[:, np.arange(len(y)), y].sum(axis=1)
+    return total / len(labels)
+
+
+def fit_temperature(logits, labels, iterations=40):
+    """
+    Minimize NLL over T: a vectorized pass over a log-spaced grid brackets
+    the minimum, then golden-section search refines it in log T.
+    """
+    nll = nll_for_temperatures(logits, labels, TEMPERATURE_GRID)
+    best = int(np.argmin(nll))
+    lo = np.log(TEMPERATURE_GRID[max(best - 1, 0)])
+    hi = np.log(TEMPERATURE_GRID[min(best + 1, len(TEMPERATURE_GRID) - 1)])
+
+    ratio = (np.sqrt(5) - 1) / 2
+    a, b = hi - ratio * (hi - lo), lo + ratio * (hi - lo)
+    fa, fb = nll_for_temperatures(logits, labels, np.exp([a, b]))
+    for _ in range(iterations):
+        if fa < fb:
+            hi, b, fb = b, a, fa
+            a = hi - ratio * (hi - lo)
+            fa = nll_for_temperatures(logits, labels, np.exp(a))[0]
+        else:
+            lo, a, fa = a, b, fb
+            b = lo + ratio * (hi - lo)
+            fb = nll_for_temperatures(logits, labels, np.exp(b))[0]
+    return float(np.exp((lo + hi) / 2))
+
+
+def fit_vector_scaling(logits, labels, temperature=1.0, iterations=500):
+    """
+    Per-class scaling ``z' = w * z + b`` (w, b of shape (C,)) minimizing NLL
+    by full-batch gradient descent with backtracking, started from the
+    temperature solution (w = 1/T, b = 0).
+    """
+    z = np.asarray(logits, dtype=np.float64)
+    y = np.asarray(labels)
+    onehot = np.zeros_like(z)
+    onehot[np.arange(len(y)), y] = 1.0
+
+    def loss_and_grad(w, b):
+        log_probs = log_softmax(z * w + b)
+        residual = (np.exp(log_probs) - onehot) / len(y)
+        loss = -(log_probs * onehot).sum() / len(y)
+        return loss, (residual * z).sum(axis=0), residual.sum(axis=0)
+
+    w = np.full(z.shape[1], 1.0 / temperature)
+    b = np.zeros(z.shape[1])
+    loss, grad_w, grad_b = loss_and_grad(w, b)
+    step = 1.0
+    for _ in range(iterations):
+        while step > 1e-8:
+            new_w, new_b = w - step * grad_w, b - step * grad_b
+            new_loss, new_grad_w, new_grad_b = loss_and_grad(new_w, new_b)
+            if new_loss <= loss - 0.5 * step * (grad_w @ grad_w + grad_b @ grad_b):
+                break
+            step /= 2
+        else:
+            break
+        converged = loss - new_loss < 1e-10
+        w, b, loss, grad_w, grad_b = new_w, new_b, new_loss, new_grad_w, new_grad_b
+        step *= 2
+        if converged:
+            break
+    return w, b
+
+
+def reliability(probs, labels, num_bins=NUM_BINS):
+    """Equal-width confidence bins with accuracy/confidence per bin, ECE and MCE."""
+    confidence = probs.max(axis=1)
+    correct = (probs.argmax(axis=1) == labels).astype(np.float64)
+    bins = np.minimum((confidence * num_bins).astype(int), num_bins - 1)
+    counts = np.bincount(bins, minlength=num_bins)
+    acc_sum = np.bincount(bins, weights=correct, minlength=num_bins)
+    conf_sum = np.bincount(bins, weights=confidence, minlength=num_bins)
+    nonempty = counts > 0
+    accuracy = np.divide(acc_sum, counts, out=np.zeros(num_bins), where=nonempty)
+    mean_conf = np.divide(conf_sum, counts, out=np.zeros(num_bins), where=nonempty)
+    gaps = np.abs(accuracy - mean_conf)
+    return {
+        "ece": float((counts * gaps).sum() / len(labels)),
+        "mce": float(gaps[nonempty].max()) if nonempty.any() else 0.0,
+        "bins": [
+            {
+                "lower": i / num_bins,
+                "upper": (i + 1) / num_bins,
+                "count": int(counts[i]),
+                "accuracy": float(accuracy[i]),
+                "confidence": float(mean_conf[i]),
+            }
+            for i in range(num_bins)
+        ],
+    }
+
+
+def evaluate(logits, labels, weight, bias):
+    log_probs = log_softmax(np.asarray(logits, dtype=np.float64) * weight + bias)
+    probs = np.exp(log_probs)
+    report = reliability(probs, labels)
+    report["nll"] = float(-log_probs[np.arange(len(labels)), labels].mean())
+    report["accuracy"] = float((probs.argmax(axis=1) == labels).mean())
+    return report
+
+
+def calibrate(logits_path: str, labels_path: str, method: str = "temperature") -> dict:
+    """Fit the calibration on memory-mapped logits/labels; returns the JSON payload."""
+    logits = np.load(logits_path, mmap_mode="r")
+    labels = np.load(labels_path, mmap_mode="r")
+    print(f"Calibrating on {len(labels)} samples ({logits_path})")
+
+    temperature = fit_temperature(logits, labels)
+    print(f"Optimal Temperature found: {temperature:.4f}")
+    result = {
+        "method": method,
+        "temperature": temperature,
+        "num_samples": int(len(labels)),
+        "metrics": {
+            "uncalibrated": evaluate(logits, labels, 1.0, 0.0),
+            "temperature": evaluate(logits, labels, 1.0 / temperature, 0.0),
+        },
+    }
+    if method == "vector":
+        weight, bias = fit_vector_scaling(logits, labels, temperature)
+        result["vector_scaling"] = {"weight": weight.tolist(), "bias": bias.tolist()}
+        result["metrics"]["vector"] = evaluate(logits, labels, weight, bias)
+
+    for name, metrics in result["metrics"].items():
+        print(f"{name:>13}: NLL {metrics['nll']:.4f} | ECE {metrics['ece']:.4f} | "
+              f"MCE {metrics['mce']:.4f} | acc {metrics['accuracy']:.4f}")
+    return result
+
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Temperature Scaling Calibration")
-    parser.add_argument("--logits", type=str, required=True, help="Path to numpy file with logits")
-    parser.add_argument("--labels", type=str, required=True, help="Path to numpy file with labels")
-    parser.add_argument("--output", type=str, default="temperature.json", help="Output JSON file")
-    
+    parser = argparse.ArgumentParser(description="Temperature / vector scaling calibration")
+    parser.add_argument("--onnx", type=str, default="assets/models/fetal_plane_mobilenetv3.onnx",
+                        help="Model used to dump validation logits (skipped if --logits is given)")
+    parser.add_argument("--data_dir", type=str, default="assets/datasets")
+    parser.add_argument("--logits", type=str, help="Existing .npy file with validation logits")
+    parser.add_argument("--labels", type=str, help="Existing .npy file with validation labels")
+    parser.add_argument("--cache_dir", type=str, default="assets/calibration",
+                        help="Where dumped logits/labels are written")
+    parser.add_argument("--method", choices=["temperature", "vector"], default="temperature")
+    parser.add_argument("--output", type=str,
+                        help="Output JSON (default: <onnx>.calibration.json, read by the backend)")
+
     args = parser.parse_args()
-    
-    t = calibrate(args.logits, args.labels)
-    
-    with open(args.output, "w") as f:
-        json.dump({"temperature": t}, f)
-        
-    print(f"Saved to {args.output}")
+
+    if args.logits and args.labels:
+        logits_path, labels_path = args.logits, args.labels
+    else:
+        logits_path, labels_path = dump_logits(args.onnx, args.data_dir, args.cache_dir)
+
+    payload = calibrate(logits_path, labels_path, args.method)
+    output = args.output or os.path.splitext(args.onnx)[0] + ".calibration.json"
+    with open(output, "w") as f:
+        json.dump(payload, f, indent=2)
+
+    print(f"Saved to {output}")
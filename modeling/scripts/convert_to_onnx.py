@@ -3,11 +3,44 @@ import torch
 from torchvision import models
 import torch.nn as nn
 import argparse
+import numpy as np
 
 IMG_SIZE = 224
 NUM_CLASSES = 6
 
-def convert_to_onnx(pth_path: str, onnx_path: str):
+class CamExportWrapper(nn.Module):
+    """
+    Exposes the last conv feature maps next to the logits, so the backend
+    can build Grad-CAM from the same forward pass as the prediction.
+    """
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x):
+        features = self.model.features(x)  # (N, 576, 7, 7)
+        pooled = torch.flatten(self.model.avgpool(features), 1)
+        return self.model.classifier(pooled), features
+
+def export_cam_weights(model, npz_path: str):
+    """
+    Save the classifier head (Linear -> Hardswish -> Dropout -> Linear) so
+    the backend can compute d(logit)/d(features) in closed form, and
+    sample MC-Dropout masks with the training dropout rate.
+    """
+    fc1, dropout, fc2 = model.classifier[0], model.classifier[2], model.classifier[3]
+    np.savez(
+        npz_path,
+        fc1_weight=fc1.weight.detach().cpu().numpy(),
+        fc1_bias=fc1.bias.detach().cpu().numpy(),
+        fc2_weight=fc2.weight.detach().cpu().numpy(),
+        fc2_bias=fc2.bias.detach().cpu().numpy(),
+        dropout_p=np.float32(dropout.p),
+    )
+    print(f"CAM classifier weights saved to {npz_path}")
+
+def convert_to_onnx(pth_path: str, onnx_path: str, quantize: str = "none",
+                    data_dir: str = "assets/datasets", with_cam: bool = True):
     # Load MobileNetV3-Small architecture
     model = models.mobilenet_v3_small(weights=None)
     num_ftrs = model.classifier[3].in_features
@@ -17,22 +50,39 @@ def convert_to_onnx(pth_path: str, onnx_path: str):
     model.load_state_dict(torch.load(pth_path, map_location='cpu', weights_only=True))
     model.eval()
 
-    # Export to ONNX
+    # Export to ONNX (optionally with the feature maps as a second output)
     dummy_input = torch.randn(1, 3, IMG_SIZE, IMG_SIZE)
+    output_names = ['output', 'features'] if with_cam else ['output']
     torch.onnx.export(
-        model,
+        CamExportWrapper(model) if with_cam else model,
         dummy_input,
         onnx_path,
         input_names=['input'],
-        output_names=['output'],
-        dynamic_axes={'input': {0: 'batch_size'}, 'output': {0: 'batch_size'}},
+        output_names=output_names,
+        dynamic_axes={name: {0: 'batch_size'} for name in ['input', *output_names]},
         opset_version=14
     )
     print(f"ONNX model exported to {onnx_path}")
 
+    if with_cam:
+        export_cam_weights(model, onnx_path.replace(".onnx", ".cam.npz"))
+
+    if quantize != "none":
+        # Imported lazily: pulls in the evaluation stack (sklearn, seaborn)
+        from quantize_onnx import quantize_model
+        int8_path = onnx_path.replace(".onnx", ".int8.onnx")
+        quantize_model(onnx_path, int8_path, data_dir, method=quantize,
+                       report_path="assets/quantization_report.json")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--pth", type=str, default="assets/models/fetal_plane_mobilenetv3.pth")
     parser.add_argument("--onnx", type=str, default="assets/models/fetal_plane_mobilenetv3.onnx")
+    parser.add_argument("--quantize", choices=["none", "static", "dynamic"], default="none",
+                        help="Also write an INT8 model (<onnx>.int8.onnx)")
+    parser.add_argument("--data_dir", type=str, default="assets/datasets",
+                        help="Dataset root; val/ is used for static calibration")
+    parser.add_argument("--no-cam", action="store_true",
+                        help="Export logits only (no feature maps / CAM weights)")
     args = parser.parse_args()
-    convert_to_onnx(args.pth, args.onnx)
+    convert_to_onnx(args.pth, args.onnx, args.quantize, args.data_dir, with_cam=not args.no_cam)
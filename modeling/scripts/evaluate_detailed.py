@@ -48,6 +48,14 @@ class FetalUltrasoundDataset(Dataset):
             image = self.transform(image)
         return image, label
 
+def compute_metrics(all_labels, all_preds):
+    """Headline metrics shared by evaluation and quantization reports."""
+    return {
+        "accuracy": accuracy_score(all_labels, all_preds),
+        "f1_macro": f1_score(all_labels, all_preds, average='macro'),
+        "f1_weighted": f1_score(all_labels, all_preds, average='weighted'),
+    }
+
 def evaluate_model(model_path, data_dir):
     device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
     print(f"Using device: {device}")
@@ -97,9 +105,10 @@ def evaluate_model(model_path, data_dir):
             all_labels.extend(labels.numpy())
 
     # Metrics
-    acc = accuracy_score(all_labels, all_preds)
-    f1_macro = f1_score(all_labels, all_preds, average='macro')
-    f1_weighted = f1_score(all_labels, all_preds, average='weighted')
+    headline = compute_metrics(all_labels, all_preds)
+    acc = headline["accuracy"]
+    f1_macro = headline["f1_macro"]
+    f1_weighted = headline["f1_weighted"]
 
     print("\n" + "="*40)
     print("DETAILED RESULTS")
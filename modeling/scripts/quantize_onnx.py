@@ -0,0 +1,158 @@
+"""Quantize the FP32 ONNX model to INT8 and report the accuracy delta."""
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+import onnxruntime as ort
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    CalibrationMethod,
+    QuantFormat,
+    QuantType,
+    quantize_dynamic,
+    quantize_static,
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+from torchvision import transforms
+
+from evaluate_detailed import CLASSES, FetalUltrasoundDataset, compute_metrics
+
+IMG_SIZE = 224
+BATCH_SIZE = 32
+CALIBRATION_SAMPLES = 256
+
+# Same eval transform as train.py / evaluate_detailed.py
+EVAL_TRANSFORM = transforms.Compose([
+    transforms.Resize(256),
+    transforms.CenterCrop(IMG_SIZE),
+    transforms.ToTensor(),
+    transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+])
+
+class ValCalibrationReader(CalibrationDataReader):
+    """Feeds a random sample of validation images to the ORT calibrator."""
+    def __init__(self, dataset, input_name, num_samples, seed=0):
+        indices = list(range(len(dataset)))
+        random.Random(seed).shuffle(indices)
+        self.dataset = dataset
+        self.input_name = input_name
+        self.indices = iter(indices[:num_samples])
+
+    def get_next(self):
+        idx = next(self.indices, None)
+        if idx is None:
+            return None
+        image, _ = self.dataset[idx]
+        return {self.input_name: image.unsqueeze(0).numpy()}
+
+def evaluate_onnx(onnx_path, dataset):
+    """Run the ONNX model over the dataset; returns metrics plus ms/image."""
+    session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+
+    all_preds, all_labels = [], []
+    elapsed = 0.0
+    for start in range(0, len(dataset), BATCH_SIZE):
+        items = [dataset[i] for i in range(start, min(start + BATCH_SIZE, len(dataset)))]
+        batch = np.stack([image.numpy() for image, _ in items])
+        t0 = time.perf_counter()
+        logits = session.run(None, {input_name: batch})[0]
+        elapsed += time.perf_counter() - t0
+        all_preds.extend(np.argmax(logits, axis=1).tolist())
+        all_labels.extend(label for _, label in items)
+
+    metrics = compute_metrics(all_labels, all_preds)
+    metrics["latency_ms_per_image"] = 1000 * elapsed / max(1, len(dataset))
+    # Newer exporters keep weights in an external "<model>.onnx.data" file
+    size = sum(os.path.getsize(p) for p in (onnx_path, onnx_path + ".data") if os.path.exists(p))
+    metrics["model_size_mb"] = size / 2**20
+    return metrics
+
+def quantize_model(fp32_path, int8_path, data_dir, method="static",
+                   num_samples=CALIBRATION_SAMPLES, report_path=None):
+    """
+    Write an INT8 copy of ``fp32_path``. Static quantization is calibrated on
+    a sample of ``<data_dir>/val``; dynamic (weights only) is used when asked
+    for, when no validation images exist, or when static quantization fails.
+    """
+    val_dataset = FetalUltrasoundDataset(data_dir, phase='val', transform=EVAL_TRANSFORM)
+
+    # Shape inference + graph cleanup, as recommended before quantization
+    prepared_path = int8_path.replace(".onnx", ".prep.onnx")
+    quant_pre_process(fp32_path, prepared_path)
+
+    used = method
+    if method == "static" and len(val_dataset) == 0:
+        print("No validation images found; falling back to dynamic quantization.")
+        used = "dynamic"
+
+    if used == "static":
+        input_name = ort.InferenceSession(
+            prepared_path, providers=["CPUExecutionProvider"]
+        ).get_inputs()[0].name
+        reader = ValCalibrationReader(val_dataset, input_name, num_samples)
+        try:
+            quantize_static(
+                prepared_path,
+                int8_path,
+                reader,
+                quant_format=QuantFormat.QDQ,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+                per_channel=True,
+                calibrate_method=CalibrationMethod.MinMax,
+            )
+        except Exception as e:
+            print(f"Static quantization failed ({e}); falling back to dynamic.")
+            used = "dynamic"
+
+    if used == "dynamic":
+        # ConvInteger kernels are slower than FP32 conv on most CPUs, so the
+        # dynamic fallback only quantizes the classifier's linear layers
+        quantize_dynamic(prepared_path, int8_path, weight_type=QuantType.QInt8,
+                         op_types_to_quantize=["MatMul", "Gemm"])
+
+    os.remove(prepared_path)
+    print(f"INT8 ({used}) model written to {int8_path}")
+
+    if len(val_dataset) == 0:
+        print("Skipping accuracy report: no validation data.")
+        return None
+
+    print(f"Evaluating FP32 and INT8 on {len(val_dataset)} images...")
+    fp32 = evaluate_onnx(fp32_path, val_dataset)
+    int8 = evaluate_onnx(int8_path, val_dataset)
+    report = {
+        "method": used,
+        "calibration_samples": min(num_samples, len(val_dataset)) if used == "static" else 0,
+        "classes": CLASSES,
+        "fp32": fp32,
+        "int8": int8,
+        "delta": {k: int8[k] - fp32[k] for k in fp32},
+    }
+
+    print(f"Accuracy: FP32 {fp32['accuracy']:.4f} | INT8 {int8['accuracy']:.4f} "
+          f"(delta {report['delta']['accuracy']:+.4f})")
+    print(f"Latency:  FP32 {fp32['latency_ms_per_image']:.2f} ms | "
+          f"INT8 {int8['latency_ms_per_image']:.2f} ms per image")
+
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {report_path}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="INT8 quantization of the ONNX model")
+    parser.add_argument("--onnx", type=str, default="assets/models/fetal_plane_mobilenetv3.onnx")
+    parser.add_argument("--output", type=str, default="assets/models/fetal_plane_mobilenetv3.int8.onnx")
+    parser.add_argument("--data_dir", type=str, default="assets/datasets")
+    parser.add_argument("--method", choices=["static", "dynamic"], default="static")
+    parser.add_argument("--samples", type=int, default=CALIBRATION_SAMPLES,
+                        help="Validation images used for static calibration")
+    parser.add_argument("--report", type=str, default="assets/quantization_report.json")
+    args = parser.parse_args()
+    quantize_model(args.onnx, args.output, args.data_dir, args.method, args.samples, args.report)